@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Latency-aware routing across several OpenAI-compatible backends
+
+Backends come from a JSON file:
+
+    {"probe_interval": 60,
+     "backends": [
+        {"name": "deepseek", "base_url": "https://api.deepseek.com", "model": "deepseek-chat"},
+        {"name": "mirror", "base_url": "https://llm.example.com/v1", "model": "deepseek-chat",
+         "api_key_env": "MIRROR_API_KEY", "weight": 0.5}
+     ]}
+
+BackendRouter has the create/create_stream interface of ResilientCompletions,
+so it drops in wherever a completions object is used. Each backend gets its
+own ResilientCompletions (deadlines, breaker, hedging) and its own
+exponentially weighted averages of time to first token and error rate. A
+request goes to the backend with the best score, picked by weight among
+backends within ROUTE_TOLERANCE of the best. When it fails before the first
+token, the next backend in score order takes over. A background thread
+probes backends that have not served a request for a while, so a slow or
+failed backend is noticed when it recovers.
+"""
+import os
+import json
+import time
+import random
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from client_pool import get_client, resolve_base_url
+from resilient_client import RETRYABLE_ERRORS, CircuitOpenError, CompletionTimeout, ResilientCompletions
+from metrics import REGISTRY
+
+DEFAULT_MODEL = "deepseek-chat"
+TTFT_ALPHA = 0.2          # weight of the newest first-token sample
+ERROR_ALPHA = 0.1         # weight of the newest success/failure
+ERROR_PENALTY = 4.0       # a 25% error rate doubles a backend's score
+UNHEALTHY_ERROR_RATE = 0.5
+ROUTE_TOLERANCE = 0.2     # backends within 20% of the best score share traffic by weight
+PROBE_MESSAGES = [{"role": "user", "content": "ping"}]
+# Failures of the backend itself; anything else (bad request, auth) would fail on every backend
+BACKEND_ERRORS = RETRYABLE_ERRORS + (CompletionTimeout, CircuitOpenError)
+
+BACKEND_TTFT = REGISTRY.gauge('tutor_backend_ttft_ewma_seconds', 'Smoothed time to first token per backend',
+                              ('backend',))
+BACKEND_ERROR_RATE = REGISTRY.gauge('tutor_backend_error_rate', 'Smoothed error rate per backend', ('backend',))
+BACKEND_REQUESTS = REGISTRY.counter('tutor_backend_requests_total', 'Requests routed per backend and outcome',
+                                    ('backend', 'outcome'))
+
+
+class Backend:
+    """One OpenAI-compatible endpoint and its running latency and error estimates"""
+
+    def __init__(self, name: str, base_url: str, model: str = DEFAULT_MODEL,
+                 api_key_env: str = 'DEEPSEEK_API_KEY', weight: float = 1.0):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.api_key_env = api_key_env
+        self.weight = weight
+        self.completions: Optional[ResilientCompletions] = None
+
+        self.lock = threading.Lock()
+        self.ttft_ewma: Optional[float] = None   # seconds; None until the first sample
+        self.error_ewma = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.probes = 0
+        self.last_used = 0.0
+
+        # Metric children bound once per backend
+        self.ttft_gauge = BACKEND_TTFT.labels(name)
+        self.error_gauge = BACKEND_ERROR_RATE.labels(name)
+        self.successes_counter = BACKEND_REQUESTS.labels(name, 'success')
+        self.failures_counter = BACKEND_REQUESTS.labels(name, 'failure')
+
+    @property
+    def healthy(self) -> bool:
+        breaker_open = self.completions is not None and self.completions.breaker.state == 'open'
+        return not breaker_open and self.error_ewma < UNHEALTHY_ERROR_RATE
+
+    def score(self) -> float:
+        """Lower is better; backends without samples score 0 so they are tried first"""
+        ttft = self.ttft_ewma or 0.0
+        return ttft * (1 + ERROR_PENALTY * self.error_ewma) / max(self.weight, 1e-6)
+
+    def record_success(self, ttft: Optional[float], probe: bool = False):
+        with self.lock:
+            if ttft is not None:
+                self.ttft_ewma = ttft if self.ttft_ewma is None else \
+                    TTFT_ALPHA * ttft + (1 - TTFT_ALPHA) * self.ttft_ewma
+            self.error_ewma *= 1 - ERROR_ALPHA
+            self._count(probe)
+        self.successes_counter.inc()
+        self._publish()
+
+    def record_failure(self, probe: bool = False):
+        with self.lock:
+            self.error_ewma = ERROR_ALPHA + (1 - ERROR_ALPHA) * self.error_ewma
+            self.failures += 1
+            self._count(probe)
+        self.failures_counter.inc()
+        self._publish()
+
+    def _count(self, probe: bool):
+        if probe:
+            self.probes += 1
+        else:
+            self.requests += 1
+        self.last_used = time.time()
+
+    def _publish(self):
+        if self.ttft_ewma is not None:
+            self.ttft_gauge.set(self.ttft_ewma)
+        self.error_gauge.set(self.error_ewma)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'name': self.name,
+                'base_url': self.base_url,
+                'model': self.model,
+                'weight': self.weight,
+                'healthy': self.healthy,
+                'ttft_ewma_ms': round(self.ttft_ewma * 1000, 1) if self.ttft_ewma is not None else None,
+                'error_rate': round(self.error_ewma, 3),
+                'requests': self.requests,
+                'failures': self.failures,
+                'probes': self.probes,
+                'breaker_state': self.completions.breaker.state if self.completions else None,
+            }
+
+
+def load_backends(path: str) -> Dict:
+    """Backend definitions and router options from a JSON config file"""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if isinstance(config, list):
+        config = {'backends': config}
+    backends = []
+    for index, entry in enumerate(config.get('backends') or []):
+        if 'base_url' not in entry:
+            raise ValueError(f"Backend {index} in {path} has no base_url")
+        backends.append(Backend(
+            entry.get('name') or f"backend{index}",
+            entry['base_url'],
+            entry.get('model', DEFAULT_MODEL),
+            entry.get('api_key_env', 'DEEPSEEK_API_KEY'),
+            float(entry.get('weight', 1.0))
+        ))
+    if not backends:
+        raise ValueError(f"No backends configured in {path}")
+    return {'backends': backends, 'probe_interval': config.get('probe_interval', 60.0)}
+
+
+def default_backends() -> List[Backend]:
+    """The single backend the tutor used before routing (DEEPSEEK_BASE_URL or the DeepSeek API)"""
+    return [Backend('default', resolve_base_url(), DEFAULT_MODEL)]
+
+
+class BackendRouter:
+    """ResilientCompletions-compatible client that routes each request to the best backend"""
+
+    def __init__(self, backends: List[Backend], probe_interval: float = 60.0, **completion_options):
+        if not backends:
+            raise ValueError("BackendRouter needs at least one backend")
+        self.backends = backends
+        # With somewhere to fall back to, a failed backend isn't retried; the next one is tried instead
+        if len(backends) > 1:
+            completion_options.setdefault('max_retries', 0)
+        for backend in backends:
+            client = get_client(os.environ.get(backend.api_key_env), backend.base_url)
+            backend.completions = ResilientCompletions(client, **completion_options)
+
+        self.lock = threading.Lock()
+        self.counters = {'calls': 0, 'fallbacks': 0, 'exhausted': 0}
+        self.local = threading.local()
+        self.probe_interval = probe_interval
+        self.stop_probing = threading.Event()
+        if probe_interval and len(backends) > 1:
+            threading.Thread(target=self._probe_loop, daemon=True, name='backend-probe').start()
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def ranked(self) -> List[Backend]:
+        """Backends in the order to try them: a weighted pick among the best, then by score"""
+        healthy = sorted((b for b in self.backends if b.healthy), key=lambda b: b.score())
+        unhealthy = sorted((b for b in self.backends if not b.healthy), key=lambda b: b.score())
+        if len(healthy) > 1:
+            best = healthy[0].score()
+            close = [b for b in healthy if b.score() <= best * (1 + ROUTE_TOLERANCE)]
+            if len(close) > 1:
+                first = random.choices(close, weights=[b.weight for b in close])[0]
+                healthy.remove(first)
+                healthy.insert(0, first)
+        # Unhealthy backends are still a last resort
+        return healthy + unhealthy
+
+    def _route(self, call, kwargs: Dict):
+        """Try backends in rank order until one answers; re-raise the last error if none does
+
+        Errors that aren't the backend's fault are re-raised at once, without counting
+        against the backend or falling back.
+        """
+        self._count('calls')
+        last_error = None
+        for attempt, backend in enumerate(self.ranked()):
+            if attempt:
+                self._count('fallbacks')
+            try:
+                result = call(backend, dict(kwargs, model=backend.model))
+            except BACKEND_ERRORS as e:
+                backend.record_failure()
+                last_error = e
+                continue
+            self.local.backend = backend
+            return backend, result
+        self._count('exhausted')
+        raise last_error
+
+    def last_backend(self) -> Optional[Backend]:
+        """The backend that served this thread's most recent request"""
+        return getattr(self.local, 'backend', None)
+
+    def create(self, **kwargs):
+        """Non-streaming completion (full latency isn't a first-token time, so only errors are tracked)"""
+        backend, response = self._route(lambda b, args: b.completions.create(**args), kwargs)
+        backend.record_success(None)
+        return response
+
+    def create_stream(self, **kwargs) -> Iterator:
+        """Streaming completion from the best backend, returned once the first token has arrived"""
+        backend, stream = self._route(lambda b, args: b.completions.create_stream(**args), kwargs)
+        backend.record_success(backend.completions.last_ttft())
+        return self._watch(backend, stream)
+
+    def _watch(self, backend: Backend, stream: Iterator) -> Iterator:
+        """Pass the stream through; a failure after the first token still counts against the backend"""
+        try:
+            yield from stream
+        except BACKEND_ERRORS:
+            backend.record_failure()
+            raise
+
+    def probe(self, backend: Backend):
+        """One-token streamed request to refresh a backend's estimates"""
+        try:
+            stream = backend.completions.create_stream(model=backend.model, messages=PROBE_MESSAGES,
+                                                       max_tokens=1, temperature=0)
+            ttft = backend.completions.last_ttft()
+            for _ in stream:
+                pass
+        except Exception:
+            backend.record_failure(probe=True)
+            return
+        backend.record_success(ttft, probe=True)
+
+    def _probe_loop(self):
+        while not self.stop_probing.wait(self.probe_interval):
+            now = time.time()
+            for backend in self.backends:
+                if now - backend.last_used >= self.probe_interval:
+                    self.probe(backend)
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.counters)
+        stats['backends'] = [backend.stats() for backend in self.backends]
+        return stats
+
+    def close(self):
+        self.stop_probing.set()
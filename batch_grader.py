@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Concurrent batch grading of learner sentences or essays from a text/NDJSON file
+
+Items are graded with bounded concurrency through the tutor prompt and parser,
+written to SimpleDatabase in batched transactions, streamed to an NDJSON output
+file, and checkpointed so an interrupted run resumes where it stopped.
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List
+
+from rich.console import Console
+
+from english_tutor import EnglishTutor
+from response_cache import ResponseCache
+
+
+def read_items(path: str, paragraphs: bool = False) -> List[Dict]:
+    """Read items from NDJSON ({"id", "text", "username"?}) or plain text
+
+    Plain text is one item per line, or one item per blank-line separated
+    paragraph with paragraphs=True (essays).
+    """
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+
+    items = []
+    if path.endswith(('.ndjson', '.jsonl')):
+        for number, line in enumerate(content.splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            items.append({
+                'id': str(record.get('id', number)),
+                'text': record['text'],
+                'username': record.get('username')
+            })
+        return items
+
+    chunks = content.split('\n\n') if paragraphs else content.splitlines()
+    for number, chunk in enumerate(chunks, 1):
+        text = ' '.join(chunk.split())
+        if text:
+            items.append({'id': str(number), 'text': text, 'username': None})
+    return items
+
+
+class BatchGrader:
+    def __init__(self, username: str, level: str, output_path: str, concurrency: int = 4,
+                 flush_size: int = 25, response_cache: ResponseCache = None,
+                 db_path: str = "english_learning.db", coalesce: bool = True):
+        self.username = username
+        self.level = level
+        self.output_path = output_path
+        self.checkpoint_path = output_path + '.checkpoint'
+        self.concurrency = concurrency
+        self.flush_size = flush_size
+        self.response_cache = response_cache
+        self.db_path = db_path
+        self.coalesce = coalesce
+        self.console = Console()
+
+        self.tutors: Dict[str, EnglishTutor] = {}
+        self.completed = set()
+        self.conversations: Dict[str, int] = {}
+        self.pending: List[Dict] = []
+        self.stats = {'graded': 0, 'failed': 0, 'cached': 0, 'coalesced': 0, 'errors_found': 0}
+
+    def load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        self.completed = set(checkpoint.get('completed', []))
+        self.conversations = checkpoint.get('conversations', {})
+        self.console.print(f"↩️  Resuming: {len(self.completed)} items already graded", style="cyan")
+
+    def save_checkpoint(self):
+        """Write the checkpoint atomically so a crash never leaves it half-written"""
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'completed': sorted(self.completed), 'conversations': self.conversations}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _tutor_for(self, username: str) -> EnglishTutor:
+        """One tutor (user + conversation) per learner, created on the main thread"""
+        tutor = self.tutors.get(username)
+        if tutor is None:
+            # Learners sharing a sentence share the model call (the tutors' SingleFlights share one group)
+            tutor = EnglishTutor(username, self.level, response_cache=self.response_cache,
+                                 db_path=self.db_path, priority='batch', coalesce=self.coalesce)
+            tutor.conversation_id = self.conversations.get(username) or tutor.db.create_conversation(
+                tutor.user_id, tutor.preferred_level, "Batch grading"
+            )
+            self.conversations[username] = tutor.conversation_id
+            self.tutors[username] = tutor
+        return tutor
+
+    def flush(self, output):
+        """Write pending results to the database (one transaction per learner), output and checkpoint"""
+        if not self.pending:
+            return
+
+        by_user: Dict[str, List[Dict]] = {}
+        for result in self.pending:
+            by_user.setdefault(result['username'], []).append(result)
+        for username, results in by_user.items():
+            tutor = self.tutors[username]
+            # Keyed by output file: items stored before a crash lost the checkpoint aren't stored twice
+            tutor.db.store_graded_batch(tutor.user_id, tutor.conversation_id, results,
+                                        batch=os.path.abspath(self.output_path))
+
+        for result in self.pending:
+            output.write(json.dumps({
+                'id': result['id'],
+                'username': result['username'],
+                'text': result['content'],
+                'score': result['score'],
+                'errors': result['errors'],
+                'learning_notes': result['learning_notes'],
+                'reply': result['conversation'],
+                'cached': result['cached'],
+                'coalesced': result['coalesced'],
+                'response_time_ms': round(result['response_time_ms'], 1)
+            }, ensure_ascii=False) + '\n')
+            self.completed.add(result['id'])
+        output.flush()
+        self.save_checkpoint()
+        self.pending = []
+
+    def run(self, items: List[Dict]) -> Dict:
+        self.load_checkpoint()
+        todo = [item for item in items if item['id'] not in self.completed]
+        for item in todo:
+            item['username'] = item['username'] or self.username
+            self._tutor_for(item['username'])
+
+        self.console.print(f"📚 Grading {len(todo)} items with concurrency {self.concurrency}", style="bold cyan")
+        start = time.time()
+        last_report = start
+
+        def grade(item: Dict) -> Dict:
+            tutor = self.tutors[item['username']]
+            parsed = tutor.analyze_message(item['text'])
+            parsed.pop('usage', None)
+            parsed['coalesced'] = self.coalesce and not parsed['cached'] and tutor.completions.last_coalesced()
+            parsed.update({'id': item['id'], 'username': item['username'], 'content': item['text']})
+            return parsed
+
+        with open(self.output_path, 'a', encoding='utf-8') as output, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            queue = iter(todo)
+            in_flight = {}
+            # Keep a bounded window of submitted items so huge files don't sit in memory as futures
+            for item in queue:
+                in_flight[executor.submit(grade, item)] = item
+                if len(in_flight) >= self.concurrency * 2:
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                        self.pending.append(result)
+                        self.stats['graded'] += 1
+                        self.stats['cached'] += result['cached']
+                        self.stats['coalesced'] += result['coalesced']
+                        self.stats['errors_found'] += len(result['errors'])
+                    except Exception as e:
+                        # Not checkpointed, so a resumed run retries it
+                        self.stats['failed'] += 1
+                        self.console.print(f"❌ Item {item['id']}: {e}", style="red")
+
+                    next_item = next(queue, None)
+                    if next_item is not None:
+                        in_flight[executor.submit(grade, next_item)] = next_item
+
+                if len(self.pending) >= self.flush_size or (self.pending and time.time() - last_report > 2):
+                    self.flush(output)
+
+                if time.time() - last_report > 2:
+                    last_report = time.time()
+                    rate = self.stats['graded'] / (last_report - start)
+                    self.console.print(f"  ⏳ {self.stats['graded']}/{len(todo)} graded, {rate:.1f} items/s",
+                                       style="dim")
+
+            self.flush(output)
+
+        elapsed = time.time() - start
+        self.stats['seconds'] = round(elapsed, 2)
+        self.stats['items_per_second'] = round(self.stats['graded'] / elapsed, 2) if elapsed else 0.0
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch-grade learner sentences or essays')
+    parser.add_argument('input', help='Text file (one item per line) or NDJSON file ({"id", "text", "username"})')
+    parser.add_argument('--output', '-o', help='NDJSON results file (default: <input>.graded.ndjson)')
+    parser.add_argument('--username', '-u', default='batch', help='Learner for items without a username')
+    parser.add_argument('--level', '-l', default='B1', choices=['A1', 'A2', 'B1', 'B2', 'C1', 'C2'])
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help='Parallel model requests (default: 4)')
+    parser.add_argument('--flush-size', type=int, default=25, help='Results per database transaction (default: 25)')
+    parser.add_argument('--paragraphs', action='store_true', help='Treat blank-line separated paragraphs as items')
+    parser.add_argument('--cache', action='store_true', help='Reuse cached analyses for repeated sentences')
+    parser.add_argument('--no-coalesce', action='store_true',
+                        help='Send every item to the model, even when the same sentence is already being graded')
+
+    args = parser.parse_args()
+
+    if not os.environ.get('DEEPSEEK_API_KEY'):
+        print("❌ Error: DEEPSEEK_API_KEY environment variable not set")
+        print("Please set it with: export DEEPSEEK_API_KEY=your_api_key")
+        raise SystemExit(1)
+
+    output_path = args.output or os.path.splitext(args.input)[0] + '.graded.ndjson'
+    grader = BatchGrader(args.username, args.level, output_path, args.concurrency, args.flush_size,
+                         ResponseCache() if args.cache else None, coalesce=not args.no_coalesce)
+
+    stats = grader.run(read_items(args.input, args.paragraphs))
+
+    grader.console.print(
+        f"\n✅ Graded {stats['graded']} items ({stats['failed']} failed, {stats['cached']} from cache, "
+        f"{stats['coalesced']} shared an in-flight request) "
+        f"in {stats['seconds']}s — {stats['items_per_second']} items/s",
+        style="bold green"
+    )
+    grader.console.print(f"🔍 {stats['errors_found']} errors found, results in {output_path}")
+    if stats['failed']:
+        grader.console.print("Run the same command again to retry the failed items.", style="yellow")
+
+
+if __name__ == "__main__":
+    main()
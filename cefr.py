@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Compact CEFR word-level lexicon and local message level estimator
+
+The bundled word list is loaded once into two parallel sorted arrays (a tuple
+of lemmas and a bytes object of levels) and searched with bisect, which keeps
+startup and memory small. Levels are handled as numbers (A1=1 ... C2=6) so
+they can be averaged; level_name turns a number back into a label.
+"""
+import os
+import re
+from bisect import bisect_left
+from typing import Dict, FrozenSet, Iterator, Optional, Tuple
+
+from vocabulary import tokenize, lemmatize
+
+LEVELS = ['A1', 'A2', 'B1', 'B2', 'C1', 'C2']
+LEVEL_VALUES: Dict[str, int] = {name: value for value, name in enumerate(LEVELS, 1)}
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cefr_lexicon.txt')
+SENTENCE_END = re.compile(r'[.!?]+')
+
+
+def level_name(value: Optional[float]) -> Optional[str]:
+    """'B1' for 3.2, None for None"""
+    if value is None:
+        return None
+    return LEVELS[min(max(int(round(value)), 1), len(LEVELS)) - 1]
+
+
+def level_value(name: Optional[str]) -> Optional[int]:
+    """3 for 'B1', None for anything that isn't a CEFR level"""
+    return LEVEL_VALUES.get((name or '').upper())
+
+
+def read_lexicon(path: str = DEFAULT_LEXICON_PATH) -> Iterator[Tuple[int, str]]:
+    """(level, word) for every word in a lexicon file, as written"""
+    level = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('['):
+                level = LEVEL_VALUES[line.strip('[]')]
+                continue
+            for word in line.split():
+                yield level, word.lower()
+
+
+class CEFRLexicon:
+    """Sorted lemma array with a parallel array of numeric levels"""
+
+    __slots__ = ('words', 'levels')
+
+    def __init__(self, words: Tuple[str, ...], levels: bytes):
+        self.words = words
+        self.levels = levels
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_LEXICON_PATH) -> 'CEFRLexicon':
+        entries: Dict[str, int] = {}
+        for level, word in read_lexicon(path):
+            # Stored as lemmas so lookups match the vocabulary index
+            lemma = lemmatize(word)
+            if lemma not in entries or level < entries[lemma]:
+                entries[lemma] = level
+
+        words = tuple(sorted(entries))
+        return cls(words, bytes(entries[w] for w in words))
+
+    def level_of(self, lemma: str) -> Optional[int]:
+        index = bisect_left(self.words, lemma)
+        if index < len(self.words) and self.words[index] == lemma:
+            return self.levels[index]
+        return None
+
+    def __contains__(self, lemma: str) -> bool:
+        return self.level_of(lemma) is not None
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+
+_lexicon: Optional[CEFRLexicon] = None
+
+
+def get_lexicon() -> CEFRLexicon:
+    """Process-wide lexicon, loaded on first use"""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = CEFRLexicon.load()
+    return _lexicon
+
+
+_listed: Optional[FrozenSet[str]] = None
+
+
+def listed_words() -> FrozenSet[str]:
+    """The bundled lexicon's words as written, for the lemmatizer to check stems against"""
+    global _listed
+    if _listed is None:
+        _listed = frozenset(word for _, word in read_lexicon())
+    return _listed
+
+
+def word_level(lemma: str) -> Optional[str]:
+    """CEFR label of a lemma, None if it isn't in the lexicon"""
+    return level_name(get_lexicon().level_of(lemma))
+
+
+def estimate_level(text: str, lexicon: CEFRLexicon = None) -> Optional[float]:
+    """Numeric CEFR estimate (1.0-6.0) of a message, None if no word is in the lexicon
+
+    The level is set by the hardest quarter of the known words, nudged by sentence
+    length. Unknown words are ignored so misspellings don't read as advanced.
+    """
+    lexicon = lexicon or get_lexicon()
+    known = []
+    word_count = 0
+    for token in tokenize(text):
+        word_count += 1
+        level = lexicon.level_of(lemmatize(token))
+        if level is not None:
+            known.append(level)
+    if not known:
+        return None
+
+    known.sort(reverse=True)
+    hardest = known[:max(1, len(known) // 4)]
+    value = sum(hardest) / len(hardest)
+
+    sentences = max(1, len([s for s in SENTENCE_END.split(text) if s.strip()]))
+    words_per_sentence = word_count / sentences
+    if words_per_sentence < 6:
+        value -= 0.3
+    elif words_per_sentence > 18:
+        value += 0.3
+
+    return round(min(max(value, 1.0), 6.0), 2)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Process-wide OpenAI client factory backed by a shared keep-alive connection pool
+"""
+import os
+import threading
+import time
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from openai import OpenAI
+
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+
+
+def resolve_base_url(base_url: str = None) -> str:
+    """Explicit URL, else DEEPSEEK_BASE_URL (e.g. a local mock server), else the DeepSeek API"""
+    return base_url or os.environ.get('DEEPSEEK_BASE_URL') or DEFAULT_BASE_URL
+
+
+# Pool settings, overridable through configure_pool() or environment variables
+_pool_config = {
+    'max_connections': int(os.environ.get('TUTOR_POOL_MAX_CONNECTIONS', 20)),
+    'max_keepalive_connections': int(os.environ.get('TUTOR_POOL_MAX_KEEPALIVE', 10)),
+    'keepalive_expiry': float(os.environ.get('TUTOR_POOL_KEEPALIVE_EXPIRY', 60.0)),
+    'http2': os.environ.get('TUTOR_POOL_HTTP2', '1') != '0',
+    'timeout': float(os.environ.get('TUTOR_POOL_TIMEOUT', 60.0)),
+}
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+# Pools replaced by configure_pool(); clients handed out earlier still use them until close_pool()
+_retired: List[httpx.Client] = []
+_clients: Dict[Tuple[str, str], OpenAI] = {}
+_stats = {
+    'clients_created': 0,
+    'client_reuses': 0,
+    'requests_sent': 0,
+    'responses_received': 0,
+    'warmup_ms': None,
+    'warmup_error': None,
+}
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package"""
+    return importlib.util.find_spec('h2') is not None
+
+
+def configure_pool(**settings):
+    """Change pool settings for the clients get_client() returns from now on
+
+    Clients handed out earlier keep working on the previous pool, which stays open
+    until close_pool().
+    """
+    global _http_client
+    unknown = set(settings) - set(_pool_config)
+    if unknown:
+        raise ValueError(f"Unknown pool settings: {', '.join(sorted(unknown))}")
+
+    with _lock:
+        _pool_config.update(settings)
+        if _http_client is not None:
+            _retired.append(_http_client)
+        _http_client = None
+        _clients.clear()
+
+
+def _on_request(request):
+    with _lock:
+        _stats['requests_sent'] += 1
+
+
+def _on_response(response):
+    with _lock:
+        _stats['responses_received'] += 1
+
+
+def _get_http_client() -> httpx.Client:
+    """Return the shared httpx client, creating it on first use (caller holds _lock)"""
+    global _http_client
+    if _http_client is None:
+        limits = httpx.Limits(
+            max_connections=_pool_config['max_connections'],
+            max_keepalive_connections=_pool_config['max_keepalive_connections'],
+            keepalive_expiry=_pool_config['keepalive_expiry'],
+        )
+        _http_client = httpx.Client(
+            limits=limits,
+            http2=_pool_config['http2'] and http2_available(),
+            timeout=httpx.Timeout(_pool_config['timeout'], connect=10.0),
+            event_hooks={'request': [_on_request], 'response': [_on_response]},
+        )
+    return _http_client
+
+
+def get_client(api_key: str = None, base_url: str = None) -> OpenAI:
+    """Get an OpenAI client that shares the process-wide connection pool"""
+    api_key = api_key or os.environ.get('DEEPSEEK_API_KEY')
+    base_url = resolve_base_url(base_url)
+    key = (api_key or '', base_url)
+
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _stats['client_reuses'] += 1
+            return client
+
+        client = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=_get_http_client()
+        )
+        _clients[key] = client
+        _stats['clients_created'] += 1
+        return client
+
+
+def warm_up(base_url: str = None, background: bool = False):
+    """Open a connection to the API host ahead of the first turn"""
+    if background:
+        thread = threading.Thread(target=warm_up, args=(base_url,), daemon=True)
+        thread.start()
+        return thread
+
+    with _lock:
+        http_client = _get_http_client()
+
+    url = resolve_base_url(base_url).rstrip('/') + '/models'
+    api_key = os.environ.get('DEEPSEEK_API_KEY', '')
+    start_time = time.time()
+    error = None
+    try:
+        # Any response means TCP/TLS is established and the connection is pooled
+        http_client.get(url, headers={'Authorization': f'Bearer {api_key}'})
+    except httpx.HTTPError as e:
+        error = str(e)
+    with _lock:
+        _stats['warmup_error'] = error
+        _stats['warmup_ms'] = (time.time() - start_time) * 1000
+    return None
+
+
+def pool_stats() -> Dict:
+    """Snapshot of pool configuration, usage counters and open connections"""
+    with _lock:
+        stats = dict(_stats)
+        stats['config'] = dict(_pool_config)
+        stats['http2'] = _pool_config['http2'] and http2_available()
+        stats['open_connections'] = 0
+        stats['idle_connections'] = 0
+
+        # httpcore keeps its connection list on the transport's pool
+        pool = getattr(getattr(_http_client, '_transport', None), '_pool', None)
+        for connection in getattr(pool, 'connections', []):
+            stats['open_connections'] += 1
+            if connection.is_idle():
+                stats['idle_connections'] += 1
+
+    return stats
+
+
+def _close_locked():
+    global _http_client
+    for http_client in _retired + ([_http_client] if _http_client is not None else []):
+        http_client.close()
+    _retired.clear()
+    _http_client = None
+    _clients.clear()
+
+
+def close_pool():
+    """Close all pooled connections; the next get_client() starts a fresh pool"""
+    with _lock:
+        _close_locked()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-flight coalescing on a simulated classroom
+
+N learners at the same level each submit one sentence from a small pool
+(with stray whitespace, as typed), arriving at random times within a short
+window. Each runs through its own EnglishTutor against a local mock
+server, once with every request going upstream and once with coalescing:
+
+- grade:  tutor.analyze_message (non-streaming, as in batch_grader.py)
+- stream: tutor._open_stream on a fresh conversation; requests arriving
+          mid-stream replay the chunks they missed
+
+Reports upstream calls made, calls saved, latency and, for streams, that
+every learner received the complete reply.
+
+    uv run coalesce_benchmark.py --learners 30 --window-ms 1000
+"""
+import os
+import io
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+from typing import Dict, List
+
+from rich.console import Console
+
+from latency_stats import summarize
+from load_benchmark import LEARNER_SENTENCES
+from mock_server import MockCompletionServer, MockConfig
+
+
+def classroom(learners: int, pool: int, seed: int) -> List[str]:
+    """One sentence per learner from the first `pool` sentences, with random extra whitespace"""
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(learners):
+        words = rng.choice(LEARNER_SENTENCES[:pool]).split()
+        sentences.append('  '.join(words) + ' ' if rng.random() < 0.3 else ' '.join(words))
+    return sentences
+
+
+def run_mode(mode: str, coalesce: bool, sentences: List[str], args, db_path: str) -> Dict:
+    # Imported here so DEEPSEEK_BASE_URL is already pointing at the mock server
+    from english_tutor import EnglishTutor
+
+    server = MockCompletionServer(config=MockConfig(ttft_ms=args.ttft_ms, token_delay_ms=args.token_delay_ms,
+                                                    jitter_ms=0, seed=args.seed))
+    server.start()
+    os.environ['DEEPSEEK_BASE_URL'] = server.base_url
+
+    tutors = []
+    # Silence the per-tutor startup banners
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(len(sentences)):
+            tutor = EnglishTutor(f"classroom_{i}", 'B1', db_path=db_path, priority='batch', rules='off',
+                                 coalesce=coalesce)
+            tutor.console = Console(quiet=True)
+            tutors.append(tutor)
+
+    rng = random.Random(args.seed)
+    offsets = [rng.uniform(0, args.window_ms / 1000) for _ in sentences]
+    latencies: List[float] = [0.0] * len(sentences)
+    replies: List[str] = [''] * len(sentences)
+    failures: List[str] = []
+    start = time.perf_counter() + 0.05
+
+    def learner(i: int):
+        time.sleep(max(start + offsets[i] - time.perf_counter(), 0))
+        t = time.perf_counter()
+        try:
+            if mode == 'grade':
+                replies[i] = tutors[i].analyze_message(sentences[i])['conversation']
+            else:
+                tutors[i].context.clear()
+                for chunk in tutors[i]._open_stream(tutors[i]._build_messages(sentences[i])):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        replies[i] += chunk.choices[0].delta.content
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+        latencies[i] = (time.perf_counter() - t) * 1000
+
+    threads = [threading.Thread(target=learner, args=(i,)) for i in range(len(sentences))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    server.stop()
+
+    # Every learner with the same (normalized) sentence must have the same complete reply
+    complete = all(replies[i] for i in range(len(sentences)))
+    by_sentence: Dict[str, set] = {}
+    for sentence, reply in zip(sentences, replies):
+        by_sentence.setdefault(' '.join(sentence.split()), set()).add(reply)
+
+    stats = [tutor.completions.get_stats().get('single_flight', {}) for tutor in tutors]
+    return {
+        'mode': mode,
+        'coalesce': coalesce,
+        'requests': len(sentences),
+        'upstream_calls': server.stats['requests'],
+        'coalesced': sum(s.get('coalesced', 0) for s in stats),
+        'late_joins': sum(s.get('late_joins', 0) for s in stats),
+        'replayed_chunks': sum(s.get('replayed_chunks', 0) for s in stats),
+        'failed': len(failures),
+        'all_complete': complete,
+        'consistent': not coalesce or all(len(replies_) == 1 for replies_ in by_sentence.values()),
+        'wall_s': round(wall, 2),
+        'latency_ms': summarize(latencies),
+    }
+
+
+def print_report(results: List[Dict], learners: int, pool: int):
+    print(f"\n🏫 Classroom: {learners} learners, {pool} distinct sentences")
+    print(f"  {'mode':7} {'coalesce':9} {'upstream':>9} {'saved':>6} {'late':>5} {'replayed':>9} "
+          f"{'p50':>8} {'p95':>8} {'complete':>9}")
+    for r in results:
+        ok = '✅' if r['all_complete'] and r['consistent'] and not r['failed'] else f"❌ {r['failed']} failed"
+        print(f"  {r['mode']:7} {('on' if r['coalesce'] else 'off'):9} {r['upstream_calls']:9} {r['coalesced']:6} "
+              f"{r['late_joins']:5} {r['replayed_chunks']:9} {r['latency_ms']['p50']:5.0f} ms "
+              f"{r['latency_ms']['p95']:5.0f} ms {ok:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upstream calls saved by single-flight coalescing')
+    parser.add_argument('--learners', '-n', type=int, default=30, help='Learners in the classroom (default: 30)')
+    parser.add_argument('--sentences', type=int, default=4, help='Distinct sentences they submit (default: 4)')
+    parser.add_argument('--window-ms', type=float, default=1000.0,
+                        help='Learners arrive at random within this window (default: 1000)')
+    parser.add_argument('--ttft-ms', type=float, default=300.0, help='Mock time to first token (default: 300)')
+    parser.add_argument('--token-delay-ms', type=float, default=15.0, help='Mock delay between tokens (default: 15)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', '-o', help='Save the results as JSON')
+
+    args = parser.parse_args()
+    os.environ.setdefault('DEEPSEEK_API_KEY', 'mock')
+
+    sentences = classroom(args.learners, args.sentences, args.seed)
+    workdir = tempfile.mkdtemp(prefix='coalesce_bench_')
+    try:
+        results = [run_mode(mode, coalesce, sentences, args, os.path.join(workdir, f"{mode}_{coalesce}.db"))
+                   for mode in ('grade', 'stream') for coalesce in (False, True)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results, args.learners, args.sentences)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
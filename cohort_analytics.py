@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Cohort-wide analytics across all learners
+
+Answers questions the per-user reports can't ("which error types dominate at
+B1 vs B2", "median errors per message by week of study"). The message table
+is cut into contiguous message_id shards; a worker process aggregates each
+shard with grouped queries on its own read-only connection (SQLite does the
+row work, Python only sees a few hundred grouped rows) and returns a partial
+aggregate of counters and histograms. Partials merge by addition, so the job
+scales with cores and needs no per-user state across shards.
+
+    uv run cohort_analytics.py --db english_learning.db --workers 4 -o cohort.json
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+LEVEL_ORDER = ['A1', 'A2', 'B1', 'B2', 'C1', 'C2']
+
+
+class CohortAggregate:
+    """Mergeable partial statistics: per level, per level and error type, per week of study"""
+
+    def __init__(self):
+        self.level_messages = Counter()
+        self.level_words = Counter()
+        self.level_errors = Counter()
+        self.level_users: Dict[str, set] = {}
+        self.level_types: Dict[str, Counter] = {}
+        self.level_severity: Dict[str, Counter] = {}
+        # Histograms of errors per message (count -> messages), exact medians after merging
+        self.level_histogram: Dict[str, Counter] = {}
+        self.week_histogram: Dict[int, Counter] = {}
+        self.messages = 0
+
+    def add_messages(self, level: str, week: int, errors: int, messages: int, words: int):
+        """`messages` messages at a level and week of study, each with `errors` errors"""
+        self.level_messages[level] += messages
+        self.level_words[level] += words
+        self.level_errors[level] += errors * messages
+        self.level_histogram.setdefault(level, Counter())[errors] += messages
+        self.week_histogram.setdefault(week, Counter())[errors] += messages
+        self.messages += messages
+
+    def add_errors(self, level: str, error_type: str, severity: str, count: int):
+        self.level_types.setdefault(level, Counter())[error_type] += count
+        self.level_severity.setdefault(level, Counter())[severity] += count
+
+    def merge(self, other: 'CohortAggregate') -> 'CohortAggregate':
+        self.level_messages.update(other.level_messages)
+        self.level_words.update(other.level_words)
+        self.level_errors.update(other.level_errors)
+        for level, users in other.level_users.items():
+            self.level_users.setdefault(level, set()).update(users)
+        for mine, theirs in ((self.level_types, other.level_types),
+                             (self.level_severity, other.level_severity),
+                             (self.level_histogram, other.level_histogram),
+                             (self.week_histogram, other.week_histogram)):
+            for key, counts in theirs.items():
+                mine.setdefault(key, Counter()).update(counts)
+        self.messages += other.messages
+        return self
+
+
+def histogram_stats(histogram: Counter) -> Dict:
+    """Mean, median and p75 of errors per message from a count histogram"""
+    total = sum(histogram.values())
+    if not total:
+        return {'messages': 0, 'mean': 0.0, 'median': 0, 'p75': 0}
+
+    def percentile(share: float) -> int:
+        target = share * (total - 1)
+        seen = 0
+        for value in sorted(histogram):
+            seen += histogram[value]
+            if seen > target:
+                return value
+        return max(histogram)
+
+    return {
+        'messages': total,
+        'mean': round(sum(value * count for value, count in histogram.items()) / total, 2),
+        'median': percentile(0.5),
+        'p75': percentile(0.75)
+    }
+
+
+def aggregate_shard(db_path: str, first_id: int, last_id: int) -> CohortAggregate:
+    """Aggregate user messages with message_id in [first_id, last_id] (runs in a worker process)"""
+    aggregate = CohortAggregate()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30.0)
+    try:
+        # Messages by level, week since sign-up and number of errors on the message
+        rows = conn.execute('''
+            SELECT level, week, errors, COUNT(*), SUM(words) FROM (
+                SELECT UPPER(IFNULL(c.english_level, '?')) as level,
+                       MAX(0, (unixepoch(m.timestamp) - unixepoch(u.created_at)) / 604800) as week,
+                       IFNULL(m.word_count, 0) as words,
+                       (SELECT COUNT(*) FROM errors e WHERE e.message_id = m.message_id) as errors
+                FROM messages m
+                JOIN conversations c ON m.conversation_id = c.conversation_id
+                JOIN users u ON u.user_id = c.user_id
+                WHERE m.message_id BETWEEN ? AND ? AND m.role = 'user'
+            )
+            GROUP BY level, week, errors
+        ''', (first_id, last_id))
+        for level, week, errors, messages, words in rows:
+            aggregate.add_messages(level, week, errors, messages, words)
+
+        rows = conn.execute('''
+            SELECT UPPER(IFNULL(c.english_level, '?')), e.error_type, IFNULL(e.severity, 'minor'), COUNT(*)
+            FROM messages m
+            JOIN conversations c ON m.conversation_id = c.conversation_id
+            JOIN errors e ON e.message_id = m.message_id
+            WHERE m.message_id BETWEEN ? AND ? AND m.role = 'user'
+            GROUP BY 1, 2, 3
+        ''', (first_id, last_id))
+        for level, error_type, severity, count in rows:
+            aggregate.add_errors(level, error_type, severity, count)
+
+        # Learners can appear in several shards, so they are kept as sets until the merge
+        rows = conn.execute('''
+            SELECT DISTINCT UPPER(IFNULL(c.english_level, '?')), c.user_id
+            FROM messages m
+            JOIN conversations c ON m.conversation_id = c.conversation_id
+            WHERE m.message_id BETWEEN ? AND ? AND m.role = 'user'
+        ''', (first_id, last_id))
+        for level, user_id in rows:
+            aggregate.level_users.setdefault(level, set()).add(user_id)
+    finally:
+        conn.close()
+    return aggregate
+
+
+def plan_shards(db_path: str, shards: int) -> List[Tuple[int, int]]:
+    """Split the message_id range into contiguous, roughly equal id ranges"""
+    conn = sqlite3.connect(db_path, timeout=10.0)
+    first, last = conn.execute('SELECT MIN(message_id), MAX(message_id) FROM messages').fetchone()
+    conn.close()
+    if first is None:
+        return []
+    size = max(1, (last - first + shards) // shards)
+    return [(start, min(start + size - 1, last)) for start in range(first, last + 1, size)]
+
+
+def run_cohort(db_path: str = "english_learning.db", workers: int = None,
+               shards_per_worker: int = 4) -> Tuple[CohortAggregate, Dict]:
+    """Aggregate every shard across a process pool; returns the merged aggregate and timing"""
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    # Several shards per worker so an unevenly filled id range doesn't leave cores idle
+    shards = plan_shards(db_path, workers * shards_per_worker)
+
+    merged = CohortAggregate()
+    if workers == 1:
+        for first_id, last_id in shards:
+            merged.merge(aggregate_shard(db_path, first_id, last_id))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(aggregate_shard, db_path, first_id, last_id) for first_id, last_id in shards]
+            for future in futures:
+                merged.merge(future.result())
+
+    timing = {'workers': workers, 'shards': len(shards), 'messages': merged.messages,
+              'elapsed_s': round(time.perf_counter() - start, 2)}
+    return merged, timing
+
+
+def build_report(aggregate: CohortAggregate, top_types: int = 5) -> Dict:
+    levels = {}
+    ordered = sorted(aggregate.level_messages, key=lambda l: (LEVEL_ORDER.index(l) if l in LEVEL_ORDER else 99, l))
+    for level in ordered:
+        errors = aggregate.level_errors[level]
+        types = aggregate.level_types.get(level, Counter())
+        levels[level] = {
+            'users': len(aggregate.level_users.get(level, ())),
+            'messages': aggregate.level_messages[level],
+            'words': aggregate.level_words[level],
+            'errors': errors,
+            'errors_per_100_words': round(100 * errors / aggregate.level_words[level], 2)
+                                    if aggregate.level_words[level] else None,
+            'errors_per_message': histogram_stats(aggregate.level_histogram.get(level, Counter())),
+            'error_types': {error_type: {'count': count, 'share': round(count / errors, 3)}
+                            for error_type, count in types.most_common(top_types)},
+            'severity': dict(aggregate.level_severity.get(level, Counter()))
+        }
+
+    weeks = {week: histogram_stats(histogram) for week, histogram in sorted(aggregate.week_histogram.items())}
+    return {'levels': levels, 'weeks_of_study': weeks}
+
+
+def print_report(report: Dict, timing: Optional[Dict] = None):
+    console = Console()
+
+    table = Table(title="👥 Cohort by Level")
+    for column in ("Level", "Users", "Messages", "Errors/100w", "Median/msg", "Top error types"):
+        table.add_column(column, justify="left" if column in ("Level", "Top error types") else "right")
+    for level, stats in report['levels'].items():
+        top = ", ".join(f"{error_type} {info['share']:.0%}" for error_type, info in
+                        list(stats['error_types'].items())[:3])
+        rate = stats['errors_per_100_words']
+        table.add_row(level, str(stats['users']), str(stats['messages']),
+                      "-" if rate is None else f"{rate:.1f}",
+                      str(stats['errors_per_message']['median']), top or "-")
+    console.print(table)
+
+    weeks = Table(title="📅 Errors per Message by Week of Study")
+    for column in ("Week", "Messages", "Mean", "Median", "P75"):
+        weeks.add_column(column, justify="right")
+    for week, stats in report['weeks_of_study'].items():
+        weeks.add_row(str(week + 1), str(stats['messages']), f"{stats['mean']:.2f}",
+                      str(stats['median']), str(stats['p75']))
+    console.print(weeks)
+
+    if timing:
+        console.print(f"⏱️  {timing['messages']} messages in {timing['elapsed_s']}s "
+                      f"({timing['workers']} workers, {timing['shards']} shards)", style="dim")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cohort analytics across all learners')
+    parser.add_argument('--db', default='english_learning.db', help='Database file (default: english_learning.db)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--shards-per-worker', type=int, default=4, help='Shards per worker (default: 4)')
+    parser.add_argument('--top-types', type=int, default=5, help='Error types listed per level (default: 5)')
+    parser.add_argument('--output', '-o', help='Save the report as JSON')
+
+    args = parser.parse_args()
+
+    aggregate, timing = run_cohort(args.db, args.workers, args.shards_per_worker)
+    report = build_report(aggregate, args.top_types)
+    print_report(report, timing)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict(report, timing=timing), f, indent=2)
+        print(f"\n💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-session memory footprint of the chat history
+
+Plays S concurrent sessions of N turns (learner message plus tutor reply)
+through two history layouts and measures what each session still holds
+afterwards with tracemalloc:
+
+- list:   every message kept as a {"role", "content"} dict in a growing list
+          (the original conversation_history)
+- window: ContextWindow, slotted Message records in a fixed-capacity ring
+          plus the rolling summary
+
+It also times one turn (add both messages, build the API payload).
+"""
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Dict, List
+
+from context_window import ContextWindow
+from latency_stats import summarize
+from load_benchmark import LEARNER_SENTENCES
+
+TUTOR_REPLY = ("That sounds great! Could you tell me a bit more about it? For example, what did you "
+               "enjoy most, and would you do it again? I'd love to hear the details.")
+
+
+class ListHistory:
+    """The original layout: one dict per message in an ever-growing list"""
+
+    def __init__(self):
+        self.conversation_history: List[Dict] = []
+
+    def add(self, role: str, content: str):
+        self.conversation_history.append({"role": role, "content": content})
+
+    def messages(self) -> List[Dict]:
+        return self.conversation_history
+
+
+LAYOUTS = {'list': ListHistory, 'window': ContextWindow}
+
+
+def play(history, turns: int, offset: int = 0, timings: List[float] = None):
+    """Run `turns` turns; every message is a distinct string, as in a real session"""
+    for turn in range(turns):
+        start = time.perf_counter()
+        history.add('user', f"{LEARNER_SENTENCES[(turn + offset) % len(LEARNER_SENTENCES)]} ({turn})")
+        history.messages()
+        history.add('assistant', f"{TUTOR_REPLY} [{turn}]")
+        if timings is not None:
+            timings.append((time.perf_counter() - start) * 1e6)
+
+
+def measure(layout: str, sessions: int, turns: int) -> Dict:
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    timings: List[float] = []
+    histories = []
+    for session in range(sessions):
+        history = LAYOUTS[layout]()
+        play(history, turns, session, timings if session == 0 else None)
+        histories.append(history)
+
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    messages = len(histories[0].messages())
+    del histories
+
+    per_session = (retained - before) / sessions
+    return {
+        'layout': layout,
+        'sessions': sessions,
+        'turns': turns,
+        'messages_held': messages,
+        'per_session_kb': round(per_session / 1024, 1),
+        'total_mb': round((retained - before) / 1024 / 1024, 2),
+        'peak_mb': round((peak - before) / 1024 / 1024, 2),
+        'turn_us': summarize(timings),
+    }
+
+
+def print_report(results: List[Dict]):
+    print(f"\n🧠 Chat history footprint: {results[0]['sessions']} sessions x {results[0]['turns']} turns")
+    print(f"  {'layout':8} {'messages':>9} {'per session':>14} {'total':>10} {'turn p50':>10} {'turn p95':>10}")
+    for result in results:
+        print(f"  {result['layout']:8} {result['messages_held']:9} {result['per_session_kb']:11.1f} KB "
+              f"{result['total_mb']:7.2f} MB {result['turn_us']['p50']:7.1f} us {result['turn_us']['p95']:7.1f} us")
+    if len(results) == 2 and results[1]['per_session_kb']:
+        print(f"\n  window holds {results[0]['per_session_kb'] / results[1]['per_session_kb']:.0f}x less per session")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-session memory of the chat history layouts')
+    parser.add_argument('--sessions', type=int, default=20, help='Concurrent sessions (default: 20)')
+    parser.add_argument('--turns', type=int, default=10000, help='Turns per session (default: 10000)')
+    parser.add_argument('--output', '-o', help='Save the results as JSON')
+
+    args = parser.parse_args()
+
+    results = [measure(layout, args.sessions, args.turns) for layout in LAYOUTS]
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
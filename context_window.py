@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted sliding context window with a rolling summary of older turns
+
+Turns are kept as slotted Message records (role, content, token estimate and
+the API payload dict, built on first use and then reused every turn) in a
+fixed-capacity ring buffer, so a session holds at most `max_turns` records
+however long it runs, and sending the window doesn't rebuild its dicts.
+"""
+import sys
+from collections import deque
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate (~4 characters per token for English text)"""
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+# Fixed per-message overhead for role markers and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class Message:
+    """One chat message with its token estimate; payload() is the (shared, read-only) API dict"""
+
+    __slots__ = ('role', 'content', 'tokens', '_payload')
+
+    def __init__(self, role: str, content: str, tokens: int = None):
+        # A handful of distinct roles, one string object each
+        self.role = sys.intern(role)
+        self.content = content
+        self.tokens = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS if tokens is None else tokens
+        self._payload = None
+
+    def payload(self) -> Dict:
+        if self._payload is None:
+            self._payload = {"role": self.role, "content": self.content}
+        return self._payload
+
+
+class MessageRing:
+    """Fixed-capacity ring of messages, oldest first; appending to a full ring evicts the oldest"""
+
+    __slots__ = ('slots', 'start', 'size')
+
+    def __init__(self, capacity: int):
+        self.slots: List[Optional[Message]] = [None] * max(1, capacity)
+        self.start = 0
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.slots)
+
+    def append(self, message: Message) -> Optional[Message]:
+        """Add at the newest end, return the message evicted to make room (None if there was room)"""
+        capacity = len(self.slots)
+        if self.size < capacity:
+            self.slots[(self.start + self.size) % capacity] = message
+            self.size += 1
+            return None
+        evicted = self.slots[self.start]
+        self.slots[self.start] = message
+        self.start = (self.start + 1) % capacity
+        return evicted
+
+    def popleft(self) -> Message:
+        if not self.size:
+            raise IndexError("pop from an empty MessageRing")
+        message = self.slots[self.start]
+        self.slots[self.start] = None
+        self.start = (self.start + 1) % len(self.slots)
+        self.size -= 1
+        return message
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.start = 0
+        self.size = 0
+
+    def __iter__(self) -> Iterator[Message]:
+        # At most two slices of the backing list, no per-item index arithmetic
+        end = self.start + self.size
+        if end <= len(self.slots):
+            return iter(self.slots[self.start:end])
+        return chain(self.slots[self.start:], self.slots[:end - len(self.slots)])
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def summarize_turn(role: str, content: str, max_words: int = 25) -> str:
+    """Extractive one-line summary of a single turn (first sentence, trimmed)"""
+    text = ' '.join(content.split())
+    for end in ('. ', '? ', '! '):
+        cut = text.find(end)
+        if cut != -1:
+            text = text[:cut + 1]
+            break
+
+    words = text.split()
+    if len(words) > max_words:
+        text = ' '.join(words[:max_words]) + '...'
+
+    speaker = 'Learner' if role == 'user' else 'Tutor'
+    return f"{speaker}: {text}"
+
+
+class ContextWindow:
+    """Keeps the last N turns within a token budget and folds older turns into a summary"""
+
+    def __init__(self, max_turns: int = 12, token_budget: int = 2000,
+                 summary_budget: int = 300,
+                 summarizer: Optional[Callable[[str, List[Dict]], str]] = None):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        # Optional custom summarizer: (previous_summary, folded_messages) -> new summary
+        self.summarizer = summarizer
+
+        self.turns = MessageRing(max_turns)
+        self.turn_tokens = 0
+        self.summary_lines = deque()
+        self.summary_tokens = 0
+        self._summary_cache = ''
+        self._summary_payload = None
+        self.folded_turns = 0
+
+    def add(self, role: str, content: str):
+        """Append a turn and fold the oldest turns out of the window if over budget"""
+        message = Message(role, content)
+        folded = []
+        # A full ring hands back the oldest turn
+        evicted = self.turns.append(message)
+        if evicted is not None:
+            self.turn_tokens -= evicted.tokens
+            folded.append(evicted)
+        self.turn_tokens += message.tokens
+
+        # Never fold the turn that was just added
+        while len(self.turns) > 1 and self.turn_tokens > self.token_budget:
+            old = self.turns.popleft()
+            self.turn_tokens -= old.tokens
+            folded.append(old)
+
+        if folded:
+            self._fold(folded)
+
+    def _fold(self, folded: List[Message]):
+        """Incrementally update the cached rolling summary with newly folded turns"""
+        self.folded_turns += len(folded)
+        self._summary_payload = None
+
+        if self.summarizer:
+            self._summary_cache = self.summarizer(self._summary_cache, [m.payload() for m in folded])
+            self.summary_tokens = estimate_tokens(self._summary_cache)
+            return
+
+        for message in folded:
+            line = summarize_turn(message.role, message.content)
+            self.summary_lines.append(line)
+            self.summary_tokens += estimate_tokens(line) + 1
+
+        # Drop the oldest summary lines once the summary itself is over budget
+        while len(self.summary_lines) > 1 and self.summary_tokens > self.summary_budget:
+            dropped = self.summary_lines.popleft()
+            self.summary_tokens -= estimate_tokens(dropped) + 1
+
+        self._summary_cache = '\n'.join(self.summary_lines)
+
+    @property
+    def summary(self) -> str:
+        return self._summary_cache
+
+    def messages(self) -> List[Dict]:
+        """Summary (if any) followed by the recent turns, in API message format"""
+        messages = []
+        if self._summary_cache:
+            if self._summary_payload is None:
+                self._summary_payload = {
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation:\n{self._summary_cache}"
+                }
+            messages.append(self._summary_payload)
+        messages.extend(message.payload() for message in self.turns)
+        return messages
+
+    def total_tokens(self) -> int:
+        """Estimated prompt tokens contributed by the window"""
+        summary = self.summary_tokens + MESSAGE_OVERHEAD_TOKENS if self._summary_cache else 0
+        return self.turn_tokens + summary
+
+    def clear(self):
+        self.turns.clear()
+        self.turn_tokens = 0
+        self.summary_lines.clear()
+        self.summary_tokens = 0
+        self._summary_cache = ''
+        self._summary_payload = None
+        self.folded_turns = 0
+
+    def __len__(self) -> int:
+        return len(self.turns)
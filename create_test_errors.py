@@ -106,16 +106,13 @@ def create_test_data():
     # Add messages to database
     for i, msg_data in enumerate(test_messages):
         # Add user message
-        message_id = db.add_message_with_ai_analysis(
+        db.add_message_with_ai_analysis(
             conversation_id,
             'user',
             msg_data['content'],
             {'errors': msg_data['errors'], 'score': 75 - len(msg_data['errors']) * 5}
         )
 
-        # Add errors separately
-        db._store_errors_from_ai(message_id, msg_data['errors'])
-
         # Add AI response
         ai_response = f"Thanks for sharing! I notice you said '{msg_data['content']}'. Let me help you with that."
         db.add_message_with_ai_analysis(
@@ -1,11 +1,8 @@
 #!/usr/bin/env python3
 # Please install OpenAI SDK first: `pip3 install openai`
-import os
-from openai import OpenAI
+from client_pool import get_client
 
-client = OpenAI(
-    api_key=os.environ.get('DEEPSEEK_API_KEY'),
-    base_url="https://api.deepseek.com")
+client = get_client()
 
 response = client.chat.completions.create(
     model="deepseek-chat",
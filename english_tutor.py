@@ -8,92 +8,137 @@ import json
 import sys
 import time
 import argparse
-import sqlite3
+import threading
+from concurrent.futures import TimeoutError as AnalysisTimeout
 from datetime import datetime
-from openai import OpenAI
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.prompt import Prompt
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 from simple_database import SimpleDatabase
+from client_pool import get_client, warm_up
+from context_window import ContextWindow
+from prompt_templates import LEVEL_PROMPTS, get_system_prompt, get_conversation_prompt, cache_usage
+from response_cache import ResponseCache
+from resilient_client import ResilientCompletions, CircuitOpenError, CompletionTimeout
+from backend_router import BackendRouter, load_backends
+from single_flight import SingleFlight
+from request_scheduler import get_scheduler
+from error_analysis import ErrorAnalyzer, ERROR_TYPES
+from rule_checker import check_message, merge_findings, format_hint
+from cefr import level_name
+from review_queue import ReviewQueue, grade_answer, format_review_hint
+from error_viewer import ErrorViewer, PAGE_SIZE
+from turn_profiler import TurnProfiler, NullProfiler
+from tracing import Tracer, NullTracer, SpanWriter, TracedDatabase, DEFAULT_TRACE_FILE
+from metrics import REGISTRY, serve as serve_metrics, dump_periodically, write_file as write_metrics_file
+
+# Service metrics (--metrics-port / --metrics-file); label children are bound once here
+TURNS = REGISTRY.counter('tutor_turns_total', 'Conversation turns answered')
+TOKENS = REGISTRY.counter('tutor_tokens_total', 'Tokens reported by the API for conversation turns', ('kind',))
+PROMPT_TOKENS = TOKENS.labels('prompt')
+COMPLETION_TOKENS = TOKENS.labels('completion')
+CACHE_HIT_TOKENS = TOKENS.labels('cache_hit')
+TIME_TO_FIRST_TOKEN = REGISTRY.histogram('tutor_time_to_first_token_seconds',
+                                         'Request start (including rate-limit wait) to first reply token')
+DB_WRITE = REGISTRY.histogram('tutor_db_write_seconds', 'SQLite write latency per turn operation', ('operation',))
+DB_WRITE_USER_MESSAGE = DB_WRITE.labels('user_message')
+DB_WRITE_ERRORS = DB_WRITE.labels('errors')
+DB_WRITE_ASSISTANT_MESSAGE = DB_WRITE.labels('assistant_message')
+DB_WRITE_PROGRESS = DB_WRITE.labels('progress')
+PARSE_FAILURES = REGISTRY.counter('tutor_parse_failures_total', 'Corrections that could not be parsed', ('source',))
+REPLY_PARSE_FAILURES = PARSE_FAILURES.labels('reply')
+ANALYSIS_PARSE_FAILURES = PARSE_FAILURES.labels('analysis')
+ERRORS_DETECTED = REGISTRY.counter('tutor_errors_detected_total', 'Learner errors stored, by type', ('error_type',))
+# Types outside the known set share one child, so the model can't grow the label set
+ERRORS_BY_TYPE = {error_type: ERRORS_DETECTED.labels(error_type) for error_type in sorted(ERROR_TYPES)}
+OTHER_ERRORS = ERRORS_DETECTED.labels('other')
+ACTIVE_SESSIONS = REGISTRY.gauge('tutor_active_sessions', 'Interactive sessions currently running')
 
 class EnglishTutor:
-    def __init__(self, username: str = None, level: str = 'B1'):
-        self.client = OpenAI(
-            api_key=os.environ.get('DEEPSEEK_API_KEY'),
-            base_url="https://api.deepseek.com"
-        )
-        self.db = SimpleDatabase()
+    def __init__(self, username: str = None, level: str = 'B1',
+                 response_cache: ResponseCache = None, db_path: str = "english_learning.db",
+                 hedge: bool = False, priority: str = 'interactive', dual_call: bool = False,
+                 rules: str = 'hint', weave_reviews: bool = False, profiler: TurnProfiler = None,
+                 tracer: Tracer = None, backends: Dict = None, coalesce: bool = False):
+        self.client = get_client()
+        self.db = SimpleDatabase(db_path)
+        # Trace spans per turn (--trace); with a tracer every database call gets its own span
+        self.tracer = tracer or NullTracer()
+        if tracer:
+            self.db = TracedDatabase(self.db, tracer)
         self.console = Console()
+        # Seconds per character of the reply's typing effect (0 turns it off, e.g. in benchmarks)
+        self.typing_delay = 0.01
 
         # Initialize user and conversation
         self.username = username or f"user_{int(time.time())}"
+
+        # Deadlines, retries, circuit breaker and optional hedging around every completion call,
+        # admitted by the shared rate limiter when one is configured (interactive turns go ahead of batch work).
+        # With a backend config (load_backends) each request goes to the fastest healthy backend.
+        completion_options = dict(hedge=hedge, scheduler=get_scheduler(), user=self.username, priority=priority)
+        self.router = None
+        if backends:
+            self.router = BackendRouter(backends['backends'], backends.get('probe_interval', 60.0),
+                                        **completion_options)
+            self.completions = self.router
+        else:
+            self.completions = ResilientCompletions(self.client, **completion_options)
+        # Identical requests in flight at the same time (same sentence, level and prompt) share one call
+        if coalesce:
+            self.completions = SingleFlight(self.completions)
         self.preferred_level = level.upper()
         self.user_id = self.db.get_or_create_user(self.username, self.preferred_level)
         self.conversation_id = None
-        self.conversation_history = []
-
-        # CEFR level prompts
-        self.level_prompts = {
-            'A1': "You are talking to an English beginner. Use simple words (CEFR A1), short sentences, and basic grammar.",
-            'A2': "You are talking to an elementary English learner. Use common vocabulary (CEFR A2) and simple compound sentences.",
-            'B1': "You are talking to an intermediate English learner. Use moderate vocabulary (CEFR B1) and some complex sentences.",
-            'B2': "You are talking to an upper-intermediate learner. Use rich vocabulary (CEFR B2) and varied sentence structures.",
-            'C1': "You are talking to an advanced English learner. Use sophisticated vocabulary (CEFR C1) and complex grammar.",
-            'C2': "You are talking to a proficient English speaker. Use native-level vocabulary and natural expressions."
-        }
+        self.last_user_message_id = None
+        # Recent turns within a token budget; older turns folded into a summary
+        self.context = ContextWindow()
 
-    def _create_ai_prompt(self, user_message: str) -> str:
-        """Create AI prompt with seamless conversation and optional error guidance"""
-        return f"""
-You are having a natural conversation with a {self.preferred_level} English learner. Your goal is to have an interesting, engaging conversation while subtly providing language learning support.
-
-**Conversation Style:**
-- Be natural, friendly, and conversational
-- Focus on the topic/content the user wants to discuss
-- Use {self.preferred_level} level English that's accessible but slightly challenging
-- Ask follow-up questions to keep the conversation flowing
-
-**Learning Support (Subtle):**
-- If the user makes major errors that seriously hinder communication, you can gently provide minimal correction
-- Focus on conversation flow over grammar perfection
-- Only highlight errors that truly matter for comprehension
-- Provide corrections as gentle suggestions, not strict corrections
-
-**Response Format:**
-PART 1: Natural conversation response (main focus)
-PART 2: Optional brief learning notes (only if there are significant errors)
-
-Format your response as:
-```
-[NATURAL CONVERSATION RESPONSE - This should be your main response, focusing on the topic]
-
----
-[LEARNING NOTES - Only include this section if there are 1-2 significant errors that affect communication. Keep it very brief and encouraging. If no significant errors, don't include this section.]
-Error found: "original text" → "correction" - brief explanation
-```
-
-**Guidelines for Learning Notes:**
-- Only include for major errors (not minor typos or grammar slips)
-- Maximum 1-2 learning notes per response
-- Keep explanations very brief and encouraging
-- Focus on communication effectiveness
-- If the user's English is perfectly understandable, skip the learning section entirely
-
-**Remember:** The goal is natural conversation with minimal learning interruptions. Don't overwhelm with corrections.
-
-User message: "{user_message}"
-"""
+        # CEFR level prompts and the precompiled, cache-friendly system prompt
+        self.level_prompts = LEVEL_PROMPTS
+        self.system_prompt = get_system_prompt(self.preferred_level)
+
+        # Cumulative provider prompt-cache usage for this session
+        self.cache_stats = {'turns': 0, 'prompt_tokens': 0, 'cache_hit_tokens': 0}
+
+        # Optional cache of single-message analyses (batch grading and test modes)
+        self.response_cache = response_cache
+
+        # Dual-call mode: a correction-free reply streams while a JSON-mode analysis runs alongside
+        self.analyzer = ErrorAnalyzer(self.completions) if dual_call else None
+        self.conversation_prompt = get_conversation_prompt(self.preferred_level)
+        self.pending_analysis = None   # (future, user message) not yet shown to the learner
+        self.analysis_lock = threading.Lock()
+        self.analysis_submitted = False
+
+        # Local pre-checker: 'off', 'hint' (tell the model what is already corrected)
+        # or 'skip' (no model corrections for turns the rules already cover)
+        self.rules = rules
+        self.rule_errors: List[Dict] = []
+
+        # Spaced-repetition schedule of past mistakes, loaded on first use; with weave_reviews
+        # due items are slipped into the conversation (each at most once per session)
+        self.reviews = None
+        self.weave_reviews = weave_reviews
+        self.woven_reviews = set()
+
+        # Per-stage turn timings (--profile); a no-op unless a TurnProfiler is passed in
+        self.profiler = profiler or NullProfiler()
+
+    def _create_ai_prompt(self) -> str:
+        """Return the static per-level system prompt (identical on every turn)"""
+        return self.system_prompt
 
     def start_conversation(self, topic: str = None):
         """Start a new conversation session"""
         self.conversation_id = self.db.create_conversation(
             self.user_id, self.preferred_level, topic
         )
-        self.conversation_history = []
+        self.context.clear()
 
         self.console.print(Panel.fit(
             f"🎓 English Tutor Started\n"
@@ -103,32 +148,201 @@ User message: "{user_message}"
             title="Welcome"
         ))
 
+    def resume_conversation(self, conversation_id: int = None, limit: int = 40) -> bool:
+        """Continue an earlier conversation (the latest by default) instead of starting a new one
+
+        Only the last `limit` messages are loaded; the context window keeps the newest turns
+        and folds the rest into its summary, as if the conversation had never stopped.
+        """
+        start = time.perf_counter()
+        state = self.db.get_conversation_state(self.user_id, conversation_id, limit)
+        if not state:
+            self.console.print(
+                f"❌ No conversation {conversation_id} for {self.username}" if conversation_id
+                else f"❌ No earlier conversation for {self.username}", style="red")
+            return False
+
+        self.conversation_id = state['conversation_id']
+        level = (state['english_level'] or self.preferred_level).upper()
+        if level != self.preferred_level and level in LEVEL_PROMPTS:
+            # Keep the level the conversation was held at (and its prompts)
+            self.preferred_level = level
+            self.system_prompt = get_system_prompt(level)
+            self.conversation_prompt = get_conversation_prompt(level)
+
+        self.context.clear()
+        self.last_user_message_id = None
+        for message in state['messages']:
+            if message['role'] in ('user', 'assistant'):
+                self.context.add(message['role'], message['content'])
+                if message['role'] == 'user':
+                    self.last_user_message_id = message['message_id']
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        recent = ", ".join(f"{error_type} {count}" for error_type, count in
+                           sorted(state['recent_errors'].items(), key=lambda item: -item[1])) or "none"
+        today = state['today']
+        self.console.print(Panel.fit(
+            f"🔁 Conversation {self.conversation_id} resumed\n"
+            f"👤 User: {self.username}\n"
+            f"📚 Level: {self.preferred_level}\n"
+            f"🎯 Topic: {state['topic'] or 'General conversation'}\n"
+            f"💬 {state['total_messages']} messages, {state['total_errors']} errors since {state['created_at']}\n"
+            f"🔍 Errors in the last {len(state['messages'])} messages: {recent}\n"
+            f"📅 Today: " + (f"{today['messages_sent']} messages, {today['total_errors']} errors"
+                           if today else "no messages yet"),
+            title="Welcome back"
+        ))
+
+        # Pick up where the learner left off
+        for message in state['messages'][-2:]:
+            speaker = "💬 You" if message['role'] == 'user' else "🤖 AI Tutor"
+            self.console.print(f"{speaker}: {message['content']}", style="dim")
+        self.console.print(f"⚡ Restored in {elapsed_ms:.0f}ms", style="dim green")
+        return True
+
     def process_user_message_stream(self, user_message: str):
         """Process user message with streaming AI response"""
         if not user_message.strip():
             return {'conversation': 'Please enter a message.', 'errors': [], 'score': 0}
 
+        profiler = self.profiler
+        profiler.start_turn(user_message)
+
         # Store user message
-        self.db.add_message_with_ai_analysis(
-            self.conversation_id, 'user', user_message
-        )
+        with profiler.stage('db_user_message'):
+            write_start = time.perf_counter()
+            self.last_user_message_id = self.db.add_message_with_ai_analysis(
+                self.conversation_id, 'user', user_message
+            )
+            DB_WRITE_USER_MESSAGE.observe(time.perf_counter() - write_start)
 
         # Get streaming AI response
         start_time = time.time()
 
-        stream = self.client.chat.completions.create(
+        with profiler.stage('rule_check'), self.tracer.span('rule_check', mode=self.rules) as span:
+            self.rule_errors = check_message(user_message) if self.rules != 'off' else []
+            span.set(findings=len(self.rule_errors))
+        skip_model_corrections = self.rules == 'skip' and bool(self.rule_errors)
+
+        self.analysis_submitted = bool(self.analyzer) and not skip_model_corrections
+        if self.analysis_submitted:
+            with profiler.stage('analysis_submit'):
+                self._submit_analysis(self.last_user_message_id, user_message, self.rule_errors)
+
+        with profiler.stage('prompt_build'), self.tracer.span('prompt') as span:
+            messages = self._build_messages(user_message)
+            span.set(messages=len(messages), context_tokens=self.context.total_tokens())
+        # Returns once the first token is in: admission, send and time to first token
+        profiler.mark('request_sent')
+        with profiler.stage('request_first_token'), self.tracer.span('api.request', model="deepseek-chat") as span:
+            request_start = time.perf_counter()
+            stream = self._open_stream(messages)
+            TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - request_start)
+            span.set(ttft_ms=round((time.perf_counter() - request_start) * 1000, 1))
+            coalesced = isinstance(self.completions, SingleFlight) and self.completions.last_coalesced()
+            if coalesced:
+                span.set(coalesced=True)
+            elif self.router:
+                # A coalesced request never reached the router, so only the leader has a backend
+                backend = self.router.last_backend()
+                span.set(backend=backend.name, model=backend.model)
+        profiler.mark('first_token')
+        self.context.add('user', user_message)
+
+        response_time = (time.time() - start_time) * 1000
+
+        return stream, response_time
+
+    def _build_messages(self, user_message: str) -> List[Dict]:
+        """Static system prefix, then the context window, then the new user turn"""
+        corrections_elsewhere = self.analyzer or (self.rules == 'skip' and self.rule_errors)
+        system_prompt = self.conversation_prompt if corrections_elsewhere else self._create_ai_prompt()
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(self.context.messages())
+        if self.rule_errors and not corrections_elsewhere:
+            # After the cached prefix, so the hint doesn't cost prompt-cache hits
+            messages.append({"role": "system", "content": format_hint(self.rule_errors)})
+        if self.weave_reviews:
+            review_hint = self._review_hint()
+            if review_hint:
+                messages.append({"role": "system", "content": review_hint})
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    def _review_queue(self) -> ReviewQueue:
+        if self.reviews is None:
+            self.reviews = ReviewQueue(self.db, self.user_id)
+        return self.reviews
+
+    def _review_hint(self, limit: int = 2) -> str:
+        """Hint for the next due review items not yet woven into this session, '' if none"""
+        due = [cluster_id for cluster_id in self._review_queue().due(limit + len(self.woven_reviews))
+               if cluster_id not in self.woven_reviews][:limit]
+        if not due:
+            return ''
+        self.woven_reviews.update(due)
+        return format_review_hint(self._review_queue().items(due))
+
+    def _open_stream(self, messages: List[Dict]):
+        """Send the completion request and return the response stream once the first token arrives"""
+        return self.completions.create_stream(
             model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": self._create_ai_prompt(user_message)},
-                {"role": "user", "content": user_message}
-            ],
-            stream=True,
+            messages=messages,
+            stream_options={"include_usage": True},
             temperature=0.7
         )
 
-        response_time = (time.time() - start_time) * 1000
+    def grade_message(self, user_message: str) -> Dict:
+        """Analyze a single message without conversation context and store the turn (tests)"""
+        self.last_user_message_id = self.db.add_message_with_ai_analysis(
+            self.conversation_id, 'user', user_message
+        )
 
-        return stream, response_time
+        parsed = self.analyze_message(user_message)
+        self._store_turn(parsed, parsed.pop('usage', None))
+        return parsed
+
+    def analyze_message(self, user_message: str) -> Dict:
+        """Grade a single message without conversation context; nothing is written to the database
+
+        Uses the response cache when one is configured, skipping the API call on hits.
+        Safe to call from several threads at once (batch grading).
+        """
+        start_time = time.time()
+        usage = None
+        parsed = None
+        if self.response_cache:
+            parsed = self.response_cache.get(user_message, self.preferred_level)
+        cached = parsed is not None
+
+        if not cached:
+            response = self.completions.create(
+                model="deepseek-chat",
+                messages=[
+                    {"role": "system", "content": self._create_ai_prompt()},
+                    {"role": "user", "content": user_message}
+                ],
+                stream=False,
+                temperature=0.7
+            )
+            usage = response.usage
+            parsed = self.parse_streaming_response(response.choices[0].message.content or "")
+            if self.response_cache:
+                self.response_cache.put(user_message, self.preferred_level, parsed,
+                                        (time.time() - start_time) * 1000)
+
+        if self.rules != 'off':
+            # The cache keeps the model's result; rule findings are cheap to recompute
+            rule_errors = check_message(user_message)
+            if rule_errors:
+                parsed = dict(parsed, errors=merge_findings(rule_errors, parsed['errors']),
+                              score=min(parsed['score'], 75))
+
+        parsed['usage'] = usage
+        parsed['response_time_ms'] = (time.time() - start_time) * 1000
+        parsed['cached'] = cached
+        return parsed
 
     def parse_streaming_response(self, full_response: str) -> Dict:
         """Parse the AI response to separate conversation and learning parts"""
@@ -169,8 +383,11 @@ User message: "{user_message}"
                             })
 
                             score = 75  # Lower score if there are errors
+                        else:
+                            REPLY_PARSE_FAILURES.inc()
                     except Exception as e:
                         # If parsing fails, still indicate there's an error
+                        REPLY_PARSE_FAILURES.inc()
                         score = 75
                         # Add a generic error entry
                         errors.append({
@@ -195,67 +412,213 @@ User message: "{user_message}"
 
         # Streaming display of conversation
         full_response = ""
+        usage = None
         self.console.print("", end="")
 
-        with self.console.status("[bold green]Thinking...", spinner="dots"):
+        profiler = self.profiler
+        with self.console.status("[bold green]Thinking...", spinner="dots"), profiler.stage('stream_drain'), \
+                self.tracer.span('api.stream') as span:
+            chunks = 0
             # Collect the full response first
             for chunk in stream:
-                if chunk.choices[0].delta.content:
+                chunks += 1
+                # The final chunk carries usage and no choices
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
                     full_response += content
+            span.set(chunks=chunks, chars=len(full_response), **cache_usage(usage))
+        profiler.mark('stream_done')
 
         # Parse the response
-        parsed = self.parse_streaming_response(full_response)
+        with profiler.stage('parse'), self.tracer.span('parse') as span:
+            parsed = self.parse_streaming_response(full_response)
+            self.context.add('assistant', parsed['conversation'])
+            span.set(errors=len(parsed['errors']), has_notes=bool(parsed['learning_notes']))
 
         # Display conversation part with streaming effect
         self.console.print("\n", end="")
         conversation_text = parsed['conversation']
 
-        for char in conversation_text:
-            self.console.print(char, end="", style="blue")
-            time.sleep(0.01)  # Small delay for streaming effect
-
-        self.console.print()  # New line after conversation
-
-        # Display learning notes subtly (if present)
-        if parsed['learning_notes']:
-            self.console.print("\n💡 Quick tip:", style="dim cyan")
-            # Display learning notes in a subtle way
-            for line in parsed['learning_notes'].split('\n'):
-                if line.strip():
-                    self.console.print(f"   {line}", style="dim cyan")
-
-        # First, get the last user message ID to associate errors with it
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT message_id FROM messages
-            WHERE conversation_id = ? AND role = 'user'
-            ORDER BY message_id DESC LIMIT 1
-        ''', (self.conversation_id,))
-        result = cursor.fetchone()
-        user_message_id = result[0] if result else None
-        conn.close()
+        # Includes the deliberate typing_delay per character of the typing effect
+        with profiler.stage('render_reply'), self.tracer.span('render', chars=len(conversation_text)):
+            for char in conversation_text:
+                self.console.print(char, end="", style="blue")
+                if self.typing_delay:
+                    time.sleep(self.typing_delay)  # Small delay for streaming effect
+
+            self.console.print()  # New line after conversation
+
+        # Display learning notes subtly (if present); local rule findings come first
+        with profiler.stage('render_tips'):
+            if self.rule_errors or parsed['learning_notes']:
+                self.console.print("\n💡 Quick tip:", style="dim cyan")
+                for error in self.rule_errors:
+                    self._print_tip(error)
+                covered = [e['original_text'].lower() for e in self.rule_errors]
+                # Display learning notes in a subtle way
+                for line in parsed['learning_notes'].split('\n'):
+                    # Skip notes repeating a rule finding (the hint asks the model not to)
+                    if line.strip() and not any(c in line.lower() for c in covered):
+                        self.console.print(f"   {line}", style="dim cyan")
+
+        if self.analysis_submitted:
+            # Analysis usually finishes while the reply is shown; otherwise it appears next turn
+            with profiler.stage('analysis_wait'):
+                self._show_pending_analysis(wait_seconds=1.0)
+
+        if self.rule_errors:
+            parsed['errors'] = merge_findings(self.rule_errors, parsed['errors'])
+            parsed['score'] = min(parsed['score'], 75)
+        self._store_turn(parsed, usage, analysis_pending=self.analysis_submitted)
+        self._record_turn_metrics(usage)
 
+        # Show minimal stats
+        with profiler.stage('render_stats'):
+            self.console.print(f"\n⚡ Response time: {response_time_ms:.0f}ms", style="dim green")
+            self._log_cache_usage(usage)
+        profiler.end_turn()
+
+    def _store_turn(self, parsed: Dict, usage=None, analysis_pending: bool = False):
+        """Persist errors, the assistant reply and daily progress for the current turn
+
+        With analysis_pending (dual-call mode) only the reply is stored here; errors and
+        progress are written by the analysis callback.
+        """
+        profiler = self.profiler
         # Store errors associated with the user message
-        if parsed['errors'] and user_message_id:
-            self.db._store_errors_from_ai(user_message_id, parsed['errors'])
+        if parsed['errors'] and self.last_user_message_id and not analysis_pending:
+            with profiler.stage('db_errors'):
+                self._store_errors(self.last_user_message_id, parsed['errors'])
 
         # Store the AI response in database
-        self.db.add_message_with_ai_analysis(
-            self.conversation_id, 'assistant', parsed['conversation'],
-            {'learning_notes': parsed['learning_notes'], 'errors': parsed['errors'], 'score': parsed['score']}
-        )
+        with profiler.stage('db_assistant_message'):
+            write_start = time.perf_counter()
+            self.db.add_message_with_ai_analysis(
+                self.conversation_id, 'assistant', parsed['conversation'],
+                {'learning_notes': parsed['learning_notes'], 'errors': parsed['errors'], 'score': parsed['score'],
+                 'usage': cache_usage(usage)}
+            )
+            DB_WRITE_ASSISTANT_MESSAGE.observe(time.perf_counter() - write_start)
+        if analysis_pending:
+            return
 
         # Update learning progress
+        with profiler.stage('db_progress'):
+            self._update_progress(parsed['errors'], parsed['score'])
+
+    def _store_errors(self, message_id: int, errors: List[Dict]):
+        """Persist a message's errors and count them by type"""
+        write_start = time.perf_counter()
+        self.db._store_errors_from_ai(message_id, errors)
+        DB_WRITE_ERRORS.observe(time.perf_counter() - write_start)
+        for error in errors:
+            ERRORS_BY_TYPE.get(error.get('error_type'), OTHER_ERRORS).inc()
+
+    def _update_progress(self, errors: List[Dict], score: Optional[int]):
+        write_start = time.perf_counter()
         self.db.update_learning_progress(self.user_id, {
-            'errors': parsed['errors'],
-            'score': parsed['score'],
+            'errors': errors,
+            'score': score,
             'cefr_estimate': self.preferred_level
         })
+        DB_WRITE_PROGRESS.observe(time.perf_counter() - write_start)
 
-        # Show minimal stats
-        self.console.print(f"\n⚡ Response time: {response_time_ms:.0f}ms", style="dim green")
+    def _record_turn_metrics(self, usage):
+        TURNS.inc()
+        if usage is None:
+            return
+        PROMPT_TOKENS.inc(getattr(usage, 'prompt_tokens', 0) or 0)
+        COMPLETION_TOKENS.inc(getattr(usage, 'completion_tokens', 0) or 0)
+        CACHE_HIT_TOKENS.inc(cache_usage(usage)['cache_hit_tokens'])
+
+    def _submit_analysis(self, message_id: int, user_message: str, rule_errors: List[Dict] = None):
+        """Start the structured analysis of a user message and persist it when it completes"""
+        # A tip the learner hasn't seen yet is shown before the next reply
+        self._show_pending_analysis()
+
+        rule_errors = rule_errors or []
+        # The callback runs on the analysis thread, outside this turn's span context
+        turn_span = self.tracer.current()
+        future = self.analyzer.submit(user_message, self.preferred_level)
+        future.add_done_callback(lambda f: self._persist_analysis(f, message_id, rule_errors, turn_span))
+        with self.analysis_lock:
+            self.pending_analysis = (future, user_message, rule_errors)
+
+    def _persist_analysis(self, future, message_id: int, rule_errors: List[Dict] = None, turn_span=None):
+        """Done-callback (runs on the analysis thread): store errors and progress"""
+        with self.tracer.span('analysis.persist', parent=turn_span, message_id=message_id):
+            self._store_analysis(future, message_id, rule_errors)
+
+    def _store_analysis(self, future, message_id: int, rule_errors: List[Dict] = None):
+        try:
+            analysis = future.result()
+        except Exception as e:
+            print(f"Error analysis failed for message {message_id}: {e}")
+            # Invalid JSON or shape from the model, as opposed to a failed request
+            if isinstance(e, (ValueError, KeyError, AttributeError)):
+                ANALYSIS_PARSE_FAILURES.inc()
+            # The turn still counts towards the day, its words are already in words_written
+            analysis = {'errors': [], 'score': 75 if rule_errors else None}
+
+        errors = merge_findings(rule_errors or [], analysis['errors'])
+        if errors:
+            self._store_errors(message_id, errors)
+        self._update_progress(errors, min(analysis['score'], 75) if rule_errors else analysis['score'])
+
+    def _show_pending_analysis(self, wait_seconds: float = 0.0):
+        """Show the corrections for the last message if its analysis has finished"""
+        with self.analysis_lock:
+            if not self.pending_analysis:
+                return
+            future, user_message, rule_errors = self.pending_analysis
+
+        try:
+            analysis = future.result(timeout=wait_seconds)
+        except AnalysisTimeout:
+            self.console.print("\n🔎 Still checking your message, corrections will follow...", style="dim cyan")
+            return
+        except Exception:
+            # Already reported by the callback
+            analysis = {'errors': []}
+
+        with self.analysis_lock:
+            if self.pending_analysis and self.pending_analysis[0] is future:
+                self.pending_analysis = None
+
+        # Rule findings were shown with the reply already
+        errors = merge_findings(rule_errors, analysis['errors'])[len(rule_errors):]
+        if errors:
+            self.console.print(f"\n💡 Quick tip for \"{user_message[:40]}{'...' if len(user_message) > 40 else ''}\":",
+                               style="dim cyan")
+            for error in errors:
+                self._print_tip(error)
+
+    def _print_tip(self, error: Dict):
+        self.console.print(
+            f"   Error found: \"{error['original_text']}\" → \"{error['correction']}\" - "
+            f"{error['explanation']} ({error['error_type']}, {error['severity']})",
+            style="dim cyan"
+        )
+
+    def _log_cache_usage(self, usage):
+        """Log provider prompt-cache hits for this turn and the session so far"""
+        turn_usage = cache_usage(usage)
+        if not turn_usage:
+            return
+
+        self.cache_stats['turns'] += 1
+        self.cache_stats['prompt_tokens'] += turn_usage['prompt_tokens']
+        self.cache_stats['cache_hit_tokens'] += turn_usage['cache_hit_tokens']
+        session_rate = (self.cache_stats['cache_hit_tokens'] / self.cache_stats['prompt_tokens']
+                        if self.cache_stats['prompt_tokens'] else 0.0)
+
+        self.console.print(
+            f"🗄️  Prompt cache: {turn_usage['cache_hit_tokens']}/{turn_usage['prompt_tokens']} tokens hit "
+            f"({turn_usage['cache_hit_rate']:.0%}, session {session_rate:.0%})",
+            style="dim green"
+        )
 
     def display_ai_response(self, response_data: Dict):
         """Legacy method for backward compatibility"""
@@ -263,7 +626,11 @@ User message: "{user_message}"
         self.console.print(Panel(response_data['conversation'], border_style="blue"))
 
     def show_error_history(self, days: int = 7, limit: int = 20):
-        """Display user's error history"""
+        """Display user's error history (more than a page opens the pager in a terminal)"""
+        if limit > PAGE_SIZE and self.console.is_terminal:
+            self.browse_errors(days)
+            return
+
         errors = self.db.get_user_errors(self.user_id, limit, days)
 
         if not errors:
@@ -281,7 +648,7 @@ User message: "{user_message}"
                 f"[bold green]Correction:[/bold green] {error['correction']}\n\n"
                 f"[bold]Explanation:[/bold] {error['explanation']}\n\n"
                 f"[dim]Type: {error['error_type']} | Severity: {error['severity']} | "
-                f"Time: {error['timestamp']} | Confidence: {error['confidence']:.1f}[/dim]"
+                f"Time: {error['timestamp']} | Confidence: {error['confidence']:.1f} | Found by: {error['detected_by']}[/dim]"
             )
 
             panel = Panel(
@@ -292,6 +659,11 @@ User message: "{user_message}"
             self.console.print(panel)
             self.console.print()  # Add spacing
 
+    def browse_errors(self, days: int = None, error_type: str = None, severity: str = None):
+        """Page through the error history with navigation and type/severity filters"""
+        ErrorViewer(self.db, self.user_id, self.console, days=days,
+                    error_type=error_type, severity=severity).run()
+
     def show_error_patterns(self, days: int = 30):
         """Display error pattern analysis"""
         patterns = self.db.get_error_patterns(self.user_id, days)
@@ -331,6 +703,138 @@ User message: "{user_message}"
         if not patterns['distribution'] and not patterns['frequent_errors'] and not patterns['trend']:
             self.console.print("✨ No error patterns detected yet!", style="bold green")
 
+    def show_vocabulary(self, days: int = 30):
+        """Display vocabulary size, growth and most used words"""
+        report = self.db.get_vocabulary_report(self.user_id, days)
+
+        if not report['total_words']:
+            self.console.print("📖 No vocabulary recorded yet. Start chatting!", style="bold yellow")
+            return
+
+        self.console.print(f"\n📖 Vocabulary (Last {days} days):", style="bold cyan")
+        self.console.print(f"  Unique words used: {report['total_words']}  "
+                           f"(active: {report['active_words']}, total uses: {report['total_uses']})")
+
+        if report['growth']:
+            self.console.print("\n🌱 Vocabulary Growth:", style="bold green")
+            for day, new_words, cumulative in report['growth'][-7:]:
+                bar = "▓" * min(new_words, 20)
+                self.console.print(f"  {day}: {bar:20} +{new_words} ({cumulative} total)")
+
+        if report['words_by_level']:
+            self.console.print("\n🎚️  Words by Level:", style="bold blue")
+            for level in ['A1', 'A2', 'B1', 'B2', 'C1', 'C2', '?']:
+                count = report['words_by_level'].get(level, 0)
+                if count:
+                    bar = "█" * min(int(count / 5) + 1, 20)
+                    self.console.print(f"  {level if level != '?' else 'other':5} {bar:20} {count}")
+
+        if report['level_trend']:
+            self.console.print("\n📈 Estimated Message Level:", style="bold green")
+            for day, score in report['level_trend'][-7:]:
+                self.console.print(f"  {day}: {level_name(score)} ({score:.1f})")
+
+        if report['top_words']:
+            self.console.print("\n🔤 Most Used Words:", style="bold yellow")
+            self.console.print("  " + ", ".join(f"{word} ({count})" for word, count in report['top_words']))
+
+        if report['recent_words']:
+            self.console.print("\n✨ Newest Words:", style="bold magenta")
+            self.console.print("  " + ", ".join(report['recent_words']))
+
+    def show_progress(self, days: int = 30):
+        """Display rolling error rate, trends and streaks from the daily progress rows"""
+        try:
+            # NumPy is only needed for analytics: uv sync --extra analytics
+            from progress_analytics import user_report
+        except ImportError:
+            self.console.print("📈 Progress analytics needs NumPy: uv sync --extra analytics", style="yellow")
+            return
+
+        report = user_report(self.db.db_path, self.user_id, days)
+        if not report or not report['daily']:
+            self.console.print("📈 No progress recorded in this period yet. Start chatting!", style="bold yellow")
+            return
+
+        def trend(slope, per_week_unit, lower_is_better):
+            if slope is None:
+                return "not enough days yet"
+            weekly = slope * 7
+            improving = weekly < 0 if lower_is_better else weekly > 0
+            arrow = "📉" if weekly < 0 else "📈"
+            return f"{arrow} {weekly:+.1f}{per_week_unit}/week ({'improving' if improving else 'worsening'})"
+
+        table = Table(title=f"📈 Progress (Last {days} days)")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="green")
+        table.add_row("Active Days", f"{report['active_days']} (streak {report['current_streak']}, "
+                                     f"best {report['longest_streak']})")
+        table.add_row("Messages / Words", f"{report['messages']} / {report['words']}")
+        if report['error_rate'] is not None:
+            table.add_row("Errors per 100 Words", f"{report['error_rate']:.1f}")
+        if report['recent_error_rate'] is not None:
+            table.add_row(f"Last {report['window']} Days", f"{report['recent_error_rate']:.1f}")
+        table.add_row("Error Rate Trend", trend(report['error_rate_slope'], '', lower_is_better=True))
+        if report['improvement'] is not None:
+            table.add_row("Improvement", f"{report['improvement']:+.0f}% fewer errors than the first half"
+                          if report['improvement'] >= 0 else
+                          f"{-report['improvement']:.0f}% more errors than the first half")
+        if report['avg_score'] is not None:
+            table.add_row("Average Score", f"{report['avg_score']:.0f}")
+        table.add_row("Score Trend", trend(report['score_slope'], ' pts', lower_is_better=False))
+        self.console.print(table)
+
+        daily = Table(title="Recent Days")
+        for column in ("Date", "Msgs", "Words", "Errors", "Rate", f"{report['window']}-day", "Score"):
+            daily.add_column(column, justify="right" if column != "Date" else "left")
+        for day in report['daily'][-7:]:
+            daily.add_row(
+                day['date'], str(day['messages']), str(day['words']), str(day['errors']),
+                "-" if day['error_rate'] is None else f"{day['error_rate']:.1f}",
+                "-" if day['rolling_error_rate'] is None else f"{day['rolling_error_rate']:.1f}",
+                "-" if day['score'] is None else f"{day['score']:.0f}"
+            )
+        self.console.print(daily)
+
+    def run_review(self, limit: int = 10):
+        """Quiz the learner on due past mistakes and reschedule them (SM-2)"""
+        queue = self._review_queue()
+        items = queue.items(queue.due(limit))
+        if not items:
+            self.console.print("🎉 Nothing to review right now!", style="bold green")
+            return
+
+        self.console.print(f"\n🔁 Review: {len(items)} of {queue.due_count()} due items "
+                           "(type the corrected text, Enter to reveal, 'q' to stop)", style="bold cyan")
+        reviewed = correct = 0
+        for i, item in enumerate(items, 1):
+            self.console.print(Panel(
+                f"[bold red]Fix this:[/bold red] {item['original_text']}\n"
+                f"[dim]Type: {item['error_type']}  Reviews: {item['repetitions']}[/dim]",
+                title=f"Review #{i}",
+                border_style="cyan"
+            ))
+            answer = Prompt.ask("✏️  Correction", default="", show_default=False).strip()
+            if answer.lower() == 'q':
+                break
+
+            quality = grade_answer(answer, item['correction'])
+            updated = queue.record(item, quality)
+            reviewed += 1
+            if quality >= 3:
+                correct += 1
+                self.console.print(f"✅ {'Correct' if quality == 5 else 'Close'}: {item['correction']}",
+                                   style="green")
+            else:
+                self.console.print(f"📝 Answer: {item['correction']}", style="yellow")
+                if item['explanation']:
+                    self.console.print(f"   {item['explanation']}", style="dim")
+            self.console.print(f"   Next review in {updated['interval_days']:g} day(s)", style="dim cyan")
+
+        if reviewed:
+            self.console.print(f"\n🏁 Reviewed {reviewed}, {correct} correct. "
+                               f"{queue.due_count()} still due.", style="bold green")
+
     def show_statistics(self):
         """Display user learning statistics"""
         stats = self.db.get_user_statistics(self.user_id)
@@ -344,6 +848,10 @@ User message: "{user_message}"
         table.add_row("Avg Messages/Conversation", str(stats['conversations']['avg_messages']))
         table.add_row("Levels Practiced", str(stats['conversations']['levels_practiced']))
         table.add_row("Total Words", str(stats['vocabulary']['total_words']))
+        table.add_row("Unique Words", str(stats['vocabulary']['unique_words']))
+        if stats['vocabulary']['avg_cefr']:
+            table.add_row("Estimated Level",
+                          f"{stats['vocabulary']['avg_cefr']} ({stats['vocabulary']['avg_cefr_score']:.1f})")
 
         self.console.print(table)
 
@@ -357,6 +865,28 @@ User message: "{user_message}"
                     actual_count = count
                 self.console.print(f"  • {error_type}: {actual_count}")
 
+    def show_backends(self):
+        """Per-backend routing stats (--backends)"""
+        if not self.router:
+            self.console.print("Single backend; start with --backends FILE to route across several.", style="yellow")
+            return
+        stats = self.router.get_stats()
+        table = Table(title=f"🛰️  Backends ({stats['calls']} requests, {stats['fallbacks']} fallbacks)")
+        table.add_column("Backend", style="cyan")
+        table.add_column("Model")
+        table.add_column("TTFT (EWMA)", justify="right")
+        table.add_column("Error Rate", justify="right")
+        table.add_column("Requests", justify="right")
+        table.add_column("Failures", justify="right")
+        table.add_column("Probes", justify="right")
+        table.add_column("State")
+        for backend in stats['backends']:
+            ttft = "-" if backend['ttft_ewma_ms'] is None else f"{backend['ttft_ewma_ms']:.0f} ms"
+            state = "✅ healthy" if backend['healthy'] else f"⚠️  {backend['breaker_state']}"
+            table.add_row(backend['name'], backend['model'], ttft, f"{backend['error_rate']:.1%}",
+                          str(backend['requests']), str(backend['failures']), str(backend['probes']), state)
+        self.console.print(table)
+
     def export_data(self, format_type: str = 'json'):
         """Export user learning data"""
         data = self.db.export_user_data(self.user_id)
@@ -369,10 +899,25 @@ User message: "{user_message}"
         else:
             self.console.print("❌ Only JSON export is currently supported", style="red")
 
+    def write_profile(self):
+        """Save the --profile reports and show where the turn time went"""
+        output_dir = self.profiler.write()
+        if not output_dir:
+            return
+
+        table = Table(title=f"⏱️  Turn Profile ({len(self.profiler.turns)} turns)")
+        table.add_column("Stage", style="cyan")
+        for column in ("p50 ms", "p95 ms", "max ms"):
+            table.add_column(column, justify="right")
+        for stage, stats in self.profiler.summary().items():
+            table.add_row(stage, f"{stats['p50']:.1f}", f"{stats['p95']:.1f}", f"{stats['max']:.1f}")
+        self.console.print(table)
+        self.console.print(f"📁 Profile written to: {output_dir}", style="green")
+
     def run_interactive(self):
         """Run interactive conversation session"""
         self.console.print("🚀 Starting English Learning Session")
-        self.console.print("Commands: 'quit', 'stats', 'errors', 'patterns', 'export', 'help'")
+        self.console.print("Commands: 'quit', 'stats', 'errors', 'browse', 'patterns', 'vocab', 'progress', 'review', 'export', 'backends', 'help'")
 
         while True:
             try:
@@ -404,6 +949,17 @@ User message: "{user_message}"
                     self.show_error_history(days, limit)
                     continue
 
+                elif user_input.lower().startswith('browse'):
+                    parts = user_input.split()
+                    days = None
+                    if len(parts) > 1:
+                        try:
+                            days = int(parts[1])
+                        except:
+                            pass
+                    self.browse_errors(days)
+                    continue
+
                 elif user_input.lower().startswith('patterns'):
                     # Parse patterns command with optional days parameter
                     parts = user_input.split()
@@ -416,18 +972,60 @@ User message: "{user_message}"
                     self.show_error_patterns(days)
                     continue
 
+                elif user_input.lower().startswith('vocab'):
+                    parts = user_input.split()
+                    days = 30
+                    if len(parts) > 1:
+                        try:
+                            days = int(parts[1])
+                        except:
+                            pass
+                    self.show_vocabulary(days)
+                    continue
+
+                elif user_input.lower().startswith('progress'):
+                    parts = user_input.split()
+                    days = 30
+                    if len(parts) > 1:
+                        try:
+                            days = int(parts[1])
+                        except:
+                            pass
+                    self.show_progress(days)
+                    continue
+
+                elif user_input.lower().startswith('review'):
+                    parts = user_input.split()
+                    limit = 10
+                    if len(parts) > 1:
+                        try:
+                            limit = int(parts[1])
+                        except:
+                            pass
+                    self.run_review(limit)
+                    continue
+
                 elif user_input.lower() == 'export':
                     self.export_data()
                     continue
 
+                elif user_input.lower() == 'backends':
+                    self.show_backends()
+                    continue
+
                 elif user_input.lower() == 'help':
                     self.console.print(Panel.fit(
                         "Commands:\n"
                         "• quit/exit/q - Exit the program\n"
                         "• stats - Show your learning statistics\n"
                         "• errors [days] [limit] - Show error history (default: 7 days, 20 errors)\n"
+                        "• browse [days] - Page through all errors, filter by type/severity (default: all time)\n"
                         "• patterns [days] - Show error pattern analysis (default: 30 days)\n"
+                        "• vocab [days] - Show vocabulary growth (default: 30 days)\n"
+                        "• progress [days] - Show error-rate trend, rolling averages and streaks (default: 30 days)\n"
+                        "• review [count] - Practise past mistakes that are due (default: 10)\n"
                         "• export - Export your learning data\n"
+                        "• backends - Show latency and error rate per API backend\n"
                         "• help - Show this help message",
                         title="Help"
                     ))
@@ -437,12 +1035,18 @@ User message: "{user_message}"
                     continue
 
                 # Process message with streaming AI response
-                stream, response_time = self.process_user_message_stream(user_input)
-                self.display_streaming_response(stream, response_time)
+                with self.tracer.trace('turn', conversation_id=self.conversation_id, user_id=self.user_id,
+                                       level=self.preferred_level, message_chars=len(user_input)):
+                    stream, response_time = self.process_user_message_stream(user_input)
+                    self.display_streaming_response(stream, response_time)
 
             except KeyboardInterrupt:
                 self.console.print("\n👋 Session ended. Goodbye!", style="bold green")
                 break
+            except CircuitOpenError as e:
+                self.console.print(f"\n⏸️  {e}", style="yellow")
+            except CompletionTimeout as e:
+                self.console.print(f"\n⌛ The AI took too long to answer ({e}). Please try again.", style="yellow")
             except Exception as e:
                 self.console.print(f"\n❌ Error: {e}", style="red")
 
@@ -453,12 +1057,52 @@ def main():
                        choices=['A1', 'A2', 'B1', 'B2', 'C1', 'C2'],
                        help='English proficiency level (default: B1)')
     parser.add_argument('--topic', '-t', help='Conversation topic')
+    parser.add_argument('--resume', nargs='?', type=int, const=0, metavar='CONVERSATION_ID',
+                       help='Continue a conversation (default: your latest) instead of starting a new one')
+    parser.add_argument('--resume-messages', type=int, default=40,
+                       help='Messages of the resumed conversation to load as context (default: 40)')
     parser.add_argument('--stats', action='store_true', help='Show statistics and exit')
     parser.add_argument('--errors', action='store_true', help='Show error history and exit')
+    parser.add_argument('--browse', action='store_true', help='Page through the error history and exit')
     parser.add_argument('--patterns', action='store_true', help='Show error patterns and exit')
     parser.add_argument('--export', action='store_true', help='Export data and exit')
+    parser.add_argument('--vocab', action='store_true', help='Show vocabulary growth and exit')
+    parser.add_argument('--rebuild-vocab', action='store_true',
+                       help='Rebuild the vocabulary index from your past messages')
+    parser.add_argument('--progress', action='store_true',
+                       help='Show error-rate trends and streaks and exit (needs NumPy)')
+    parser.add_argument('--review', action='store_true', help='Review due past mistakes and exit')
+    parser.add_argument('--weave-reviews', action='store_true',
+                       help='Let the tutor work due review items into the conversation')
     parser.add_argument('--error-days', type=int, default=7, help='Days for error history (default: 7)')
     parser.add_argument('--pattern-days', type=int, default=30, help='Days for error patterns (default: 30)')
+    parser.add_argument('--hedge', action='store_true',
+                       help='Send a backup request when the first token is slower than usual')
+    parser.add_argument('--rules', default='hint', choices=['off', 'hint', 'skip'],
+                       help='Local pre-checker: off, hint (tell the AI what is already corrected, default) '
+                            'or skip (no AI corrections when the rules find errors)')
+    parser.add_argument('--dual', action='store_true',
+                       help='Stream the reply without corrections and analyze errors in a parallel request')
+    parser.add_argument('--profile', action='store_true',
+                       help='Time every stage of each turn and write a report at exit')
+    parser.add_argument('--profile-cprofile', action='store_true',
+                       help='With --profile: also run cProfile per turn (slower)')
+    parser.add_argument('--profile-memory', action='store_true',
+                       help='With --profile: also trace allocations per turn with tracemalloc (slower)')
+    parser.add_argument('--profile-dir', default='profiles',
+                       help='Directory for profile reports (default: profiles)')
+    parser.add_argument('--trace', nargs='?', const=DEFAULT_TRACE_FILE, metavar='FILE',
+                       help=f'Write per-turn trace spans as JSONL (default file: {DEFAULT_TRACE_FILE})')
+    parser.add_argument('--trace-max-mb', type=float, default=20,
+                       help='Rotate the trace file at this size (default: 20 MB, 5 old files kept)')
+    parser.add_argument('--metrics-port', type=int,
+                       help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-file',
+                       help='Write Prometheus metrics to this file every --metrics-interval seconds')
+    parser.add_argument('--metrics-interval', type=float, default=15.0,
+                       help='Seconds between metrics file writes (default: 15)')
+    parser.add_argument('--backends', metavar='FILE',
+                       help='JSON list of OpenAI-compatible backends; each request goes to the fastest healthy one')
 
     args = parser.parse_args()
 
@@ -468,7 +1112,25 @@ def main():
         print("Please set it with: export DEEPSEEK_API_KEY=your_api_key")
         sys.exit(1)
 
-    tutor = EnglishTutor(args.username, args.level)
+    # Open the API connection while the database and user are being set up
+    warm_up(background=True)
+
+    profiler = None
+    if args.profile or args.profile_cprofile or args.profile_memory:
+        profiler = TurnProfiler(args.profile_dir, cprofile=args.profile_cprofile, memory=args.profile_memory)
+
+    tracer = Tracer(SpanWriter(args.trace, max_bytes=int(args.trace_max_mb * 1024 * 1024))) if args.trace else None
+
+    backends = None
+    if args.backends:
+        try:
+            backends = load_backends(args.backends)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error: cannot load backends from {args.backends}: {e}")
+            sys.exit(1)
+
+    tutor = EnglishTutor(args.username, args.level, hedge=args.hedge, dual_call=args.dual, rules=args.rules,
+                         weave_reviews=args.weave_reviews, profiler=profiler, tracer=tracer, backends=backends)
 
     if args.stats:
         tutor.show_statistics()
@@ -478,6 +1140,10 @@ def main():
         tutor.show_error_history(args.error_days)
         return
 
+    if args.browse:
+        tutor.browse_errors()
+        return
+
     if args.patterns:
         tutor.show_error_patterns(args.pattern_days)
         return
@@ -486,9 +1152,40 @@ def main():
         tutor.export_data()
         return
 
+    if args.progress:
+        tutor.show_progress(args.pattern_days)
+        return
+
+    if args.review:
+        tutor.run_review()
+        return
+
+    if args.rebuild_vocab:
+        rows = tutor.db.rebuild_vocabulary(tutor.user_id)
+        tutor.console.print(f"📖 Vocabulary index rebuilt: {rows} words", style="green")
+
+    if args.vocab or args.rebuild_vocab:
+        tutor.show_vocabulary(args.pattern_days)
+        return
+
     # Start conversation
-    tutor.start_conversation(args.topic)
-    tutor.run_interactive()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+        tutor.console.print(f"📊 Metrics on http://127.0.0.1:{args.metrics_port}/metrics", style="dim")
+    stop_metrics_dump = dump_periodically(args.metrics_file, args.metrics_interval) if args.metrics_file else None
+
+    if args.resume is None or not tutor.resume_conversation(args.resume or None, args.resume_messages):
+        tutor.start_conversation(args.topic)
+    ACTIVE_SESSIONS.inc()
+    try:
+        tutor.run_interactive()
+    finally:
+        ACTIVE_SESSIONS.dec()
+        tutor.write_profile()
+        tutor.tracer.close()
+        if stop_metrics_dump:
+            stop_metrics_dump.set()
+            write_metrics_file(args.metrics_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
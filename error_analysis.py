@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Structured error analysis in a separate JSON-mode request (dual-call mode)
+
+The conversational reply streams on its own; this request runs concurrently
+and returns typed errors with severity, character span and confidence.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List
+
+from prompt_templates import get_analysis_prompt
+
+ERROR_TYPES = {'grammar', 'vocabulary', 'spelling', 'expression', 'punctuation'}
+SEVERITIES = {'minor', 'major', 'critical'}
+
+
+def _span(error: Dict, user_message: str):
+    """Trust the model's span only if it actually points at original_text"""
+    original = error.get('original_text') or ''
+    start, end = error.get('start_position'), error.get('end_position')
+    if isinstance(start, int) and isinstance(end, int) and user_message[start:end] == original:
+        return start, end
+
+    found = user_message.find(original) if original else -1
+    if found == -1:
+        found = user_message.lower().find(original.lower()) if original else -1
+    return (found, found + len(original)) if found != -1 else (None, None)
+
+
+def parse_analysis(content: str, user_message: str) -> Dict:
+    """Validate a JSON analysis and normalize types, severities, spans and confidences"""
+    content = content.strip()
+    if content.startswith('```'):
+        content = content.strip('`')
+        if content.startswith('json'):
+            content = content[4:]
+
+    data = json.loads(content)
+    # Accept both {"errors": ...} and the older {"error_analysis": {"errors": ...}} shape
+    data = data.get('error_analysis', data)
+
+    errors: List[Dict] = []
+    for error in data.get('errors') or []:
+        if not error.get('original_text'):
+            continue
+
+        error_type = str(error.get('error_type', '')).lower()
+        severity = str(error.get('severity', '')).lower()
+        try:
+            confidence = min(max(float(error.get('confidence', 0.5)), 0.0), 1.0)
+        except (TypeError, ValueError):
+            confidence = 0.5
+        start, end = _span(error, user_message)
+
+        errors.append({
+            'error_type': error_type if error_type in ERROR_TYPES else 'grammar',
+            'severity': severity if severity in SEVERITIES else 'minor',
+            'original_text': error['original_text'],
+            'correction': error.get('correction', ''),
+            'explanation': error.get('explanation', ''),
+            'start_position': start,
+            'end_position': end,
+            'confidence': confidence
+        })
+
+    try:
+        score = int(data.get('overall_score', 100 if not errors else 75))
+    except (TypeError, ValueError):
+        score = 100 if not errors else 75
+
+    return {'errors': errors, 'score': min(max(score, 0), 100)}
+
+
+class ErrorAnalyzer:
+    """Runs JSON-mode analysis requests in the background"""
+
+    def __init__(self, completions, max_workers: int = 4):
+        self.completions = completions
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='error-analysis')
+
+    def analyze(self, user_message: str, level: str) -> Dict:
+        response = self.completions.create(
+            model="deepseek-chat",
+            messages=[
+                {"role": "system", "content": get_analysis_prompt(level)},
+                {"role": "user", "content": user_message}
+            ],
+            response_format={"type": "json_object"},
+            stream=False,
+            temperature=0.2
+        )
+        return parse_analysis(response.choices[0].message.content or "{}", user_message)
+
+    def submit(self, user_message: str, level: str) -> Future:
+        """Start the analysis without blocking the conversational reply"""
+        return self.executor.submit(self.analyze, user_message, level)
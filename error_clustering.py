@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Error canonicalization and near-duplicate clustering
+
+Every stored error gets a cluster_id so "She have", "she have" and "She have a"
+are counted as one pattern. Exact repeats are resolved through the canonical
+text (case, apostrophes, punctuation and whitespace normalized); new variants are
+matched with MinHash signatures (character shingles plus the word-level edit)
+and an LSH band index, then confirmed by estimated Jaccard similarity.
+
+Clusters are assigned incrementally when errors are inserted (SimpleDatabase)
+and in bulk for existing rows:
+
+    uv run error_clustering.py --db english_learning.db
+"""
+import re
+import zlib
+import time
+import random
+import threading
+import sqlite3
+import argparse
+from array import array
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+NUM_PERMUTATIONS = 64
+BANDS = 32                      # 32 bands x 2 rows: pairs above ~0.25 similarity become candidates
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SIMILARITY_THRESHOLD = 0.5      # estimated Jaccard needed to join a cluster
+SHINGLE_SIZE = 3
+EDIT_WEIGHT = 6               # copies of each word-edit feature in the set
+CACHE_SIZE = 20000            # committed keys and signatures kept per clusterer (least recently used go first)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_random = random.Random(1729)   # fixed seed: signatures must be stable across processes
+PERMUTATIONS = [(_random.randrange(1, _MERSENNE_PRIME), _random.randrange(0, _MERSENNE_PRIME))
+                for _ in range(NUM_PERMUTATIONS)]
+
+_APOSTROPHES = str.maketrans({"'": None, '‘': None, '’': None})
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r'\s+')
+
+
+def canonicalize(text: str) -> str:
+    """Lowercase, drop apostrophes ("don't" == "dont") and punctuation, collapse whitespace"""
+    text = (text or '').translate(_APOSTROPHES).lower()
+    text = _PUNCTUATION.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+
+def canonical_key(original: str, correction: str) -> str:
+    return f"{canonicalize(original)}\x1f{canonicalize(correction)}"
+
+
+def _char_shingles(text: str, prefix: str) -> set:
+    padded = f" {text} "
+    if len(padded) <= SHINGLE_SIZE:
+        return {prefix + padded}
+    return {prefix + padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)}
+
+
+def edit_features(original: str, correction: str) -> List[str]:
+    """The words that were replaced, e.g. 'have>has' for 'she have a' -> 'she has a'"""
+    before, after = original.split(), correction.split()
+    matcher = SequenceMatcher(a=before, b=after, autojunk=False)
+    return [f"{' '.join(before[i1:i2])}>{' '.join(after[j1:j2])}"
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def shingles(key: str) -> set:
+    """Character shingles of both sides plus the word edit, repeated so it dominates
+
+    Context words ("a", "to school") shift similarity a little; a different edit
+    ("have>has" vs "has>have") shifts it a lot.
+    """
+    original, _, correction = key.partition('\x1f')
+    features = _char_shingles(original, 'o') | _char_shingles(correction, 'c')
+    for edit in edit_features(original, correction):
+        features.update(f"e{copy}:{edit}" for copy in range(EDIT_WEIGHT))
+    return features
+
+
+def minhash(key: str) -> Tuple[int, ...]:
+    """MinHash signature of a canonical key's feature set"""
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles(key)]
+    return tuple(min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+                 for a, b in PERMUTATIONS)
+
+
+def band_keys(signature: Tuple[int, ...]) -> List[int]:
+    """One LSH bucket key per band (band number in the high bits)"""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        keys.append((band << 32) | zlib.crc32(array('I', rows).tobytes()))
+    return keys
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERMUTATIONS
+
+
+def _pack(signature: Tuple[int, ...]) -> bytes:
+    return array('I', signature).tobytes()
+
+
+def _unpack(blob: bytes) -> Tuple[int, ...]:
+    signature = array('I')
+    signature.frombytes(blob)
+    return tuple(signature)
+
+
+class ErrorClusterer:
+    """Assigns cluster ids using the caller's cursor, caching what it has recently seen in this process
+
+    The shared caches are LRUs of at most cache_size entries each, so a long-lived
+    database object or a backfill over millions of errors doesn't keep every cluster
+    in memory. What a transaction looks up or creates is held per connection until the caller
+    reports the outcome: committed(conn) moves it into the shared caches and
+    discard(conn) drops it. A rolled-back transaction therefore never leaves the id of
+    a cluster that was never written, and other connections never see uncommitted ids.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, cache_size: int = CACHE_SIZE):
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.key_cache: OrderedDict = OrderedDict()         # canonical key -> cluster id
+        self.signature_cache: OrderedDict = OrderedDict()   # cluster id -> MinHash signature
+        # connection -> (keys, signatures) seen in its open transaction
+        self.pending: Dict[object, Tuple[Dict[str, int], Dict[int, Tuple[int, ...]]]] = {}
+        self.lock = threading.Lock()
+
+    def _pending(self, cursor) -> Tuple[Dict[str, int], Dict[int, Tuple[int, ...]]]:
+        with self.lock:
+            return self.pending.setdefault(cursor.connection, ({}, {}))
+
+    def committed(self, conn):
+        """The connection's transaction committed: its clusters are safe to cache"""
+        with self.lock:
+            keys, signatures = self.pending.pop(conn, ({}, {}))
+            for cache, entries in ((self.key_cache, keys), (self.signature_cache, signatures)):
+                for key, value in entries.items():
+                    cache[key] = value
+                    cache.move_to_end(key)
+                while len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+
+    def _cached(self, cache: OrderedDict, key):
+        """Committed entry or None, marked as recently used"""
+        with self.lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def discard(self, conn):
+        """The connection's transaction rolled back (or is closing); forget what it saw"""
+        with self.lock:
+            self.pending.pop(conn, None)
+
+    def assign(self, cursor, original: str, correction: str) -> int:
+        """Cluster id for an error, creating a new cluster if nothing is close enough"""
+        key = canonical_key(original, correction)
+        cluster_id = self._cached(self.key_cache, key)
+        if cluster_id is not None:
+            return cluster_id
+        pending_keys, _ = self._pending(cursor)
+        cluster_id = pending_keys.get(key)
+        if cluster_id is not None:
+            return cluster_id
+
+        cursor.execute('SELECT cluster_id FROM error_cluster_keys WHERE canonical_key = ?', (key,))
+        row = cursor.fetchone()
+        if row:
+            pending_keys[key] = row[0]
+            return row[0]
+
+        signature = minhash(key)
+        bands = band_keys(signature)
+        cluster_id = self._nearest(cursor, signature, bands)
+        if cluster_id is None:
+            cluster_id = self._create(cursor, original, correction, signature, bands)
+
+        cursor.execute('INSERT OR IGNORE INTO error_cluster_keys (canonical_key, cluster_id) VALUES (?, ?)',
+                       (key, cluster_id))
+        pending_keys[key] = cluster_id
+        return cluster_id
+
+    def _nearest(self, cursor, signature, bands) -> Optional[int]:
+        placeholders = ','.join('?' * len(bands))
+        cursor.execute(f'''
+            SELECT DISTINCT cluster_id FROM error_cluster_bands WHERE band_key IN ({placeholders})
+        ''', bands)
+        _, pending_signatures = self._pending(cursor)
+        best, best_score = None, self.threshold
+        for (candidate,) in cursor.fetchall():
+            candidate_signature = self._cached(self.signature_cache, candidate) or pending_signatures.get(candidate)
+            if candidate_signature is None:
+                cursor.execute('SELECT signature FROM error_clusters WHERE cluster_id = ?', (candidate,))
+                row = cursor.fetchone()
+                if not row:
+                    continue
+                candidate_signature = pending_signatures[candidate] = _unpack(row[0])
+            score = similarity(signature, candidate_signature)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _create(self, cursor, original: str, correction: str, signature, bands) -> int:
+        cursor.execute('''
+            INSERT INTO error_clusters (original_text, correction, signature)
+            VALUES (?, ?, ?)
+        ''', (original, correction, _pack(signature)))
+        cluster_id = cursor.lastrowid
+        cursor.executemany('INSERT OR IGNORE INTO error_cluster_bands (band_key, cluster_id) VALUES (?, ?)',
+                           [(band, cluster_id) for band in bands])
+        self._pending(cursor)[1][cluster_id] = signature
+        return cluster_id
+
+
+def backfill(db_path: str = "english_learning.db", batch_size: int = 5000, rebuild: bool = False) -> int:
+    """Assign clusters to every error without one (all errors with rebuild=True)
+
+    Works in batches of error ids, committing per batch so an interrupted run
+    keeps its progress. Returns the number of errors clustered.
+    """
+    # Creates the cluster tables and columns on older databases
+    from simple_database import SimpleDatabase
+    SimpleDatabase(db_path)
+
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    cursor = conn.cursor()
+    if rebuild:
+        _remember_review_errors(cursor)
+        cursor.execute('UPDATE errors SET cluster_id = NULL')
+        for table in ('error_cluster_bands', 'error_cluster_keys', 'error_clusters'):
+            cursor.execute(f'DELETE FROM {table}')
+        conn.commit()
+
+    clusterer = ErrorClusterer()
+    clustered = 0
+    last_id = 0
+    try:
+        while True:
+            cursor.execute('''
+                SELECT error_id, original_text, correction FROM errors
+                WHERE cluster_id IS NULL AND error_id > ?
+                ORDER BY error_id
+                LIMIT ?
+            ''', (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            assignments = [(clusterer.assign(cursor, original, correction), error_id)
+                           for error_id, original, correction in rows]
+            cursor.executemany('UPDATE errors SET cluster_id = ? WHERE error_id = ?', assignments)
+            conn.commit()
+            clusterer.committed(conn)
+
+            clustered += len(rows)
+            last_id = rows[-1][0]
+
+        _refresh_counts(cursor)
+        _remap_reviews(cursor)
+        conn.commit()
+        return clustered
+    finally:
+        clusterer.discard(conn)
+        conn.close()
+
+
+def _remember_review_errors(cursor):
+    """Before a rebuild: note one of the learner's own errors for every scheduled review
+
+    The rebuild gives clusters new ids; _remap_reviews moves each review schedule to
+    whichever new cluster its error lands in. Kept in a table rather than in memory so a
+    rebuild interrupted part-way still remaps when it is run again (INSERT OR IGNORE keeps
+    the errors noted by the first run, while the old cluster ids were still valid).
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS review_cluster_remap (
+            review_id INTEGER PRIMARY KEY,
+            error_id INTEGER
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO review_cluster_remap (review_id, error_id)
+        SELECT r.review_id, (
+            SELECT MAX(e.error_id) FROM errors e
+            JOIN messages m ON e.message_id = m.message_id
+            JOIN conversations c ON m.conversation_id = c.conversation_id
+            WHERE e.cluster_id = r.cluster_id AND c.user_id = r.user_id
+        )
+        FROM review_queue r
+    ''')
+
+
+def _remap_reviews(cursor):
+    """After a rebuild: point review schedules at the rebuilt clusters, in the final transaction
+
+    Reviews whose error is gone are dropped. When old clusters merged, the learner keeps
+    the most urgent of their schedules for the merged cluster.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'review_cluster_remap'")
+    if not cursor.fetchone():
+        return
+    cursor.execute('DROP TABLE IF EXISTS temp.review_targets')
+    cursor.execute('''
+        CREATE TEMP TABLE review_targets AS
+        SELECT review_id, cluster_id,
+               ROW_NUMBER() OVER (PARTITION BY user_id, cluster_id ORDER BY due_at, review_id) AS position
+        FROM (
+            SELECT r.review_id, r.user_id, r.due_at,
+                   CASE WHEN x.review_id IS NULL THEN r.cluster_id ELSE e.cluster_id END AS cluster_id
+            FROM review_queue r
+            LEFT JOIN review_cluster_remap x ON x.review_id = r.review_id
+            LEFT JOIN errors e ON e.error_id = x.error_id
+        )
+    ''')
+    cursor.execute('''
+        DELETE FROM review_queue WHERE review_id IN (
+            SELECT review_id FROM review_targets WHERE cluster_id IS NULL OR position > 1
+        )
+    ''')
+    # Through unique placeholder ids first, so no row collides with one not yet moved
+    cursor.execute('''
+        UPDATE review_queue SET cluster_id = -review_id
+        WHERE review_id IN (SELECT review_id FROM review_cluster_remap)
+    ''')
+    cursor.execute('''
+        UPDATE review_queue SET cluster_id = (
+            SELECT t.cluster_id FROM review_targets t WHERE t.review_id = review_queue.review_id
+        ), change_seq = (
+            SELECT MAX(q.change_seq) + 1 FROM review_queue q WHERE q.user_id = review_queue.user_id
+        )
+        WHERE cluster_id < 0
+    ''')
+    cursor.execute('DROP TABLE review_targets')
+    cursor.execute('DROP TABLE review_cluster_remap')
+
+
+def _refresh_counts(cursor):
+    """Recompute the per-cluster totals and the per-user daily rollup from the errors table"""
+    cursor.execute('''
+        UPDATE error_clusters SET error_count = (
+            SELECT COUNT(*) FROM errors e WHERE e.cluster_id = error_clusters.cluster_id
+        )
+    ''')
+    cursor.execute('DELETE FROM error_cluster_counts')
+    cursor.execute('''
+        INSERT INTO error_cluster_counts (user_id, cluster_id, day, error_count)
+        SELECT c.user_id, e.cluster_id, DATE(m.timestamp), COUNT(*)
+        FROM errors e
+        JOIN messages m ON e.message_id = m.message_id
+        JOIN conversations c ON m.conversation_id = c.conversation_id
+        WHERE e.cluster_id IS NOT NULL AND c.user_id IS NOT NULL
+        GROUP BY c.user_id, e.cluster_id, DATE(m.timestamp)
+    ''')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Assign near-duplicate clusters to stored errors')
+    parser.add_argument('--db', default='english_learning.db', help='Database file (default: english_learning.db)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Errors per transaction (default: 5000)')
+    parser.add_argument('--rebuild', action='store_true', help='Discard existing clusters and recompute all')
+
+    args = parser.parse_args()
+
+    start = time.time()
+    clustered = backfill(args.db, args.batch_size, args.rebuild)
+
+    conn = sqlite3.connect(args.db)
+    clusters = conn.execute('SELECT COUNT(*) FROM error_clusters').fetchone()[0]
+    conn.close()
+    print(f"✅ Clustered {clustered} errors into {clusters} clusters in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Paginated terminal viewer for large error histories
+
+Errors are fetched one page at a time with keyset paging (newest first) and
+only the visible page is rendered as a compact table, so both the query and
+the rendering cost stay the same whether 20 or 200,000 errors match. A
+single error can be opened in full; filters by type and severity restart the
+listing from the newest match.
+"""
+from typing import Dict, List, Optional
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.prompt import Prompt
+from rich.table import Table
+
+PAGE_SIZE = 10
+COUNT_CAP = 1000
+SEVERITY_STYLES = {'critical': 'red', 'major': 'yellow', 'minor': 'blue'}
+
+HELP = ("[bold]n[/bold] next  [bold]p[/bold] previous  [bold]<number>[/bold] open  "
+        "[bold]t <type>[/bold] filter type  [bold]s <severity>[/bold] filter severity  "
+        "[bold]c[/bold] clear filters  [bold]q[/bold] quit")
+
+
+def _filter_value(value: Optional[str]) -> Optional[str]:
+    """Filters match the stored values, which are lowercase (see error_analysis.parse_analysis)"""
+    return (value or '').strip().lower() or None
+
+
+def _clip(text: Optional[str], width: int) -> str:
+    text = (text or '').replace('\n', ' ')
+    return text if len(text) <= width else text[:width - 1] + '…'
+
+
+class ErrorViewer:
+    """Interactive pager over one user's errors"""
+
+    def __init__(self, db, user_id: int, console: Console = None, page_size: int = PAGE_SIZE,
+                 days: int = None, error_type: str = None, severity: str = None):
+        self.db = db
+        self.user_id = user_id
+        self.console = console or Console()
+        self.page_size = page_size
+        self.days = days
+        self.error_type = _filter_value(error_type)
+        self.severity = _filter_value(severity)
+        self._reset()
+
+    def _reset(self):
+        """Back to the first page (after a filter change)"""
+        self.cursors: List[Optional[int]] = [None]   # before_id of each visited page
+        self.page: List[Dict] = []
+        self.has_more = False
+        self.total = None
+
+    def load_page(self):
+        rows = self.db.get_error_page(self.user_id, self.page_size, self.cursors[-1], self.days,
+                                      self.error_type, self.severity)
+        self.has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.total is None:
+            self.total = self.db.count_user_errors(self.user_id, self.days, self.error_type,
+                                                   self.severity, cap=COUNT_CAP)
+
+    def next_page(self) -> bool:
+        if not self.has_more:
+            return False
+        self.cursors.append(self.page[-1]['error_id'])
+        self.load_page()
+        return True
+
+    def previous_page(self) -> bool:
+        if len(self.cursors) == 1:
+            return False
+        self.cursors.pop()
+        self.load_page()
+        return True
+
+    def set_filter(self, error_type: str = None, severity: str = None):
+        self.error_type = _filter_value(error_type)
+        self.severity = _filter_value(severity)
+        self._reset()
+        self.load_page()
+
+    def render(self):
+        """Draw the current page only"""
+        if self.console.is_terminal:
+            self.console.clear()
+
+        filters = [f"last {self.days} days" if self.days else "all time"]
+        if self.error_type:
+            filters.append(f"type={self.error_type}")
+        if self.severity:
+            filters.append(f"severity={self.severity}")
+        total = f"{COUNT_CAP}+" if self.total >= COUNT_CAP else str(self.total)
+        page_number = len(self.cursors)
+        first = (page_number - 1) * self.page_size + 1
+
+        table = Table(title=f"🔍 Error History ({', '.join(filters)}) — page {page_number}, {total} errors",
+                      expand=True)
+        table.add_column("#", justify="right", style="dim", width=4)
+        table.add_column("When", style="dim", width=16, no_wrap=True)
+        table.add_column("Type", width=12, no_wrap=True)
+        table.add_column("Error → Correction", ratio=1, no_wrap=True)
+
+        for offset, error in enumerate(self.page):
+            style = SEVERITY_STYLES.get(error['severity'], 'blue')
+            table.add_row(
+                str(first + offset),
+                (error['timestamp'] or '')[:16],
+                f"[{style}]{error['error_type']}[/{style}]",
+                f"[red]{_clip(error['original_text'], 40)}[/red] → [green]{_clip(error['correction'], 40)}[/green]"
+            )
+        self.console.print(table)
+
+        position = []
+        if len(self.cursors) > 1:
+            position.append("◀ p")
+        if self.has_more:
+            position.append("n ▶")
+        self.console.print(f"{'  '.join(position)}    {HELP}", style="dim")
+
+    def show_detail(self, number: int):
+        """Full panel for the error with this on-screen number"""
+        index = number - (len(self.cursors) - 1) * self.page_size - 1
+        if not 0 <= index < len(self.page):
+            self.console.print("No error with that number on this page.", style="yellow")
+            return
+        error = self.page[index]
+        self.console.print(Panel(
+            f"[bold]Message:[/bold] {error['user_message']}\n\n"
+            f"[bold red]Error:[/bold red] {error['original_text']}\n"
+            f"[bold green]Correction:[/bold green] {error['correction']}\n\n"
+            f"[bold]Explanation:[/bold] {error['explanation']}\n\n"
+            f"[dim]Type: {error['error_type']} | Severity: {error['severity']} | "
+            f"Time: {error['timestamp']} | Confidence: {error['confidence']:.1f} | "
+            f"Found by: {error['detected_by']}[/dim]",
+            title=f"Error #{number}",
+            border_style=SEVERITY_STYLES.get(error['severity'], 'blue')
+        ))
+        Prompt.ask("[dim]Enter to go back[/dim]", default="", show_default=False)
+
+    def run(self):
+        self.load_page()
+        if not self.page:
+            self.console.print("🎉 No errors found in the specified period!", style="bold green")
+            return
+
+        while True:
+            self.render()
+            command = Prompt.ask("📖 Page", default="n", show_default=False).strip()
+            action, _, argument = command.partition(' ')
+            action = action.lower()
+
+            if action in ('q', 'quit', 'exit'):
+                return
+            elif action in ('n', 'next', ''):
+                if not self.next_page():
+                    self.console.print("Last page.", style="dim")
+                    if not self.console.is_terminal:
+                        return
+            elif action in ('p', 'prev', 'previous'):
+                self.previous_page()
+            elif action == 't':
+                self.set_filter(argument, self.severity)
+            elif action == 's':
+                self.set_filter(self.error_type, argument)
+            elif action == 'c':
+                self.set_filter(None, None)
+            elif action.isdigit():
+                self.show_detail(int(action))
+            else:
+                self.console.print(HELP)
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Percentile summaries shared by the benchmarks, the turn profiler and the trace analyzer
+"""
+from typing import Dict, List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(values: List[float]) -> Dict:
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        'p50': round(percentile(ordered, 50), 3),
+        'p90': round(percentile(ordered, 90), 3),
+        'p95': round(percentile(ordered, 95), 3),
+        'p99': round(percentile(ordered, 99), 3),
+        'max': round(ordered[-1], 3) if ordered else 0.0
+    }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Startup, memory and lookup benchmark for the CEFR lexicon and level estimator
+
+Compares the sorted-array lexicon used by cefr.py with a plain dict built from
+the same entries: cold start in a fresh interpreter, load time, allocated
+memory, per-word lookup and per-message estimate latency.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+from typing import Dict, List
+
+from latency_stats import summarize
+from cefr import CEFRLexicon, DEFAULT_LEXICON_PATH, estimate_level
+from vocabulary import tokenize, lemmatize
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Inflected forms the lemmatizer must map to the lexicon's entry
+LEMMA_CHECKS = {
+    'shoes': 'shoe', 'toes': 'toe', 'sizes': 'size', 'prizes': 'prize', 'quizzes': 'quiz',
+    'canoes': 'canoe', 'potatoes': 'potato', 'heroes': 'hero', 'goes': 'go', 'boxes': 'box',
+    'watches': 'watch', 'dishes': 'dish', 'classes': 'class', 'buzzes': 'buzz', 'studies': 'study',
+    'went': 'go', 'running': 'run', 'making': 'make', 'stopped': 'stop', 'loved': 'love',
+}
+
+
+def sample_messages() -> List[str]:
+    """Learner sentences from the rule corpus plus the recorded tutor replies"""
+    messages = []
+    for name, field in (('rule_corpus.jsonl', 'text'), ('mock_responses.jsonl', 'response')):
+        path = os.path.join(SCRIPT_DIR, name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                messages.extend(json.loads(line)[field] for line in f if line.strip())
+    return messages
+
+
+def cold_start_ms(runs: int) -> Dict:
+    """Import cefr and load the lexicon in a fresh interpreter"""
+    code = ("import time; t = time.perf_counter(); import cefr; cefr.get_lexicon(); "
+            "print((time.perf_counter() - t) * 1000)")
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip()))
+    return summarize(timings)
+
+
+def measure_load(build, runs: int) -> Dict:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        build()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    structure = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del structure
+    return {'load_ms': summarize(timings), 'memory_kb': round(current / 1024, 1)}
+
+
+def measure_lookup(lookup, lemmas: List[str], repeat: int) -> float:
+    """Mean nanoseconds per lookup"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for lemma in lemmas:
+            lookup(lemma)
+    return round((time.perf_counter() - start) / (repeat * len(lemmas)) * 1e9, 1)
+
+
+def run_benchmark(args) -> Dict:
+    lexicon = CEFRLexicon.load(args.lexicon)
+    messages = sample_messages()
+    lemmas = [lemmatize(token) for message in messages for token in tokenize(message)]
+
+    def build_dict():
+        loaded = CEFRLexicon.load(args.lexicon)
+        return dict(zip(loaded.words, loaded.levels))
+
+    as_dict = build_dict()
+    known = sum(1 for lemma in lemmas if lexicon.level_of(lemma) is not None)
+
+    estimate_us = []
+    for message in messages:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            estimate_level(message, lexicon)
+        estimate_us.append((time.perf_counter() - start) / args.repeat * 1e6)
+
+    return {
+        'lemma_errors': {form: lemmatize(form) for form, lemma in LEMMA_CHECKS.items() if lemmatize(form) != lemma},
+        'entries': len(lexicon),
+        'coverage': round(known / len(lemmas), 3) if lemmas else 0.0,
+        'cold_start_ms': cold_start_ms(args.cold_runs),
+        'sorted_arrays': dict(measure_load(lambda: CEFRLexicon.load(args.lexicon), args.runs),
+                              lookup_ns=measure_lookup(lexicon.level_of, lemmas, args.repeat)),
+        'dict': dict(measure_load(build_dict, args.runs),
+                     lookup_ns=measure_lookup(as_dict.get, lemmas, args.repeat)),
+        'estimate_us': summarize(estimate_us),
+        'messages': len(messages)
+    }
+
+
+def print_report(results: Dict):
+    print(f"\n📚 CEFR lexicon: {results['entries']} lemmas, "
+          f"{results['coverage']:.0%} of sample tokens covered ({results['messages']} messages)")
+    wrong = results['lemma_errors']
+    print(f"  Lemmatizer: {len(LEMMA_CHECKS) - len(wrong)}/{len(LEMMA_CHECKS)} checked forms correct" +
+          "".join(f"\n    ❌ {form} -> {lemma} (expected {LEMMA_CHECKS[form]})" for form, lemma in wrong.items()))
+    cold = results['cold_start_ms']
+    print(f"  Cold start (import + load): p50 {cold['p50']:.1f}ms, max {cold['max']:.1f}ms")
+
+    print(f"\n  {'structure':14} {'load p50':>10} {'memory':>10} {'lookup':>10}")
+    for name in ('sorted_arrays', 'dict'):
+        stats = results[name]
+        print(f"  {name:14} {stats['load_ms']['p50']:8.2f}ms {stats['memory_kb']:8.1f}KB {stats['lookup_ns']:8.1f}ns")
+
+    estimate = results['estimate_us']
+    print(f"\n  Level estimate per message: p50 {estimate['p50']:.1f}µs, p99 {estimate['p99']:.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the CEFR lexicon and level estimator')
+    parser.add_argument('--lexicon', default=DEFAULT_LEXICON_PATH, help='Lexicon file')
+    parser.add_argument('--runs', type=int, default=20, help='In-process load repetitions (default: 20)')
+    parser.add_argument('--cold-runs', type=int, default=5, help='Fresh interpreter starts (default: 5)')
+    parser.add_argument('--repeat', type=int, default=200, help='Lookup/estimate repetitions (default: 200)')
+    parser.add_argument('--output', '-o', help='Save the results as JSON')
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark for the full tutor turn pipeline
+
+Runs N concurrent synthetic learners through the real EnglishTutor turn
+(process_user_message_stream and display_streaming_response, with a quiet
+console and no typing delay) against a local mock completion server and saves
+the per-stage timings of each learner's TurnProfiler as JSON.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+import contextlib
+from datetime import datetime
+from typing import Dict, List
+
+from rich.console import Console
+
+from latency_stats import percentile, summarize
+from mock_server import MockCompletionServer, MockConfig, load_replays, DEFAULT_REPLAY_FILE
+from turn_profiler import TurnProfiler
+
+# Profiler stages of a turn; db_turn adds up the writes after the reply
+STAGES = ['db_user_message', 'rule_check', 'prompt_build', 'request_first_token', 'stream_drain', 'parse',
+          'render_reply', 'db_turn', 'turn']
+DB_TURN_STAGES = ('db_errors', 'db_assistant_message', 'db_progress')
+
+LEARNER_SENTENCES = [
+    "I go to school yesterday and learn many thing.",
+    "My favorite color are blue because it calm.",
+    "She have a beautiful house and nice garden.",
+    "I am very interesting in science.",
+    "Can you help me with my homeworks please?",
+    "He don't like pizza, but I do.",
+    "I have seen him yesterday.",
+    "The informations are very useful.",
+    "I am studying English since three years.",
+    "She is more taller than her brother.",
+    "Hello, how are you today?",
+    "What's your opinion about artificial intelligence?",
+    "Tell me about quantum physics in simple terms",
+    "Last weekend I visited my grandparents in the countryside.",
+    "I want to improve my speaking for job interviews.",
+]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def create_learner(learner_id: int, args, db_path: str):
+    """Set up one synthetic learner's tutor and conversation"""
+    # Imported here so DEEPSEEK_BASE_URL is already pointing at the mock server
+    from english_tutor import EnglishTutor
+
+    rng = random.Random(args.seed + learner_id)
+    tutor = EnglishTutor(f"bench_learner_{learner_id}", rng.choice(['A2', 'B1', 'B2']), db_path=db_path,
+                         profiler=TurnProfiler())
+    tutor.console = Console(quiet=True)
+    tutor.typing_delay = 0
+    tutor.start_conversation("Load benchmark")
+    return tutor, rng
+
+
+def run_learner(learner_id: int, tutor, rng: random.Random, args, barrier: threading.Barrier,
+                timings: Dict[str, List[float]], failures: List[str], lock: threading.Lock):
+    """One synthetic learner: a conversation of `turns` turns through the real pipeline"""
+    local = {stage: [] for stage in STAGES}
+    barrier.wait()
+
+    for _ in range(args.turns):
+        message = rng.choice(LEARNER_SENTENCES)
+        try:
+            stream, response_time_ms = tutor.process_user_message_stream(message)
+            tutor.display_streaming_response(stream, response_time_ms)
+        except Exception as e:
+            # Drop the failed turn's partial timings
+            tutor.profiler.turn = None
+            with lock:
+                failures.append(f"learner {learner_id}: {e}")
+        else:
+            turn = tutor.profiler.turns[-1]
+            stages = turn['stages_ms']
+            for stage in STAGES[:-2]:
+                local[stage].append(stages.get(stage, 0.0))
+            local['db_turn'].append(sum(stages.get(stage, 0.0) for stage in DB_TURN_STAGES))
+            local['turn'].append(turn['total_ms'])
+
+        if args.think_ms:
+            time.sleep(rng.uniform(0, args.think_ms) / 1000)
+
+    with lock:
+        for stage, values in local.items():
+            timings[stage].extend(values)
+
+
+def run_benchmark(args) -> Dict:
+    try:
+        replays = load_replays(args.replay)
+    except FileNotFoundError:
+        replays = []
+
+    server = MockCompletionServer(port=0, config=MockConfig(
+        ttft_ms=args.ttft_ms, token_delay_ms=args.token_delay_ms,
+        jitter_ms=args.jitter_ms, replays=replays, seed=args.seed
+    )).start()
+    os.environ['DEEPSEEK_BASE_URL'] = server.base_url
+    os.environ.setdefault('DEEPSEEK_API_KEY', 'mock-key')
+
+    db_dir = tempfile.mkdtemp(prefix='tutor_bench_')
+    db_path = os.path.join(db_dir, 'bench.db')
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    timings = {stage: [] for stage in STAGES}
+    failures = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.learners + 1)
+
+    # Setup happens before the clock starts; silence the per-tutor startup banners
+    with contextlib.redirect_stdout(io.StringIO()):
+        learners = [create_learner(i, args, db_path) for i in range(args.learners)]
+
+    threads = [
+        threading.Thread(target=run_learner, args=(i, tutor, rng, args, barrier, timings, failures, lock))
+        for i, (tutor, rng) in enumerate(learners)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Start the clock once every learner is set up
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - start
+
+    memory = {'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        memory['tracemalloc_peak_mb'] = round(peak / 1024 / 1024, 2)
+        tracemalloc.stop()
+
+    server.stop()
+    shutil.rmtree(db_dir, ignore_errors=True)
+
+    # Lock wait estimate: DB write time above the uncontended median (fastest decile)
+    db_writes = sorted(timings['db_user_message'] + timings['db_turn'])
+    baseline = percentile(db_writes[:max(len(db_writes) // 10, 1)], 50) if db_writes else 0.0
+    lock_waits = [max(value - baseline, 0.0) for value in db_writes]
+
+    completed = len(timings['turn'])
+    return {
+        'benchmark': 'tutor_turn_pipeline',
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'config': {
+            'learners': args.learners,
+            'turns_per_learner': args.turns,
+            'ttft_ms': args.ttft_ms,
+            'token_delay_ms': args.token_delay_ms,
+            'jitter_ms': args.jitter_ms,
+            'think_ms': args.think_ms,
+            'seed': args.seed
+        },
+        'results': {
+            'wall_seconds': round(wall_seconds, 3),
+            'turns_completed': completed,
+            'turns_failed': len(failures),
+            'turns_per_second': round(completed / wall_seconds, 2) if wall_seconds else 0.0,
+            'stages_ms': {stage: summarize(values) for stage, values in timings.items()},
+            'db_lock_wait_ms': {
+                'baseline_write_ms': round(baseline, 3),
+                'total': round(sum(lock_waits), 1),
+                **summarize(lock_waits)
+            },
+            'memory': memory,
+            'mock_server': dict(server.stats)
+        },
+        'failures': failures[:20]
+    }
+
+
+def print_report(report: Dict, previous: Dict = None):
+    results = report['results']
+    print(f"\n📊 Tutor pipeline benchmark ({report['commit']})")
+    print(f"  Learners: {report['config']['learners']} × {report['config']['turns_per_learner']} turns")
+    print(f"  Throughput: {results['turns_per_second']} turns/s "
+          f"({results['turns_completed']} ok, {results['turns_failed']} failed in {results['wall_seconds']}s)")
+
+    print(f"\n  {'stage':20} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for stage, stats in results['stages_ms'].items():
+        line = f"  {stage:20} {stats['p50']:9.2f} {stats['p95']:9.2f} {stats['p99']:9.2f} {stats['max']:9.2f}"
+        if previous:
+            old = previous['results']['stages_ms'].get(stage, {}).get('p95')
+            if old:
+                line += f"   p95 {((stats['p95'] - old) / old):+.0%} vs {previous['commit']}"
+        print(line)
+
+    lock_wait = results['db_lock_wait_ms']
+    print(f"\n  DB lock wait: total {lock_wait['total']}ms, p95 {lock_wait['p95']}ms "
+          f"(baseline write {lock_wait['baseline_write_ms']}ms)")
+    print(f"  Memory: {results['memory']}")
+    if previous:
+        old_tps = previous['results']['turns_per_second']
+        print(f"  Throughput vs {previous['commit']}: {old_tps} → {results['turns_per_second']} turns/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load benchmark for the English tutor turn pipeline')
+    parser.add_argument('--learners', '-n', type=int, default=10, help='Concurrent synthetic learners (default: 10)')
+    parser.add_argument('--turns', type=int, default=20, help='Turns per learner (default: 20)')
+    parser.add_argument('--ttft-ms', type=float, default=100.0, help='Mock time to first token (default: 100)')
+    parser.add_argument('--token-delay-ms', type=float, default=5.0, help='Mock delay between tokens (default: 5)')
+    parser.add_argument('--jitter-ms', type=float, default=2.0, help='Mock jitter (default: 2)')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='Max random pause between turns')
+    parser.add_argument('--replay', default=DEFAULT_REPLAY_FILE, help='Recorded responses for the mock server')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tracemalloc', action='store_true', help='Track Python allocation peak (slower)')
+    parser.add_argument('--output', '-o', default='load_benchmark_results.json', help='Where to save the JSON results')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+
+    print_report(report, previous)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
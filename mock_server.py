@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Local mock OpenAI-compatible completion server for offline load and latency testing
+
+Point any entry point at it with:
+    export DEEPSEEK_BASE_URL=http://127.0.0.1:8765
+"""
+import json
+import time
+import random
+import re
+import threading
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from context_window import estimate_tokens
+
+DEFAULT_REPLAY_FILE = "mock_responses.jsonl"
+
+DEFAULT_RESPONSE = (
+    "That sounds interesting! Could you tell me a little more about it? "
+    "I'd love to hear what you think."
+)
+
+
+def load_replays(path: str) -> List[Dict]:
+    """Load recorded responses: one {"match": ..., "response": ...} object per line"""
+    replays = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                replays.append(json.loads(line))
+    return replays
+
+
+ERROR_LINE = re.compile(r'Error found:\s*"([^"]+)"\s*→\s*"([^"]+)"\s*-\s*(.+)')
+
+
+def to_json_response(text: str) -> str:
+    """Convert a tutor-format recording into the JSON analysis format used by JSON-mode callers"""
+    parts = text.split('---')
+    errors = []
+    for match in ERROR_LINE.finditer(parts[1] if len(parts) > 1 else ''):
+        errors.append({
+            'error_type': 'grammar',
+            'severity': 'major',
+            'original_text': match.group(1),
+            'correction': match.group(2),
+            'explanation': match.group(3).strip(),
+            'confidence': 0.9
+        })
+
+    return json.dumps({
+        'conversation_response': parts[0].strip(),
+        'error_analysis': {
+            'has_errors': bool(errors),
+            'error_count': len(errors),
+            'errors': errors,
+            'overall_score': 75 if errors else 90
+        }
+    })
+
+
+def wants_json(request: Dict) -> bool:
+    """JSON mode, or a system prompt that asks for JSON output"""
+    if (request.get('response_format') or {}).get('type') == 'json_object':
+        return True
+    messages = request.get('messages') or []
+    return bool(messages) and messages[0].get('role') == 'system' and 'JSON' in (messages[0].get('content') or '')
+
+
+def wants_conversation_only(messages: List[Dict]) -> bool:
+    """Dual-call conversation prompt: the reply carries no learning notes"""
+    return bool(messages) and 'corrections are handled separately' in (messages[0].get('content') or '')
+
+
+def split_tokens(text: str) -> List[str]:
+    """Split a response into word-sized stream chunks, keeping whitespace"""
+    return re.findall(r'\s*\S+', text) or [text]
+
+
+class MockConfig:
+    def __init__(self, ttft_ms: float = 200.0, token_delay_ms: float = 15.0,
+                 jitter_ms: float = 5.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, disconnect_rate: float = 0.0,
+                 replays: List[Dict] = None, seed: int = None):
+        self.ttft_ms = ttft_ms
+        self.token_delay_ms = token_delay_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.disconnect_rate = disconnect_rate
+        self.replays = replays or []
+        self.random = random.Random(seed)
+
+    def delay(self, base_ms: float):
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        time.sleep(max(base_ms + jitter, 0.0) / 1000)
+
+    def pick_response(self, messages: List[Dict]) -> str:
+        """Replay the first recording whose `match` appears in the last user message"""
+        user_text = ''
+        for message in reversed(messages):
+            if message.get('role') == 'user':
+                user_text = message.get('content') or ''
+                break
+
+        lowered = user_text.lower()
+        for replay in self.replays:
+            if replay['match'].lower() in lowered:
+                return replay['response']
+        return DEFAULT_RESPONSE
+
+
+class MockCompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet
+        pass
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'deepseek-chat', 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+        config = server.config
+
+        with server.lock:
+            server.stats['requests'] += 1
+            roll = config.random.random()
+
+        # Error injection
+        if roll < config.rate_limit_rate:
+            server.count('rate_limited')
+            self._send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error'}})
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            server.count('errors')
+            self._send_json(500, {'error': {'message': 'Injected server error', 'type': 'server_error'}})
+            return
+
+        messages = request.get('messages', [])
+        text = config.pick_response(messages)
+        if wants_json(request):
+            text = to_json_response(text)
+        elif wants_conversation_only(messages):
+            text = text.split('---')[0].strip()
+        usage = server.usage_for(messages, text)
+        completion_id = f"chatcmpl-mock-{int(time.time() * 1000)}"
+        model = request.get('model', 'deepseek-chat')
+
+        if not request.get('stream'):
+            config.delay(config.ttft_ms + config.token_delay_ms * len(split_tokens(text)))
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': text},
+                    'finish_reason': 'stop'
+                }],
+                'usage': usage
+            })
+            server.count('completed')
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def send_chunk(delta: Dict, finish_reason: Optional[str] = None, chunk_usage: Dict = None):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}] if delta is not None else [],
+            }
+            if chunk_usage is not None:
+                chunk['usage'] = chunk_usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        try:
+            config.delay(config.ttft_ms)
+            send_chunk({'role': 'assistant', 'content': ''})
+
+            tokens = split_tokens(text)
+            disconnect_at = None
+            if config.random.random() < config.disconnect_rate:
+                disconnect_at = config.random.randrange(len(tokens))
+
+            for i, token in enumerate(tokens):
+                if i == disconnect_at:
+                    server.count('disconnects')
+                    return
+                if i:
+                    config.delay(config.token_delay_ms)
+                send_chunk({'content': token})
+
+            send_chunk({}, finish_reason='stop')
+            if (request.get('stream_options') or {}).get('include_usage'):
+                send_chunk(None, chunk_usage=usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            server.count('completed')
+        except (BrokenPipeError, ConnectionResetError):
+            server.count('client_aborts')
+
+
+class MockCompletionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: MockConfig = None):
+        super().__init__((host, port), MockCompletionHandler)
+        self.config = config or MockConfig()
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'completed': 0, 'errors': 0, 'rate_limited': 0,
+                      'disconnects': 0, 'client_aborts': 0}
+        self._seen_prefixes = set()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str):
+        with self.lock:
+            self.stats[name] += 1
+
+    def usage_for(self, messages: List[Dict], text: str) -> Dict:
+        """Usage block with simulated prefix-cache hits on a repeated system prompt"""
+        prompt_tokens = sum(estimate_tokens(m.get('content') or '') + 4 for m in messages)
+        hit_tokens = 0
+        if messages and messages[0].get('role') == 'system':
+            prefix = messages[0].get('content') or ''
+            with self.lock:
+                if prefix in self._seen_prefixes:
+                    hit_tokens = estimate_tokens(prefix)
+                else:
+                    self._seen_prefixes.add(prefix)
+
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': estimate_tokens(text),
+            'total_tokens': prompt_tokens + estimate_tokens(text),
+            'prompt_cache_hit_tokens': hit_tokens,
+            'prompt_cache_miss_tokens': prompt_tokens - hit_tokens
+        }
+
+    def start(self):
+        """Serve in a background thread (for benchmarks and scripts)"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock OpenAI-compatible streaming server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ttft-ms', type=float, default=200.0, help='Time to first token (default: 200)')
+    parser.add_argument('--token-delay-ms', type=float, default=15.0, help='Delay between tokens (default: 15)')
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help='Random +/- jitter on each delay (default: 5)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 429')
+    parser.add_argument('--disconnect-rate', type=float, default=0.0, help='Fraction of streams cut off mid-response')
+    parser.add_argument('--replay', default=DEFAULT_REPLAY_FILE, help='Recorded responses (JSONL)')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible runs')
+
+    args = parser.parse_args()
+
+    try:
+        replays = load_replays(args.replay)
+    except FileNotFoundError:
+        print(f"⚠️  Replay file not found: {args.replay}, using the default response")
+        replays = []
+
+    config = MockConfig(args.ttft_ms, args.token_delay_ms, args.jitter_ms, args.error_rate,
+                        args.rate_limit_rate, args.disconnect_rate, replays, args.seed)
+    server = MockCompletionServer(args.host, args.port, config)
+
+    print(f"🧪 Mock completion server on {server.base_url} ({len(replays)} recorded responses)")
+    print(f"Use it with: export DEEPSEEK_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
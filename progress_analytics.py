@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Vectorized progress analytics over learning_progress
+
+One query loads the daily rows of a user (or of every user) into dense
+user x day NumPy matrices; rolling means, error rate per 100 words, trend
+slopes, improvement and streaks are then computed for all users at once
+with cumulative sums and masked least squares, no per-user Python loops.
+
+Requires NumPy (`uv sync --extra analytics`).
+
+    uv run progress_analytics.py --db english_learning.db --days 30
+"""
+import json
+import time
+import sqlite3
+import argparse
+from datetime import date, timedelta
+from itertools import chain
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_WINDOW = 7
+MIN_TREND_DAYS = 3     # fewer active days than this give no slope
+JULIAN_DAY_OFFSET = 1721424.5   # date.toordinal() + offset == SQLite julianday() at midnight
+FETCH_ROWS = 50000     # rows per fetchmany() batch in load_progress
+COLUMNS = 7            # cell, then the six daily counters of the load query
+
+
+class ProgressSeries:
+    """Daily counters as (users, days) matrices; column 0 is `start`, the last column today"""
+
+    def __init__(self, user_ids: np.ndarray, start: date, messages: np.ndarray, errors: np.ndarray,
+                 words: np.ndarray, score_sum: np.ndarray, new_words: np.ndarray, scored: np.ndarray):
+        self.user_ids = user_ids
+        self.start = start
+        self.messages = messages
+        self.errors = errors
+        self.words = words
+        self.score_sum = score_sum
+        self.new_words = new_words
+        self.scored = scored          # messages with a score, the denominator of score_sum
+
+    @property
+    def days(self) -> int:
+        return self.messages.shape[1]
+
+    def dates(self) -> List[str]:
+        return [(self.start + timedelta(days=i)).isoformat() for i in range(self.days)]
+
+
+def load_progress(db_path: str = "english_learning.db", user_id: int = None, days: int = 30,
+                  today: date = None) -> ProgressSeries:
+    """Load the last `days` days of learning_progress for one user or all users"""
+    today = today or date.today()
+    start = today - timedelta(days=days - 1)
+
+    conn = sqlite3.connect(db_path, timeout=10.0)
+    # Building a Python object per fetched value is most of the load time, so SQLite
+    # folds user and day into one number: user_id * days + day
+    query = '''
+        SELECT user_id * ? + CAST(julianday(date) - ? AS INTEGER), messages_sent, total_errors,
+               IFNULL(words_written, 0), IFNULL(avg_score * scored_messages, 0), unique_words_used,
+               scored_messages
+        FROM learning_progress
+        WHERE date >= ? AND date <= ?
+    '''
+    params = [days, start.toordinal() + JULIAN_DAY_OFFSET, start.isoformat(), today.isoformat()]
+    if user_id is not None:
+        query += ' AND user_id = ?'
+        params.append(user_id)
+
+    # Batches go straight into arrays instead of holding every row tuple at once
+    batches = []
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        batches.append(np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=COLUMNS * len(rows)))
+    conn.close()
+    table = np.concatenate(batches).reshape(-1, COLUMNS) if batches else np.empty((0, COLUMNS))
+
+    keys = table[:, 0].astype(np.int64)
+    user_ids, user_index = np.unique(keys // days, return_inverse=True)
+
+    # Flat (user, day) cell index; bincount also sums duplicate rows for the same day
+    cells = user_index * days + keys % days
+    size = len(user_ids) * days
+
+    def grid(column: int) -> np.ndarray:
+        return np.bincount(cells, weights=table[:, column], minlength=size).reshape(len(user_ids), days)
+
+    return ProgressSeries(user_ids, start, grid(1), grid(2), grid(3), grid(4), grid(5), grid(6))
+
+
+def rolling_sum(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sum over `window` days along each row (shorter at the start)"""
+    cumulative = np.cumsum(matrix, axis=1)
+    if window < matrix.shape[1]:
+        cumulative[:, window:] -= cumulative[:, :-window].copy()
+    return cumulative
+
+
+def ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    """scale * numerator / denominator, NaN where the denominator is 0"""
+    result = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    if scale != 1.0:
+        result *= scale
+    return result
+
+
+def trend_slope(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Least-squares slope per day of each row, using only the days in mask"""
+    weights = mask.astype(np.float64)
+    x = np.arange(values.shape[1], dtype=np.float64)
+    y = np.where(mask, values, 0.0)
+
+    n = weights.sum(axis=1)
+    sum_x = weights @ x
+    sum_y = y.sum(axis=1)
+    sum_xx = weights @ (x * x)
+    sum_xy = y @ x
+    denominator = n * sum_xx - sum_x ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sum_xy - sum_x * sum_y) / denominator
+    return np.where((n >= MIN_TREND_DAYS) & (denominator > 0), slope, np.nan)
+
+
+def streaks(active: np.ndarray):
+    """(current, longest) runs of consecutive active days per row
+
+    The current streak still counts when today has no activity yet but yesterday had.
+    """
+    days = active.shape[1]
+    position = np.arange(1, days + 1)
+    last_gap = np.maximum.accumulate(np.where(active, 0, position), axis=1)
+    run = np.where(active, position - last_gap, 0)
+    longest = run.max(axis=1)
+    if days < 2:
+        return run[:, -1], longest
+    current = np.where(active[:, -1], run[:, -1], run[:, -2])
+    return current, longest
+
+
+def compute_metrics(series: ProgressSeries, window: int = DEFAULT_WINDOW) -> Dict[str, np.ndarray]:
+    """Per-user summary arrays and per-day matrices for every user in the series"""
+    active = (series.messages > 0) | (series.words > 0)
+    error_rate = ratio(series.errors, series.words, 100.0)
+    score = ratio(series.score_sum, series.scored)
+
+    rolling_errors = rolling_sum(series.errors, window)
+    rolling_words = rolling_sum(series.words, window)
+    rolling_rate = ratio(rolling_errors, rolling_words, 100.0)
+    rolling_score = ratio(rolling_sum(series.score_sum, window), rolling_sum(series.scored, window))
+
+    # Improvement: error rate of the earlier half of the period against the later half
+    half = series.days // 2
+    early_rate = ratio(series.errors[:, :half].sum(axis=1), series.words[:, :half].sum(axis=1), 100.0)
+    late_rate = ratio(series.errors[:, half:].sum(axis=1), series.words[:, half:].sum(axis=1), 100.0)
+    improvement = ratio(early_rate - late_rate, early_rate, 100.0)
+
+    current_streak, longest_streak = streaks(active)
+    total_words = series.words.sum(axis=1)
+
+    return {
+        'user_ids': series.user_ids,
+        'active_days': active.sum(axis=1),
+        'messages': series.messages.sum(axis=1),
+        'errors': series.errors.sum(axis=1),
+        'words': total_words,
+        'new_words': series.new_words.sum(axis=1),
+        'error_rate': ratio(series.errors.sum(axis=1), total_words, 100.0),
+        'recent_error_rate': rolling_rate[:, -1],
+        'avg_score': ratio(series.score_sum.sum(axis=1), series.scored.sum(axis=1)),
+        'error_rate_slope': trend_slope(error_rate, series.words > 0),
+        'score_slope': trend_slope(score, series.scored > 0),
+        'improvement': improvement,
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        # (users, days)
+        'daily_error_rate': error_rate,
+        'rolling_error_rate': rolling_rate,
+        'daily_score': score,
+        'rolling_score': rolling_score,
+    }
+
+
+COUNT_METRICS = {'active_days', 'messages', 'errors', 'words', 'new_words', 'current_streak', 'longest_streak'}
+
+
+def _number(value) -> Optional[float]:
+    """JSON-friendly scalar: None for NaN"""
+    value = float(value)
+    return None if np.isnan(value) else round(value, 2)
+
+
+def user_report(db_path: str, user_id: int, days: int = 30, window: int = DEFAULT_WINDOW) -> Optional[Dict]:
+    """Progress summary and daily series of one user, None without any activity in the period"""
+    series = load_progress(db_path, user_id, days)
+    if not len(series.user_ids):
+        return None
+    metrics = compute_metrics(series, window)
+
+    daily = []
+    for i, day in enumerate(series.dates()):
+        if series.messages[0, i] or series.words[0, i]:
+            daily.append({
+                'date': day,
+                'messages': int(series.messages[0, i]),
+                'errors': int(series.errors[0, i]),
+                'words': int(series.words[0, i]),
+                'error_rate': _number(metrics['daily_error_rate'][0, i]),
+                'rolling_error_rate': _number(metrics['rolling_error_rate'][0, i]),
+                'score': _number(metrics['daily_score'][0, i]),
+                'rolling_score': _number(metrics['rolling_score'][0, i]),
+            })
+
+    summary = {name: int(values[0]) if name in COUNT_METRICS else _number(values[0])
+               for name, values in metrics.items() if values.ndim == 1 and name != 'user_ids'}
+    return dict(summary, daily=daily, window=window, analysis_period_days=days)
+
+
+def cohort_summary(metrics: Dict[str, np.ndarray]) -> Dict:
+    """Distribution of the per-user metrics across all users"""
+    def distribution(values: np.ndarray) -> Optional[Dict]:
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return None
+        p25, p50, p75 = np.percentile(values, [25, 50, 75])
+        return {'p25': round(p25, 2), 'p50': round(p50, 2), 'p75': round(p75, 2), 'users': int(len(values))}
+
+    improvement = metrics['improvement']
+    measured = ~np.isnan(improvement)
+    return {
+        'users': int(len(metrics['user_ids'])),
+        'error_rate': distribution(metrics['error_rate']),
+        'avg_score': distribution(metrics['avg_score']),
+        'error_rate_slope': distribution(metrics['error_rate_slope']),
+        'improving_share': round(float((improvement[measured] > 0).mean()), 3) if measured.any() else None,
+        'active_days': distribution(metrics['active_days'].astype(np.float64)),
+        'current_streak': distribution(metrics['current_streak'].astype(np.float64)),
+        'longest_streak_max': int(metrics['longest_streak'].max()) if len(metrics['user_ids']) else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Progress analytics for one or all learners')
+    parser.add_argument('--db', default='english_learning.db', help='Database file (default: english_learning.db)')
+    parser.add_argument('--user-id', type=int, help='Report one user (default: summary of all users)')
+    parser.add_argument('--days', type=int, default=30, help='Days to analyse (default: 30)')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help='Rolling window in days (default: 7)')
+    parser.add_argument('--output', '-o', help='Save the report as JSON')
+
+    args = parser.parse_args()
+
+    if args.user_id is not None:
+        report = user_report(args.db, args.user_id, args.days, args.window)
+        print(json.dumps(report, indent=2))
+    else:
+        start = time.perf_counter()
+        series = load_progress(args.db, days=args.days)
+        loaded = time.perf_counter()
+        report = cohort_summary(compute_metrics(series, args.window))
+        done = time.perf_counter()
+        print(json.dumps(report, indent=2))
+        print(f"⏱️  {report['users']} users: load {(loaded - start) * 1000:.0f}ms, "
+              f"metrics {(done - loaded) * 1000:.0f}ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
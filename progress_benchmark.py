@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark the progress analytics on a synthetic population
+
+Fills a scratch database with learning_progress rows for N learners (each
+active on a random share of the days, error rates drifting up or down), then
+times the single load query and the vectorized metrics separately.
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+from datetime import date, timedelta
+from typing import Dict
+
+import numpy as np
+
+from latency_stats import summarize
+from progress_analytics import load_progress, compute_metrics, cohort_summary
+from simple_database import SimpleDatabase
+
+
+def build_population(db_path: str, users: int, days: int, activity: float, seed: int = 7) -> int:
+    """Insert synthetic daily rows, return how many"""
+    SimpleDatabase(db_path)
+    rng = np.random.default_rng(seed)
+    today = date.today()
+
+    active = rng.random((users, days)) < activity
+    user_index, day_index = np.nonzero(active)
+    messages = rng.integers(1, 15, size=len(user_index))
+    words = messages * rng.integers(6, 20, size=len(user_index))
+    # Per-user baseline error rate with a per-user drift over the period
+    base = rng.uniform(2, 12, size=users)[user_index]
+    drift = rng.normal(-0.05, 0.1, size=users)[user_index] * day_index
+    errors = rng.poisson(np.clip(base + drift, 0.2, None) * words / 100)
+    scores = np.clip(95 - errors * 100 / words * 3 + rng.normal(0, 5, size=len(user_index)), 0, 100)
+    dates = [(today - timedelta(days=days - 1 - d)).isoformat() for d in range(days)]
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany('''
+        INSERT INTO learning_progress
+        (user_id, date, messages_sent, total_errors, avg_score, unique_words_used, words_written,
+         scored_messages)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', zip((user_index + 1).tolist(), (dates[d] for d in day_index.tolist()), messages.tolist(),
+             errors.tolist(), scores.round(1).tolist(), (words // 4).tolist(), words.tolist(),
+             messages.tolist()))
+    conn.commit()
+    conn.close()
+    return len(user_index)
+
+
+def run_benchmark(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix='progress_bench_')
+    db_path = os.path.join(workdir, 'progress.db')
+
+    start = time.perf_counter()
+    rows = build_population(db_path, args.users, args.days, args.activity)
+    build_s = time.perf_counter() - start
+
+    load_ms, metrics_ms = [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        series = load_progress(db_path, days=args.days)
+        loaded = time.perf_counter()
+        metrics = compute_metrics(series)
+        load_ms.append((loaded - start) * 1000)
+        metrics_ms.append((time.perf_counter() - loaded) * 1000)
+
+    one_user_ms = []
+    for user_id in range(1, min(args.users, 50) + 1):
+        start = time.perf_counter()
+        compute_metrics(load_progress(db_path, user_id, args.days))
+        one_user_ms.append((time.perf_counter() - start) * 1000)
+
+    os.remove(db_path)
+    os.rmdir(workdir)
+    return {
+        'users': args.users,
+        'days': args.days,
+        'rows': rows,
+        'build_s': round(build_s, 1),
+        'load_ms': summarize(load_ms),
+        'metrics_ms': summarize(metrics_ms),
+        'single_user_ms': summarize(one_user_ms),
+        'cohort': cohort_summary(metrics)
+    }
+
+
+def print_report(results: Dict):
+    print(f"\n📈 Progress analytics: {results['users']} users x {results['days']} days "
+          f"({results['rows']} rows, built in {results['build_s']}s)")
+    for name in ('load_ms', 'metrics_ms', 'single_user_ms'):
+        stats = results[name]
+        print(f"  {name[:-3]:12} p50 {stats['p50']:8.1f}ms   max {stats['max']:8.1f}ms")
+    cohort = results['cohort']
+    print(f"\n  Median error rate {cohort['error_rate']['p50']} per 100 words, "
+          f"{cohort['improving_share']:.0%} of learners improving")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized progress analytics')
+    parser.add_argument('--users', type=int, default=100000, help='Synthetic learners (default: 100000)')
+    parser.add_argument('--days', type=int, default=30, help='Days of history (default: 30)')
+    parser.add_argument('--activity', type=float, default=0.3, help='Share of active days (default: 0.3)')
+    parser.add_argument('--runs', type=int, default=5, help='Timed repetitions (default: 5)')
+    parser.add_argument('--output', '-o', help='Save the results as JSON')
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Precompiled per-level system prompts laid out for provider prefix caching
+
+The system prompt for a level is byte-identical on every turn; all per-turn
+content (summary, history, the learner's message) goes into later messages so
+the provider can reuse its cached prefix.
+"""
+from typing import Dict
+
+# Bump when the prompt text changes so cached analyses can be invalidated
+PROMPT_VERSION = 2
+
+LEVELS = ['A1', 'A2', 'B1', 'B2', 'C1', 'C2']
+
+# CEFR level prompts
+LEVEL_PROMPTS = {
+    'A1': "You are talking to an English beginner. Use simple words (CEFR A1), short sentences, and basic grammar.",
+    'A2': "You are talking to an elementary English learner. Use common vocabulary (CEFR A2) and simple compound sentences.",
+    'B1': "You are talking to an intermediate English learner. Use moderate vocabulary (CEFR B1) and some complex sentences.",
+    'B2': "You are talking to an upper-intermediate learner. Use rich vocabulary (CEFR B2) and varied sentence structures.",
+    'C1': "You are talking to an advanced English learner. Use sophisticated vocabulary (CEFR C1) and complex grammar.",
+    'C2': "You are talking to a proficient English speaker. Use native-level vocabulary and natural expressions."
+}
+
+TUTOR_PROMPT_TEMPLATE = """
+You are having a natural conversation with a {level} English learner. Your goal is to have an interesting, engaging conversation while subtly providing language learning support.
+
+{level_prompt}
+
+**Conversation Style:**
+- Be natural, friendly, and conversational
+- Focus on the topic/content the user wants to discuss
+- Use {level} level English that's accessible but slightly challenging
+- Ask follow-up questions to keep the conversation flowing
+
+**Learning Support (Subtle):**
+- If the user makes major errors that seriously hinder communication, you can gently provide minimal correction
+- Focus on conversation flow over grammar perfection
+- Only highlight errors that truly matter for comprehension
+- Provide corrections as gentle suggestions, not strict corrections
+- Only correct the learner's latest message; earlier turns are context
+
+**Response Format:**
+PART 1: Natural conversation response (main focus)
+PART 2: Optional brief learning notes (only if there are significant errors)
+
+Format your response as:
+```
+[NATURAL CONVERSATION RESPONSE - This should be your main response, focusing on the topic]
+
+---
+[LEARNING NOTES - Only include this section if there are 1-2 significant errors that affect communication. Keep it very brief and encouraging. If no significant errors, don't include this section.]
+Error found: "original text" → "correction" - brief explanation
+```
+
+**Guidelines for Learning Notes:**
+- Only include for major errors (not minor typos or grammar slips)
+- Maximum 1-2 learning notes per response
+- Keep explanations very brief and encouraging
+- Focus on communication effectiveness
+- If the user's English is perfectly understandable, skip the learning section entirely
+
+**Remember:** The goal is natural conversation with minimal learning interruptions. Don't overwhelm with corrections.
+"""
+
+
+# Dual-call mode: the conversational reply carries no learning notes...
+CONVERSATION_PROMPT_TEMPLATE = """
+You are having a natural conversation with a {level} English learner. Your goal is to have an interesting, engaging conversation.
+
+{level_prompt}
+
+**Conversation Style:**
+- Be natural, friendly, and conversational
+- Focus on the topic/content the user wants to discuss
+- Use {level} level English that's accessible but slightly challenging
+- Ask follow-up questions to keep the conversation flowing
+
+Do not correct the learner or add learning notes; corrections are handled separately.
+"""
+
+# ...and a parallel JSON-mode request extracts the errors
+ANALYSIS_PROMPT_TEMPLATE = """
+You are an English error analyzer for a {level} learner. Analyze only the learner's message and return JSON.
+
+**Error Categories:**
+- grammar: tenses, articles, prepositions, subject-verb agreement
+- vocabulary: word choice, collocations, countable/uncountable nouns
+- spelling: misspellings, capitalization
+- expression: unnatural phrasing, direct translation issues
+- punctuation: missing/incorrect punctuation
+
+**Severity:** critical (meaning is lost), major (noticeable, affects clarity), minor (small slip)
+
+Return JSON with exactly this structure:
+{{
+    "errors": [
+        {{
+            "error_type": "grammar/vocabulary/spelling/expression/punctuation",
+            "severity": "minor/major/critical",
+            "original_text": "exact text copied from the learner's message",
+            "correction": "corrected version",
+            "explanation": "brief, encouraging explanation",
+            "start_position": start_char_index,
+            "end_position": end_char_index,
+            "confidence": 0.0-1.0
+        }}
+    ],
+    "overall_score": 0-100
+}}
+
+Return {{"errors": [], "overall_score": 100}} if the message has no errors.
+"""
+
+
+def compile_prompts(template: str) -> Dict[str, str]:
+    """Render a prompt template once for every CEFR level"""
+    return {
+        level: template.format(level=level, level_prompt=LEVEL_PROMPTS[level])
+        for level in LEVELS
+    }
+
+
+def compile_system_prompts() -> Dict[str, str]:
+    """Render the tutor system prompt once for every CEFR level"""
+    return compile_prompts(TUTOR_PROMPT_TEMPLATE)
+
+
+# Compiled once at import; the same string object is reused on every turn
+SYSTEM_PROMPTS = compile_system_prompts()
+CONVERSATION_PROMPTS = compile_prompts(CONVERSATION_PROMPT_TEMPLATE)
+ANALYSIS_PROMPTS = compile_prompts(ANALYSIS_PROMPT_TEMPLATE)
+
+
+def get_system_prompt(level: str) -> str:
+    """Static system prompt prefix for a CEFR level"""
+    return SYSTEM_PROMPTS.get(level.upper(), SYSTEM_PROMPTS['B1'])
+
+
+def get_conversation_prompt(level: str) -> str:
+    """Conversation-only prompt used in dual-call mode"""
+    return CONVERSATION_PROMPTS.get(level.upper(), CONVERSATION_PROMPTS['B1'])
+
+
+def get_analysis_prompt(level: str) -> str:
+    """JSON-mode error analysis prompt used in dual-call mode"""
+    return ANALYSIS_PROMPTS.get(level.upper(), ANALYSIS_PROMPTS['B1'])
+
+
+def cache_usage(usage) -> Dict:
+    """Extract prompt-cache hit/miss token counts from a completion usage object
+
+    DeepSeek reports prompt_cache_hit_tokens / prompt_cache_miss_tokens;
+    OpenAI-style servers report prompt_tokens_details.cached_tokens.
+    """
+    if usage is None:
+        return {}
+
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    hit_tokens = getattr(usage, 'prompt_cache_hit_tokens', None)
+    if hit_tokens is None:
+        details = getattr(usage, 'prompt_tokens_details', None)
+        hit_tokens = getattr(details, 'cached_tokens', 0) or 0
+
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+        'cache_hit_tokens': hit_tokens,
+        'cache_miss_tokens': max(prompt_tokens - hit_tokens, 0),
+        'cache_hit_rate': hit_tokens / prompt_tokens if prompt_tokens else 0.0
+    }
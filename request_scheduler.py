@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Process-wide rate limiter and fair scheduler for outbound model requests
+
+Requests/min and tokens/min are enforced with token buckets, either in memory
+or shared across processes through a SQLite table. Waiting requests are served
+by priority class (interactive before batch), then round-robin across users.
+"""
+import os
+import time
+import sqlite3
+import threading
+from collections import deque, OrderedDict
+from typing import Dict, Optional, Tuple
+
+PRIORITIES = {'interactive': 0, 'batch': 1}
+
+
+class TokenBucket:
+    """In-memory token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def give_back(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class SQLiteTokenBuckets:
+    """Requests and tokens buckets shared by every process using the same database file"""
+
+    def __init__(self, db_path: str, name: str, requests_per_minute: float, tokens_per_minute: float):
+        self.db_path = db_path
+        self.name = name
+        self.limits = {'requests': requests_per_minute, 'tokens': tokens_per_minute}
+
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                name TEXT PRIMARY KEY,
+                request_tokens REAL NOT NULL,
+                model_tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO rate_limit_buckets (name, request_tokens, model_tokens, updated_at)
+            VALUES (?, ?, ?, ?)
+        ''', (name, requests_per_minute, tokens_per_minute, time.time()))
+        conn.commit()
+        conn.close()
+
+    def try_take(self, tokens: float) -> float:
+        """Take one request and `tokens` tokens atomically; return 0, or seconds to wait"""
+        conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            request_tokens, model_tokens, updated_at = conn.execute(
+                'SELECT request_tokens, model_tokens, updated_at FROM rate_limit_buckets WHERE name = ?',
+                (self.name,)
+            ).fetchone()
+
+            now = time.time()
+            elapsed = max(now - updated_at, 0.0)
+            rpm, tpm = self.limits['requests'], self.limits['tokens']
+            request_tokens = min(rpm, request_tokens + elapsed * rpm / 60.0)
+            model_tokens = min(tpm, model_tokens + elapsed * tpm / 60.0)
+            tokens = min(tokens, tpm)
+
+            wait = max((1 - request_tokens) / (rpm / 60.0), (tokens - model_tokens) / (tpm / 60.0), 0.0)
+            if wait == 0.0:
+                request_tokens -= 1
+                model_tokens -= tokens
+
+            conn.execute('''
+                UPDATE rate_limit_buckets SET request_tokens = ?, model_tokens = ?, updated_at = ?
+                WHERE name = ?
+            ''', (request_tokens, model_tokens, now, self.name))
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def adjust(self, tokens: float):
+        """Debit (positive) or refund (negative) model tokens after actual usage is known"""
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        conn.execute('''
+            UPDATE rate_limit_buckets SET model_tokens = MIN(model_tokens - ?, ?)
+            WHERE name = ?
+        ''', (tokens, self.limits['tokens'], self.name))
+        conn.commit()
+        conn.close()
+
+
+class RequestScheduler:
+    def __init__(self, requests_per_minute: float = 60, tokens_per_minute: float = 120000,
+                 db_path: str = None, name: str = 'deepseek'):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        if db_path:
+            self.shared = SQLiteTokenBuckets(db_path, name, requests_per_minute, tokens_per_minute)
+            self.request_bucket = self.token_bucket = None
+        else:
+            self.shared = None
+            self.request_bucket = TokenBucket(requests_per_minute)
+            self.token_bucket = TokenBucket(tokens_per_minute)
+
+        self.condition = threading.Condition()
+        # priority -> OrderedDict(user -> deque of tickets); OrderedDict order is the round-robin
+        self.queues: Dict[int, OrderedDict] = {p: OrderedDict() for p in PRIORITIES.values()}
+        self.next_ticket = 0
+
+        self.wait_samples = {name: deque(maxlen=1000) for name in PRIORITIES}
+        self.stats = {name: {'granted': 0, 'total_wait_ms': 0.0, 'max_wait_ms': 0.0} for name in PRIORITIES}
+
+    def _head(self) -> Optional[Tuple[int, str, int]]:
+        """(priority, user, ticket) of the request that should go next"""
+        for priority in sorted(self.queues):
+            users = self.queues[priority]
+            if users:
+                user, tickets = next(iter(users.items()))
+                return priority, user, tickets[0]
+        return None
+
+    def _try_take(self, tokens: float) -> float:
+        if self.shared:
+            return self.shared.try_take(tokens)
+        wait = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(tokens))
+        if wait == 0.0:
+            self.request_bucket.take(1)
+            self.token_bucket.take(min(tokens, self.token_bucket.capacity))
+        return wait
+
+    def acquire(self, user: str, priority: str = 'interactive', tokens: float = 1000) -> float:
+        """Block until this request may be sent; return the queue wait in milliseconds"""
+        level = PRIORITIES[priority]
+        start = time.monotonic()
+
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            self.queues[level].setdefault(user, deque()).append(ticket)
+
+            while True:
+                if self._head() == (level, user, ticket):
+                    wait = self._try_take(tokens)
+                    if wait == 0.0:
+                        break
+                    # Cap the sleep so cross-process refunds and higher priorities are noticed
+                    self.condition.wait(min(wait, 0.5))
+                else:
+                    self.condition.wait(0.5)
+
+            tickets = self.queues[level][user]
+            tickets.popleft()
+            # Round-robin: this user moves behind the other waiting users of the same class
+            del self.queues[level][user]
+            if tickets:
+                self.queues[level][user] = tickets
+            self.condition.notify_all()
+
+            wait_ms = (time.monotonic() - start) * 1000
+            self.wait_samples[priority].append(wait_ms)
+            stats = self.stats[priority]
+            stats['granted'] += 1
+            stats['total_wait_ms'] += wait_ms
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], wait_ms)
+
+        return wait_ms
+
+    def record_usage(self, estimated_tokens: float, actual_tokens: float):
+        """Correct the tokens bucket once the real token count of a request is known"""
+        delta = actual_tokens - estimated_tokens
+        with self.condition:
+            if self.shared:
+                self.shared.adjust(delta)
+            elif delta > 0:
+                self.token_bucket.take(delta)
+            else:
+                self.token_bucket.give_back(-delta)
+            self.condition.notify_all()
+
+    def get_stats(self) -> Dict:
+        """Queue wait time per priority class and current queue depth"""
+        with self.condition:
+            report = {}
+            for name, level in PRIORITIES.items():
+                samples = sorted(self.wait_samples[name])
+                stats = self.stats[name]
+                report[name] = {
+                    'granted': stats['granted'],
+                    'waiting': sum(len(t) for t in self.queues[level].values()),
+                    'avg_wait_ms': round(stats['total_wait_ms'] / stats['granted'], 1) if stats['granted'] else 0.0,
+                    'p95_wait_ms': round(samples[int(0.95 * (len(samples) - 1))], 1) if samples else 0.0,
+                    'max_wait_ms': round(stats['max_wait_ms'], 1)
+                }
+            return report
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Optional[RequestScheduler]:
+    """Process-wide scheduler configured from TUTOR_RPM, TUTOR_TPM and TUTOR_RATE_LIMIT_DB
+
+    None (requests are not limited) unless at least one of them is set; an unset
+    limit then defaults to 60 requests or 120000 tokens per minute.
+    """
+    global _scheduler
+    if not any(os.environ.get(name) for name in ('TUTOR_RPM', 'TUTOR_TPM', 'TUTOR_RATE_LIMIT_DB')):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(
+                requests_per_minute=float(os.environ.get('TUTOR_RPM', 60)),
+                tokens_per_minute=float(os.environ.get('TUTOR_TPM', 120000)),
+                # Set to a SQLite file to share the limits across processes
+                db_path=os.environ.get('TUTOR_RATE_LIMIT_DB') or None
+            )
+        return _scheduler
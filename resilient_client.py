@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Resilient completion calls: deadlines, jittered retries, circuit breaker and hedging
+"""
+import time
+import queue
+import random
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+import openai
+
+from context_window import estimate_tokens
+from request_scheduler import RequestScheduler
+
+# Errors worth another attempt; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,   # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class CompletionTimeout(Exception):
+    """An attempt missed its first-token or total deadline"""
+
+
+class CircuitOpenError(Exception):
+    """The provider has been failing; calls are rejected until the breaker resets"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, half-opens after a cool-down to let one probe through"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        # Half-open: when the single trial request was let through (None when none is out)
+        self.probe_started: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == 'open':
+                if time.time() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = 'half_open'
+                self.probe_started = None
+            if self.state == 'half_open':
+                # One trial request at a time; a trial that never reports back (the caller
+                # abandoned the stream) stops blocking the next one after reset_timeout
+                if self.probe_started is not None and time.time() - self.probe_started < self.reset_timeout:
+                    return False
+                self.probe_started = time.time()
+            return True
+
+    def release(self):
+        """The trial request ended without telling anything about the provider (e.g. a bad request)"""
+        with self.lock:
+            self.probe_started = None
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self.probe_started = None
+
+    def record_failure(self) -> bool:
+        """Record a failure, return True if this one opened the breaker"""
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                opened = self.state != 'open'
+                self.state = 'open'
+                self.opened_at = time.time()
+                self.probe_started = None
+                return opened
+            return False
+
+
+class _Attempt:
+    """One streaming request, read on a background thread into a shared queue"""
+
+    def __init__(self, attempt_id: int, client, kwargs: Dict, events: queue.Queue, admit=None):
+        self.attempt_id = attempt_id
+        self.cancelled = threading.Event()
+        self.stream = None
+        self.thread = threading.Thread(target=self._run, args=(client, kwargs, events, admit), daemon=True)
+        self.thread.start()
+
+    def _run(self, client, kwargs: Dict, events: queue.Queue, admit):
+        try:
+            if admit:
+                admit()
+            if self.cancelled.is_set():
+                return
+            self.stream = client.chat.completions.create(stream=True, **kwargs)
+            for chunk in self.stream:
+                if self.cancelled.is_set():
+                    break
+                events.put((self.attempt_id, 'chunk', chunk))
+            else:
+                events.put((self.attempt_id, 'done', None))
+        except Exception as e:
+            if not self.cancelled.is_set():
+                events.put((self.attempt_id, 'error', e))
+        finally:
+            if self.cancelled.is_set() and self.stream is not None:
+                self.stream.close()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class ResilientCompletions:
+    """Wraps chat.completions.create with per-attempt deadlines, retries, a breaker and hedging"""
+
+    def __init__(self, client, connect_timeout: float = 5.0, first_token_timeout: float = 20.0,
+                 total_timeout: float = 90.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 breaker: CircuitBreaker = None, hedge: bool = False,
+                 hedge_delay: float = 3.0, scheduler: RequestScheduler = None,
+                 user: str = 'anonymous', priority: str = 'interactive'):
+        # Retries are ours; the SDK's own retry loop would hide attempts from the deadlines
+        self.client = client.with_options(
+            timeout=httpx.Timeout(total_timeout, connect=connect_timeout),
+            max_retries=0
+        )
+        self.first_token_timeout = first_token_timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        # Optional shared rate limiter; every attempt (retries and hedges too) waits its turn
+        self.scheduler = scheduler
+        self.user = user
+        self.priority = priority
+
+        self.ttft_samples = deque(maxlen=200)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.counters = {
+            'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0,
+            'retryable_errors': 0, 'fatal_errors': 0,
+            'first_token_timeouts': 0, 'total_timeouts': 0,
+            'breaker_rejections': 0, 'breaker_opens': 0,
+            'hedges_fired': 0, 'hedges_won': 0,
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            stats = dict(self.counters)
+        stats['breaker_state'] = self.breaker.state
+        stats['hedge_delay_ms'] = round(self._hedge_after() * 1000, 1)
+        return stats
+
+    def last_ttft(self) -> Optional[float]:
+        """Seconds from admission to the first token of this thread's most recent stream
+
+        Scheduler queueing, failed attempts and retry backoff are not included, so this
+        measures the provider rather than the client.
+        """
+        return getattr(self.local, 'ttft', None)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _hedge_after(self) -> float:
+        """Hedge once the first token is later than the observed p95 (fixed delay until warmed up)"""
+        with self.lock:
+            samples = sorted(self.ttft_samples)
+        if len(samples) < 20:
+            return self.hedge_delay
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def _admit(self, kwargs: Dict) -> int:
+        """Wait for the scheduler to admit one request, return its estimated token cost"""
+        if not self.scheduler:
+            return 0
+        tokens = sum(estimate_tokens(m.get('content') or '') + 4 for m in kwargs.get('messages', []))
+        tokens += kwargs.get('max_tokens', 800)
+        self.scheduler.acquire(self.user, self.priority, tokens)
+        return tokens
+
+    def _reconcile(self, estimated_tokens: int, usage):
+        if self.scheduler and estimated_tokens and usage is not None:
+            self.scheduler.record_usage(estimated_tokens, usage.total_tokens)
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self._count('breaker_rejections')
+            raise CircuitOpenError("AI service is unavailable right now, please try again shortly")
+
+    def _record_failure(self, error: Exception):
+        retryable = isinstance(error, RETRYABLE_ERRORS + (CompletionTimeout,))
+        self._count('retryable_errors' if retryable else 'fatal_errors')
+        # Only provider-side failures count towards opening the breaker
+        if retryable and self.breaker.record_failure():
+            self._count('breaker_opens')
+        elif not retryable:
+            self.breaker.release()
+        return retryable
+
+    def create(self, **kwargs):
+        """Non-streaming completion with retries and the breaker"""
+        self._count('calls')
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            try:
+                estimated_tokens = self._admit(kwargs)
+                response = self.client.chat.completions.create(**kwargs)
+                self.breaker.record_success()
+                self._count('successes')
+                self._reconcile(estimated_tokens, response.usage)
+                return response
+            except Exception as e:
+                if isinstance(e, openai.APITimeoutError):
+                    self._count('total_timeouts')
+                if not self._record_failure(e) or attempt == self.max_retries:
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                time.sleep(self._backoff(attempt))
+
+    def create_stream(self, **kwargs) -> Iterator:
+        """Start a streaming completion and return once the first token has arrived
+
+        Retries (with backoff) cover everything up to the first token; after that the
+        stream is committed and errors propagate to the caller.
+        """
+        self._count('calls')
+        self.local.ttft = None
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            try:
+                return self._stream_attempt(kwargs)
+            except Exception as e:
+                if not self._record_failure(e) or attempt == self.max_retries:
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                time.sleep(self._backoff(attempt))
+
+    def _stream_attempt(self, kwargs: Dict) -> Iterator:
+        events = queue.Queue()
+        # Queue wait is not part of the first-token deadline
+        estimated_tokens = self._admit(kwargs)
+        start = time.time()
+        attempts: List[_Attempt] = [_Attempt(0, self.client, kwargs, events)]
+        first_token_deadline = start + self.first_token_timeout
+        hedge_at = start + self._hedge_after() if self.hedge else None
+        buffered = {0: []}
+        errors = []
+
+        # Wait for the first content chunk from any attempt
+        winner: Optional[int] = None
+        while winner is None:
+            now = time.time()
+            if now >= first_token_deadline:
+                for a in attempts:
+                    a.cancel()
+                self._count('first_token_timeouts')
+                raise CompletionTimeout(f"No first token within {self.first_token_timeout:.0f}s")
+
+            wait_until = first_token_deadline
+            if hedge_at and len(attempts) == 1:
+                wait_until = min(wait_until, hedge_at)
+
+            try:
+                attempt_id, kind, payload = events.get(timeout=max(wait_until - now, 0.001))
+            except queue.Empty:
+                if hedge_at and len(attempts) == 1 and time.time() >= hedge_at:
+                    admit = (lambda: self._admit(kwargs)) if self.scheduler else None
+                    attempts.append(_Attempt(1, self.client, kwargs, events, admit))
+                    buffered[1] = []
+                    self._count('hedges_fired')
+                continue
+
+            if kind == 'error':
+                errors.append(payload)
+                # Only give up once every running attempt has failed
+                if len(errors) == len(attempts):
+                    raise payload
+                continue
+            if kind == 'done':
+                # A stream that finished without content still wins
+                winner = attempt_id
+                buffered[attempt_id].append(None)
+                continue
+
+            buffered[attempt_id].append(payload)
+            if payload.choices and payload.choices[0].delta.content:
+                winner = attempt_id
+
+        for a in attempts:
+            if a.attempt_id != winner:
+                a.cancel()
+        if winner == 1:
+            self._count('hedges_won')
+
+        self.local.ttft = time.time() - start
+        with self.lock:
+            self.ttft_samples.append(self.local.ttft)
+        return self._drain(events, attempts[winner], buffered[winner], start, estimated_tokens)
+
+    def _drain(self, events: queue.Queue, winner: _Attempt, buffered: List, start: float,
+               estimated_tokens: int = 0) -> Iterator:
+        """Yield the winner's buffered chunks, then the rest of its stream within the total deadline"""
+        try:
+            for chunk in buffered:
+                if chunk is None:
+                    self.breaker.record_success()
+                    self._count('successes')
+                    return
+                yield chunk
+
+            deadline = start + self.total_timeout
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._count('total_timeouts')
+                    self._count('failures')
+                    raise CompletionTimeout(f"Response not finished within {self.total_timeout:.0f}s")
+                try:
+                    attempt_id, kind, payload = events.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+                if attempt_id != winner.attempt_id:
+                    continue
+                if kind == 'chunk':
+                    if payload.usage:
+                        self._reconcile(estimated_tokens, payload.usage)
+                    yield payload
+                elif kind == 'done':
+                    self.breaker.record_success()
+                    self._count('successes')
+                    return
+                else:
+                    self._record_failure(payload)
+                    self._count('failures')
+                    raise payload
+        finally:
+            # After a deadline or an early close by the caller, stop reading and free the connection
+            winner.cancel()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of parsed tutor analyses for repeated learner sentences
+"""
+import sqlite3
+import json
+import time
+import hashlib
+import unicodedata
+from typing import Dict, Optional
+
+from prompt_templates import PROMPT_VERSION
+
+
+def normalize_message(message: str) -> str:
+    """Normalize unicode forms, quotes and whitespace; case is kept since it can be an error"""
+    text = unicodedata.normalize('NFKC', message)
+    text = text.replace('’', "'").replace('‘', "'")
+    text = text.replace('“', '"').replace('”', '"')
+    return ' '.join(text.split())
+
+
+def cache_key(message: str, level: str, prompt_version: int = PROMPT_VERSION) -> str:
+    raw = f"{prompt_version}|{level.upper()}|{normalize_message(message)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, db_path: str = "english_learning.db",
+                 ttl_seconds: int = 7 * 24 * 3600, max_entries: int = 5000):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.init_table()
+
+    def init_table(self):
+        """Create the cache table and its LRU index"""
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                cache_key TEXT PRIMARY KEY,
+                message TEXT NOT NULL,
+                english_level VARCHAR(2) NOT NULL,
+                prompt_version INTEGER NOT NULL,
+                analysis TEXT NOT NULL,  -- parsed conversation, notes, errors and score
+                response_ms REAL DEFAULT 0.0,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hit_count INTEGER DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_response_cache_last_access
+            ON response_cache(last_access)
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def get(self, message: str, level: str) -> Optional[Dict]:
+        """Return the cached analysis for a message, or None on a miss"""
+        key = cache_key(message, level)
+        now = time.time()
+
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT analysis, response_ms, created_at FROM response_cache
+                WHERE cache_key = ?
+            ''', (key,))
+            result = cursor.fetchone()
+
+            if not result:
+                self.misses += 1
+                return None
+
+            analysis_json, response_ms, created_at = result
+            if now - created_at > self.ttl_seconds:
+                cursor.execute('DELETE FROM response_cache WHERE cache_key = ?', (key,))
+                conn.commit()
+                self.misses += 1
+                return None
+
+            cursor.execute('''
+                UPDATE response_cache
+                SET last_access = ?, hit_count = hit_count + 1
+                WHERE cache_key = ?
+            ''', (now, key))
+            conn.commit()
+
+            self.hits += 1
+            self.saved_ms += response_ms or 0.0
+            return json.loads(analysis_json)
+        except Exception as e:
+            print(f"Database error in cache get: {e}")
+            self.misses += 1
+            return None
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    def put(self, message: str, level: str, analysis: Dict, response_ms: float = 0.0):
+        """Store a parsed analysis and evict least recently used entries over the size bound"""
+        now = time.time()
+
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                INSERT OR REPLACE INTO response_cache
+                (cache_key, message, english_level, prompt_version, analysis,
+                 response_ms, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                cache_key(message, level),
+                normalize_message(message),
+                level.upper(),
+                PROMPT_VERSION,
+                json.dumps(analysis, ensure_ascii=False),
+                response_ms,
+                now,
+                now
+            ))
+
+            cursor.execute('SELECT COUNT(*) FROM response_cache')
+            overflow = cursor.fetchone()[0] - self.max_entries
+            if overflow > 0:
+                cursor.execute('''
+                    DELETE FROM response_cache WHERE cache_key IN (
+                        SELECT cache_key FROM response_cache
+                        ORDER BY last_access ASC
+                        LIMIT ?
+                    )
+                ''', (overflow,))
+
+            conn.commit()
+        except Exception as e:
+            print(f"Database error in cache put: {e}")
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    def purge_expired(self) -> int:
+        """Delete entries older than the TTL, return how many were removed"""
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM response_cache WHERE created_at < ?',
+                       (time.time() - self.ttl_seconds,))
+        removed = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Session hit rate and latency saved, plus persistent entry count"""
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM response_cache')
+        entries = cursor.fetchone()[0]
+        conn.close()
+
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'saved_ms': round(self.saved_ms, 1),
+            'entries': entries
+        }
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Spaced-repetition review of past mistakes
+
+Each error cluster a learner has produced gets an SM-2 schedule in the
+review_queue table (scheduled when the error is stored, see SimpleDatabase).
+ReviewQueue keeps the user's schedule in a heap keyed by due time, so finding
+what is due is a heap peek instead of a scan of the errors table; it picks up
+rows added or rescheduled since the last look through the indexed per-user
+change_seq counter, so a sync reads only what changed.
+"""
+import heapq
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from error_clustering import canonicalize
+
+MIN_EASE = 1.3
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'   # same shape as SQLite CURRENT_TIMESTAMP (UTC)
+
+
+def utc_timestamp(offset_days: float = 0.0) -> str:
+    return (datetime.now(timezone.utc) + timedelta(days=offset_days)).strftime(TIMESTAMP_FORMAT)
+
+
+def sm2(ease: float, interval: float, repetitions: int, quality: int) -> Tuple[float, float, int]:
+    """Next (ease, interval in days, repetitions) after an answer graded 0-5"""
+    if quality < 3:
+        repetitions = 0
+        interval = 1.0
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1.0
+        elif repetitions == 2:
+            interval = 6.0
+        else:
+            interval = round(interval * ease, 1)
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return round(ease, 2), interval, repetitions
+
+
+def grade_answer(answer: str, correction: str) -> int:
+    """SM-2 quality of a typed correction: 5 exact, 4 near-exact, 3 close, 1 wrong, 0 no answer"""
+    answer, expected = canonicalize(answer), canonicalize(correction)
+    if not answer:
+        return 0
+    if answer == expected:
+        return 5
+    ratio = SequenceMatcher(a=answer, b=expected).ratio()
+    if ratio >= 0.9:
+        return 4
+    if ratio >= 0.75:
+        return 3
+    return 1
+
+
+def format_review_hint(items: List[Dict]) -> str:
+    """System message asking the tutor to give the learner a natural chance to reuse corrected forms"""
+    lines = [f'- "{item["original_text"]}" should be "{item["correction"]}"' for item in items]
+    return ("The learner is due to practise these past mistakes:\n" + "\n".join(lines) +
+            "\nIf it fits the conversation, steer your next reply so they can naturally use the "
+            "correct form (for example by asking a question that invites it). Do not quiz them "
+            "or mention that this is a review.")
+
+
+class ReviewQueue:
+    """A user's review schedule as a min-heap of (due_at, cluster_id)"""
+
+    def __init__(self, db, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self.heap: List[Tuple[str, int]] = []
+        self.due_at: Dict[int, str] = {}   # current due time per cluster; stale heap entries are skipped
+        self.synced_seq: Optional[int] = None   # highest change_seq seen
+
+        self.db.seed_review_queue(user_id)
+        self.sync()
+
+    def sync(self):
+        """Add items scheduled or rescheduled since the last sync"""
+        for change_seq, due_at, cluster_id in self.db.get_review_schedule(self.user_id, self.synced_seq):
+            self._push(cluster_id, due_at)
+            self.synced_seq = max(self.synced_seq or 0, change_seq or 0)
+
+    def _push(self, cluster_id: int, due_at: str):
+        if self.due_at.get(cluster_id) != due_at:
+            self.due_at[cluster_id] = due_at
+            heapq.heappush(self.heap, (due_at, cluster_id))
+
+    def due(self, limit: int = 10, now: str = None) -> List[int]:
+        """Cluster ids due now, most overdue first (the heap is left as it was)"""
+        self.sync()
+        now = now or utc_timestamp()
+        taken = []
+        while self.heap and len(taken) < limit and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if self.due_at.get(entry[1]) == entry[0]:
+                taken.append(entry)
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return [cluster_id for _, cluster_id in taken]
+
+    def due_count(self, now: str = None) -> int:
+        now = now or utc_timestamp()
+        return sum(1 for due_at in self.due_at.values() if due_at <= now)
+
+    def items(self, cluster_ids: List[int]) -> List[Dict]:
+        found = self.db.get_review_items(self.user_id, cluster_ids)
+        return [found[cluster_id] for cluster_id in cluster_ids if cluster_id in found]
+
+    def record(self, item: Dict, quality: int) -> Dict:
+        """Apply an answer to an item, persist and reschedule it; returns the updated item"""
+        ease, interval, repetitions = sm2(item['ease_factor'], item['interval_days'],
+                                          item['repetitions'], quality)
+        updated = dict(item, ease_factor=ease, interval_days=interval, repetitions=repetitions,
+                       lapses=item['lapses'] + (quality < 3 and item['repetitions'] > 0),
+                       due_at=utc_timestamp(interval))
+        self.db.update_review(self.user_id, item['cluster_id'], updated, quality)
+        self._push(item['cluster_id'], updated['due_at'])
+        return updated
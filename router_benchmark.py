@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark latency-aware routing against local mock backends
+
+Starts three mock completion servers with different latency profiles and
+streams requests through BackendRouter in three phases:
+
+1. steady:   fast (low TTFT), slow (high TTFT), flaky (low TTFT, many 500s)
+2. degraded: the fast backend suddenly becomes the slowest
+3. recovered: the fast backend is fast again; probes and fallbacks notice
+
+For each phase it reports where requests went, time to first token and
+failed requests, then the router's per-backend stats.
+
+    uv run router_benchmark.py --requests 200 --concurrency 8
+"""
+import os
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from backend_router import Backend, BackendRouter
+from latency_stats import summarize
+from load_benchmark import LEARNER_SENTENCES
+from mock_server import MockCompletionServer, MockConfig
+
+# Steady-state latency profile per mock backend
+PROFILES = {
+    'fast': dict(ttft_ms=40, token_delay_ms=1, jitter_ms=5),
+    'slow': dict(ttft_ms=250, token_delay_ms=1, jitter_ms=20),
+    'flaky': dict(ttft_ms=60, token_delay_ms=1, jitter_ms=10, error_rate=0.3),
+}
+DEGRADED_TTFT_MS = 600
+
+
+def one_request(router: BackendRouter, index: int) -> Dict:
+    start = time.perf_counter()
+    try:
+        stream = router.create_stream(
+            model="deepseek-chat",
+            messages=[{"role": "user", "content": LEARNER_SENTENCES[index % len(LEARNER_SENTENCES)]}],
+            temperature=0.7
+        )
+        ttft = (time.perf_counter() - start) * 1000
+        backend = router.last_backend().name
+        for _ in stream:
+            pass
+    except Exception as e:
+        return {'backend': None, 'ttft_ms': None, 'error': type(e).__name__}
+    return {'backend': backend, 'ttft_ms': ttft, 'error': None}
+
+
+def run_phase(router: BackendRouter, name: str, requests: int, concurrency: int) -> Dict:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: one_request(router, i), range(requests)))
+    ttfts = [r['ttft_ms'] for r in results if r['ttft_ms'] is not None]
+    return {
+        'phase': name,
+        'requests': requests,
+        'failed': sum(1 for r in results if r['error']),
+        'routed': dict(Counter(r['backend'] for r in results if r['backend'])),
+        'ttft_ms': summarize(ttfts),
+    }
+
+
+def print_report(phases: List[Dict], stats: Dict):
+    names = list(PROFILES)
+    print(f"\n🛰️  Routing across {len(names)} mock backends")
+    print(f"  {'phase':10} " + " ".join(f"{n:>7}" for n in names) + f" {'failed':>7} {'ttft p50':>10} {'ttft p95':>10}")
+    for phase in phases:
+        routed = " ".join(f"{phase['routed'].get(n, 0):7}" for n in names)
+        print(f"  {phase['phase']:10} {routed} {phase['failed']:7} "
+              f"{phase['ttft_ms']['p50']:7.0f} ms {phase['ttft_ms']['p95']:7.0f} ms")
+
+    print(f"\n  {stats['calls']} calls, {stats['fallbacks']} fallbacks, {stats['exhausted']} with no backend left")
+    for backend in stats['backends']:
+        ttft = "-" if backend['ttft_ewma_ms'] is None else f"{backend['ttft_ewma_ms']:.0f} ms"
+        print(f"  {backend['name']:6} ttft {ttft:>8}  errors {backend['error_rate']:6.1%}  "
+              f"requests {backend['requests']:4}  probes {backend['probes']:3}  breaker {backend['breaker_state']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency-aware routing across mock backends')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per phase (default: 200)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight (default: 8)')
+    parser.add_argument('--probe-interval', type=float, default=1.0,
+                        help='Seconds between probes of idle backends (default: 1)')
+    parser.add_argument('--output', '-o', help='Save the results as JSON')
+
+    args = parser.parse_args()
+    os.environ.setdefault('DEEPSEEK_API_KEY', 'mock')
+
+    servers = {name: MockCompletionServer(config=MockConfig(**profile, seed=i))
+               for i, (name, profile) in enumerate(PROFILES.items())}
+    for server in servers.values():
+        server.start()
+    router = BackendRouter([Backend(name, server.base_url) for name, server in servers.items()],
+                           probe_interval=args.probe_interval)
+
+    try:
+        phases = [run_phase(router, 'steady', args.requests, args.concurrency)]
+
+        servers['fast'].config.ttft_ms = DEGRADED_TTFT_MS
+        phases.append(run_phase(router, 'degraded', args.requests, args.concurrency))
+
+        servers['fast'].config.ttft_ms = PROFILES['fast']['ttft_ms']
+        # Give the prober a few rounds to see the recovery
+        time.sleep(args.probe_interval * 5)
+        phases.append(run_phase(router, 'recovered', args.requests, args.concurrency))
+        stats = router.get_stats()
+    finally:
+        router.close()
+        for server in servers.values():
+            server.stop()
+
+    print_report(phases, stats)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'phases': phases, 'router': stats}, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Precision/recall and speed benchmark for the local rule-based pre-checker
+
+Scores rule_checker.check_message against a labeled corpus (NDJSON lines of
+{"text", "errors": [{"text", "category"}]}). A finding is a true positive when
+it overlaps a labeled error span; labeled errors of categories the rules don't
+target still count against recall, which shows how much of the traffic the
+rules can take off the model. Items with a "corrected" sentence also check that
+applying the rules' corrections produces it.
+"""
+import json
+import time
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+
+from latency_stats import summarize
+from rule_checker import check_message
+
+DEFAULT_CORPUS = 'rule_corpus.jsonl'
+
+
+def load_corpus(path: str) -> List[Dict]:
+    items = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            spans = []
+            for error in item.get('errors', []):
+                start = item['text'].find(error['text'])
+                if start == -1:
+                    raise ValueError(f"Labeled span {error['text']!r} not found in {item['text']!r}")
+                spans.append((start, start + len(error['text']), error.get('category', 'other')))
+            items.append({'text': item['text'], 'spans': spans, 'corrected': item.get('corrected')})
+    return items
+
+
+def _overlaps(start: int, end: int, span) -> bool:
+    return start < span[1] and span[0] < end
+
+
+def apply_corrections(text: str, findings: List[Dict]) -> str:
+    """The message with every finding's span replaced by its correction"""
+    for finding in sorted(findings, key=lambda f: f['start_position'], reverse=True):
+        text = text[:finding['start_position']] + finding['correction'] + text[finding['end_position']:]
+    return text
+
+
+def evaluate(items: List[Dict], repeat: int = 200) -> Dict:
+    true_positives = false_positives = 0
+    per_rule = defaultdict(lambda: {'tp': 0, 'fp': 0})
+    per_category = defaultdict(lambda: {'labeled': 0, 'found': 0})
+    false_positive_examples = []
+    missed_examples = []
+    wrong_corrections = []
+
+    for item in items:
+        findings = check_message(item['text'])
+        if item['corrected'] is not None:
+            corrected = apply_corrections(item['text'], findings)
+            if corrected != item['corrected']:
+                wrong_corrections.append(f"{item['text']!r} -> {corrected!r}, expected {item['corrected']!r}")
+        hit_spans = set()
+        for finding in findings:
+            matched = [i for i, span in enumerate(item['spans'])
+                       if _overlaps(finding['start_position'], finding['end_position'], span)]
+            if matched:
+                true_positives += 1
+                per_rule[finding['rule']]['tp'] += 1
+                hit_spans.update(matched)
+            else:
+                false_positives += 1
+                per_rule[finding['rule']]['fp'] += 1
+                false_positive_examples.append(f"{finding['rule']}: {finding['original_text']!r} in {item['text']!r}")
+
+        for i, (start, end, category) in enumerate(item['spans']):
+            per_category[category]['labeled'] += 1
+            if i in hit_spans:
+                per_category[category]['found'] += 1
+            else:
+                missed_examples.append(f"{category}: {item['text'][start:end]!r}")
+
+    labeled = sum(c['labeled'] for c in per_category.values())
+    found = sum(c['found'] for c in per_category.values())
+
+    # Per-message latency, repeated so the timer resolution doesn't dominate
+    timings_us = []
+    for item in items:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            check_message(item['text'])
+        timings_us.append((time.perf_counter() - start) / repeat * 1e6)
+
+    return {
+        'messages': len(items),
+        'labeled_errors': labeled,
+        'findings': true_positives + false_positives,
+        'precision': round(true_positives / (true_positives + false_positives), 3)
+        if true_positives + false_positives else 1.0,
+        'recall': round(found / labeled, 3) if labeled else 1.0,
+        'per_rule': {rule: dict(counts, precision=round(counts['tp'] / (counts['tp'] + counts['fp']), 3))
+                     for rule, counts in sorted(per_rule.items())},
+        'per_category': {category: dict(counts, recall=round(counts['found'] / counts['labeled'], 3))
+                         for category, counts in sorted(per_category.items())},
+        'latency_us': summarize(timings_us),
+        'checked_corrections': sum(1 for item in items if item['corrected'] is not None),
+        'wrong_corrections': wrong_corrections,
+        'false_positives': false_positive_examples,
+        'missed': missed_examples
+    }
+
+
+def print_report(results: Dict, verbose: bool = False):
+    print(f"\n📏 Rule pre-checker on {results['messages']} messages ({results['labeled_errors']} labeled errors)")
+    print(f"  Precision: {results['precision']:.1%}   Recall: {results['recall']:.1%}   "
+          f"Findings: {results['findings']}")
+
+    print(f"\n  {'rule':32} {'tp':>4} {'fp':>4} {'precision':>10}")
+    for rule, counts in results['per_rule'].items():
+        print(f"  {rule:32} {counts['tp']:4d} {counts['fp']:4d} {counts['precision']:10.1%}")
+
+    print(f"\n  {'category':32} {'found':>5} {'of':>4} {'recall':>10}")
+    for category, counts in results['per_category'].items():
+        print(f"  {category:32} {counts['found']:5d} {counts['labeled']:4d} {counts['recall']:10.1%}")
+
+    wrong = results['wrong_corrections']
+    print(f"  Corrections: {results['checked_corrections'] - len(wrong)}/{results['checked_corrections']} "
+          f"checked sentences fixed as expected")
+    for example in wrong:
+        print(f"    ❌ {example}")
+
+    latency = results['latency_us']
+    print(f"\n  Latency per message: p50 {latency['p50']:.1f}µs, p99 {latency['p99']:.1f}µs, max {latency['max']:.1f}µs")
+
+    if verbose:
+        for title, examples in (('False positives', results['false_positives']), ('Missed', results['missed'])):
+            if examples:
+                print(f"\n  {title}:")
+                for example in examples:
+                    print(f"    - {example}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precision/recall benchmark for the rule-based pre-checker')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help=f'Labeled NDJSON corpus (default: {DEFAULT_CORPUS})')
+    parser.add_argument('--repeat', type=int, default=200, help='Timing repetitions per message (default: 200)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='List false positives and missed errors')
+    parser.add_argument('--output', '-o', help='Save the results as JSON')
+
+    args = parser.parse_args()
+
+    results = evaluate(load_corpus(args.corpus), args.repeat)
+    print_report(results, args.verbose)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
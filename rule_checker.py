@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Local rule-based pre-checker for high-frequency learner errors
+
+Scans a message with precompiled patterns (uncountable-noun plurals, subject-verb
+agreement, double comparatives, -ing/-ed adjectives and tense cues) before any API
+call. Rules favour precision: anything ambiguous is left to the model.
+"""
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ---------------------------------------------------------------------------
+# Lexicons
+# ---------------------------------------------------------------------------
+
+UNCOUNTABLE_NOUNS = frozenset([
+    'information', 'homework', 'housework', 'advice', 'furniture', 'equipment',
+    'luggage', 'baggage', 'knowledge', 'feedback', 'software', 'hardware',
+    'music', 'scenery', 'jewelry', 'jewellery', 'machinery', 'vocabulary',
+    'evidence', 'garbage', 'rubbish', 'traffic', 'weather', 'clothing',
+])
+
+# Determiners that only go with plurals, and their uncountable equivalents
+UNCOUNTABLE_DETERMINERS = {
+    'many': 'a lot of', 'a few': 'a little', 'few': 'little',
+    'several': 'some', 'these': 'this', 'those': 'that', 'a lot of': 'a lot of',
+}
+
+# Adjectives whose comparative/superlative is formed with -er/-est
+SHORT_ADJECTIVES = frozenset([
+    'tall', 'short', 'big', 'small', 'long', 'old', 'young', 'fast', 'slow',
+    'cheap', 'easy', 'happy', 'busy', 'hot', 'cold', 'warm', 'cool', 'large',
+    'strong', 'weak', 'nice', 'smart', 'quick', 'high', 'low', 'heavy', 'light',
+    'early', 'late', 'near', 'rich', 'poor', 'clean', 'close', 'hard', 'safe',
+    'wide', 'deep', 'bright', 'dark', 'loud', 'quiet', 'pretty', 'lucky', 'funny',
+    'simple', 'thin', 'fat', 'great', 'kind', 'new', 'wet', 'dry', 'sad', 'angry',
+    'healthy', 'friendly', 'lazy', 'noisy', 'dirty', 'tidy', 'ugly', 'wise',
+])
+IRREGULAR_COMPARATIVES = {'better': 'good', 'worse': 'bad', 'best': 'good', 'worst': 'bad',
+                          'further': 'far', 'farther': 'far'}
+
+# -ing adjectives (what causes a feeling) -> -ed adjectives (how someone feels)
+FEELING_ADJECTIVES = {
+    'interesting': 'interested', 'boring': 'bored', 'exciting': 'excited', 'confusing': 'confused',
+    'tiring': 'tired', 'surprising': 'surprised', 'amazing': 'amazed', 'worrying': 'worried',
+    'annoying': 'annoyed', 'embarrassing': 'embarrassed', 'frightening': 'frightened',
+}
+
+# Verbs learners most often leave uninflected: base -> (past simple, past participle)
+VERB_FORMS = {
+    'be': ('was', 'been'), 'have': ('had', 'had'), 'do': ('did', 'done'),
+    'go': ('went', 'gone'), 'see': ('saw', 'seen'), 'eat': ('ate', 'eaten'),
+    'come': ('came', 'come'), 'make': ('made', 'made'), 'take': ('took', 'taken'),
+    'get': ('got', 'got'), 'give': ('gave', 'given'), 'buy': ('bought', 'bought'),
+    'meet': ('met', 'met'), 'find': ('found', 'found'), 'leave': ('left', 'left'),
+    'lose': ('lost', 'lost'), 'think': ('thought', 'thought'), 'feel': ('felt', 'felt'),
+    'forget': ('forgot', 'forgotten'), 'write': ('wrote', 'written'), 'read': ('read', 'read'),
+    'speak': ('spoke', 'spoken'), 'tell': ('told', 'told'), 'say': ('said', 'said'),
+    'teach': ('taught', 'taught'), 'drive': ('drove', 'driven'), 'swim': ('swam', 'swum'),
+    'sleep': ('slept', 'slept'), 'run': ('ran', 'run'), 'begin': ('began', 'begun'),
+    'drink': ('drank', 'drunk'), 'fly': ('flew', 'flown'), 'know': ('knew', 'known'),
+    'bring': ('brought', 'brought'), 'send': ('sent', 'sent'), 'spend': ('spent', 'spent'),
+    'learn': ('learned', 'learned'), 'play': ('played', 'played'), 'watch': ('watched', 'watched'),
+    'visit': ('visited', 'visited'), 'study': ('studied', 'studied'), 'work': ('worked', 'worked'),
+    'live': ('lived', 'lived'), 'like': ('liked', 'liked'), 'love': ('loved', 'loved'),
+    'want': ('wanted', 'wanted'), 'need': ('needed', 'needed'), 'cook': ('cooked', 'cooked'),
+    'walk': ('walked', 'walked'), 'travel': ('traveled', 'traveled'), 'finish': ('finished', 'finished'),
+    'start': ('started', 'started'), 'stay': ('stayed', 'stayed'), 'try': ('tried', 'tried'),
+    'call': ('called', 'called'), 'help': ('helped', 'helped'), 'move': ('moved', 'moved'),
+}
+PARTICIPLE_TO_PAST = {participle: past for past, participle in VERB_FORMS.values()}
+# "been" depends on the subject and is handled by agreement, not by lookup
+PARTICIPLE_TO_PAST.pop('been', None)
+
+# Preceding words after which "she have", "it go" etc. are correct (questions, modals, causatives)
+AGREEMENT_EXEMPT_PREVIOUS = frozenset([
+    'does', 'did', 'do', "doesn't", "didn't", 'can', 'could', 'will', 'would', 'shall',
+    'should', 'may', 'might', 'must', "can't", "won't", "wouldn't", "couldn't", "shouldn't",
+    'let', 'lets', 'make', 'makes', 'made', 'help', 'helps', 'helped', 'see', 'saw', 'watch',
+    'watched', 'hear', 'heard', 'have', 'had', 'and', 'or', 'nor', 'if', 'to',
+])
+
+# A clause opening with one of these and ending in "?" is a question ("What she do?")
+WH_WORDS = frozenset(['what', 'where', 'when', 'why', 'how', 'who', 'whom', 'which', 'whose'])
+AUXILIARIES = frozenset(['do', 'does', 'did', 'am', 'is', 'are', 'was', 'were', 'has', 'have', 'had',
+                         'can', 'could', 'will', 'would', 'shall', 'should', 'may', 'might', 'must'])
+
+NUMBER_WORDS = r'(?:\d+|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|a few|several|many)'
+TIME_UNITS = r'(?:years?|months?|weeks?|days?|hours?|minutes?)'
+FINISHED_TIME = (r'(?:yesterday|last\s+(?:night|week|weekend|month|year|summer|winter|spring|autumn|'
+                 r'monday|tuesday|wednesday|thursday|friday|saturday|sunday)|'
+                 + NUMBER_WORDS + r'\s+' + TIME_UNITS + r'\s+ago|in\s+(?:19|20)\d\d)')
+# Text between a verb and a time phrase; stops at a new clause ("I think I saw him yesterday")
+# or a preposition that changes the reference ("since last year")
+SAME_CLAUSE = (r'(?:(?!\b(?:I|you|we|they|he|she|it|that|what|who|which|where|when|if|because|'
+               r'since|until|about|from|of)\b)[^.!?,;])*?')
+
+
+def third_person(verb: str) -> str:
+    """he/she/it form of a base verb"""
+    if verb == 'have':
+        return 'has'
+    if verb.endswith(('s', 'sh', 'ch', 'x', 'z', 'o')):
+        return verb + 'es'
+    if verb.endswith('y') and verb[-2:-1] not in 'aeiou':
+        return verb[:-1] + 'ies'
+    return verb + 's'
+
+
+def _graded_forms(adjective: str) -> Tuple[str, str]:
+    """Comparative and superlative of a short adjective"""
+    if adjective.endswith('e'):
+        stem = adjective[:-1]
+    elif adjective.endswith('y') and adjective[-2:-1] not in 'aeiou':
+        stem = adjective[:-1] + 'i'
+    elif (len(adjective) <= 4 and adjective[-1] not in 'aeiouwy'
+          and adjective[-2:-1] in 'aeiou' and adjective[-3:-2] not in 'aeiou'):
+        stem = adjective + adjective[-1]
+    else:
+        stem = adjective
+    return stem + 'er', stem + 'est'
+
+
+# Plural spelling -> uncountable noun ("vocabularies" -> "vocabulary")
+UNCOUNTABLE_PLURALS = {third_person(noun): noun for noun in UNCOUNTABLE_NOUNS}
+
+GRADED_FORMS = {}
+for _adjective in SHORT_ADJECTIVES:
+    _comparative, _superlative = _graded_forms(_adjective)
+    GRADED_FORMS[_comparative] = _adjective
+    GRADED_FORMS[_superlative] = _adjective
+GRADED_FORMS.update(IRREGULAR_COMPARATIVES)
+SUPERLATIVE_DETERMINERS = frozenset(['the', 'my', 'your', 'his', 'her', 'its', 'our', 'their'])
+
+# Past simple -> base form, for "didn't went"
+PAST_TO_BASE = {past: base for base, (past, _) in VERB_FORMS.items() if past != base}
+
+
+def _alternation(words) -> str:
+    """Regex alternation, longest first so 'a few' wins over 'few'"""
+    return '|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+def _match_case(source: str, replacement: str) -> str:
+    """Carry the capitalisation of the original text over to its correction"""
+    if source[:1].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+
+# ---------------------------------------------------------------------------
+# Rules: each fix returns (correction, explanation) for a match, or None to skip it
+# ---------------------------------------------------------------------------
+
+def _fix_uncountable(match, text: str) -> Optional[Tuple[str, str]]:
+    determiner, verb = match.group('det'), match.group('verb')
+    noun = UNCOUNTABLE_PLURALS[match.group('noun').lower()]
+    parts = []
+    if determiner:
+        parts.append(UNCOUNTABLE_DETERMINERS[determiner.lower()])
+    parts.append(noun)
+    if verb:
+        parts.append({'are': 'is', 'were': 'was'}[verb.lower()])
+    return ' '.join(parts), f'"{noun.capitalize()}" is uncountable, so it has no plural form.'
+
+
+def _fix_third_person(match, text: str) -> Optional[Tuple[str, str]]:
+    if _previous_word(text, match.start()) in AGREEMENT_EXEMPT_PREVIOUS:
+        return None
+    subject, verb = match.group('subj'), match.group('verb').lower()
+    opening = _clause_before(text, match.start())
+    if opening and opening[0] in WH_WORDS and _is_question(text, match.end()):
+        # "What she do?" is missing its auxiliary: "What does she do?", not "she does"
+        if any(word in AUXILIARIES for word in opening):
+            return None
+        fixed = {"don't": f"doesn't {subject}", 'do not': f'does {subject} not', 'are': f'is {subject}',
+                 "aren't": f"isn't {subject}", "haven't": f"hasn't {subject}"}.get(verb) or f'does {subject} {verb}'
+        return fixed, f'Questions with he/she/it need "{fixed.split()[0]}" before the subject.'
+    fixed = {"don't": "doesn't", 'do not': 'does not', 'are': 'is', "aren't": "isn't",
+             "haven't": "hasn't"}.get(verb) or third_person(verb)
+    return f'{subject} {fixed}', f'With he/she/it we use "{fixed}".'
+
+
+def _fix_plural_subject(match, text: str) -> Optional[Tuple[str, str]]:
+    subject, verb = match.group('subj'), match.group('verb').lower()
+    if subject.lower() == 'i':
+        fixed = {'has': 'have', "doesn't": "don't", 'does not': 'do not', 'is': 'am', 'are': 'am',
+                 "isn't": 'am not'}.get(verb)
+    else:
+        fixed = {'has': 'have', "doesn't": "don't", 'does not': 'do not', 'is': 'are', 'am': 'are',
+                 "isn't": "aren't", 'was': 'were', "wasn't": "weren't"}.get(verb)
+    if not fixed:
+        return None
+    return f'{subject} {fixed}', f'With "{subject}" we use "{fixed}", not "{verb}".'
+
+
+def _fix_double_comparative(match, text: str) -> Optional[Tuple[str, str]]:
+    adverb, adjective = match.group('adv').lower(), match.group('adj')
+    if adverb == 'most' and _previous_word(text, match.start()) not in SUPERLATIVE_DETERMINERS:
+        # "Most older people..." means "the majority of"
+        return None
+    kind = 'comparative' if adverb == 'more' else 'superlative'
+    return (adjective.lower(),
+            f'"{adjective.lower()}" is already {kind}, so we don\'t add "{adverb}".')
+
+
+def _fix_ing_adjective(match, text: str) -> Optional[Tuple[str, str]]:
+    adjective = match.group('adj').lower()
+    fixed = FEELING_ADJECTIVES[adjective]
+    original = match.group(0)
+    correction = original[:match.start('adj') - match.start()] + fixed + original[match.end('adj') - match.start():]
+    return correction, f'Use "{fixed}" to describe how you feel; "{adjective}" describes what causes the feeling.'
+
+
+def _fix_past_after_did(match, text: str) -> Optional[Tuple[str, str]]:
+    base = PAST_TO_BASE[match.group('verb').lower()]
+    subject = f"{match.group('subj')} " if match.group('subj') else ''
+    return (f"{match.group('aux')} {subject}{base}",
+            f'After "{match.group("aux").lower()}" we use the base form "{base}".')
+
+
+def _fix_since_duration(match, text: str) -> Optional[Tuple[str, str]]:
+    return (f"for {match.group('amount')} {match.group('unit')}",
+            'Use "for" with a length of time and "since" with a starting point.')
+
+
+def _fix_perfect_with_past_time(match, text: str) -> Optional[Tuple[str, str]]:
+    past = PARTICIPLE_TO_PAST.get(match.group('part').lower())
+    if past is None:
+        participle = match.group('part').lower()
+        if not participle.endswith('ed'):
+            return None
+        past = participle
+    subject = match.group('subj')
+    correction = (f'{subject} ' if subject else '') + past + match.group('rest')
+    return (_match_case(match.group(0), correction),
+            f'Use the past simple with a finished time like "{match.group("time").lower()}".')
+
+
+def _fix_present_with_past_time(match, text: str) -> Optional[Tuple[str, str]]:
+    verb = match.group('verb').lower()
+    next_word = match.group('rest').split()[0].lower() if match.group('rest').split() else ''
+    if verb == 'have' and (next_word == 'been' or next_word in PARTICIPLE_TO_PAST or next_word.endswith('ed')):
+        # A present perfect; the perfect rule decides whether it's wrong
+        return None
+    past = VERB_FORMS[verb][0]
+    return (f"{match.group('subj')} {past}{match.group('rest')}",
+            f'Use the past tense for finished actions like "{match.group("time").lower()}".')
+
+
+def _previous_word(text: str, position: int) -> str:
+    words = text[:position].split()
+    return words[-1].lower().strip(',;:') if words else ''
+
+
+def _clause_before(text: str, position: int) -> List[str]:
+    """Lowercase words from the start of the clause up to `position`"""
+    return re.split(r'[.!?,;:]', text[:position])[-1].lower().split()
+
+
+def _is_question(text: str, position: int) -> bool:
+    """Whether the sentence running through `position` ends with a question mark"""
+    end = re.search(r'[.!?]', text[position:])
+    return bool(end) and end.group(0) == '?'
+
+
+# "read" has the same spelling in the past, so it can't be judged without context
+_base_verbs = _alternation(v for v in VERB_FORMS if v not in ('be', 'read'))
+
+# (rule id, error type, severity, confidence, compiled pattern, fix); earlier rules win overlaps
+RULES: List[Tuple[str, str, str, float, re.Pattern, Callable]] = [
+    ('tense.perfect_with_past_time', 'grammar', 'major', 0.85, re.compile(
+        r"\b(?:(?P<subj>I|you|we|they|he|she|it)\s+)?(?:have|has)\s+(?P<part>[a-z]+)\b"
+        r'(?P<rest>' + SAME_CLAUSE + r'\b(?P<time>' + FINISHED_TIME + r'))\b', re.IGNORECASE),
+        _fix_perfect_with_past_time),
+    ('tense.present_with_past_time', 'grammar', 'major', 0.85, re.compile(
+        r'\b(?P<subj>I|you|we|they|he|she|it)\s+(?P<verb>' + _base_verbs + r')\b'
+        r'(?P<rest>' + SAME_CLAUSE + r'\b(?P<time>' + FINISHED_TIME + r'))\b', re.IGNORECASE),
+        _fix_present_with_past_time),
+    ('tense.past_after_did', 'grammar', 'major', 0.95, re.compile(
+        r"\b(?P<aux>didn't|did not|did)\s+(?:(?P<subj>you|we|they|he|she|it|I)\s+)?(?P<verb>"
+        + _alternation(PAST_TO_BASE) + r')\b', re.IGNORECASE), _fix_past_after_did),
+    ('tense.since_duration', 'grammar', 'major', 0.9, re.compile(
+        r'\bsince\s+(?P<amount>' + NUMBER_WORDS + r')\s+(?P<unit>' + TIME_UNITS + r')\b(?!\s+ago)',
+        re.IGNORECASE), _fix_since_duration),
+    ('noun.uncountable_plural', 'vocabulary', 'major', 0.95, re.compile(
+        r'\b(?:(?P<det>' + _alternation(UNCOUNTABLE_DETERMINERS) + r')\s+)?'
+        r'(?P<noun>' + _alternation(UNCOUNTABLE_PLURALS) + r')\b'
+        r'(?:\s+(?P<verb>are|were)\b)?', re.IGNORECASE), _fix_uncountable),
+    ('agreement.third_person', 'grammar', 'major', 0.9, re.compile(
+        r"\b(?P<subj>he|she|it)\s+(?P<verb>don't|do not|are|aren't|haven't|"
+        + _base_verbs + r")\b", re.IGNORECASE), _fix_third_person),
+    ('agreement.plural_subject', 'grammar', 'major', 0.9, re.compile(
+        r"\b(?P<subj>I|you|we|they)\s+(?P<verb>has|doesn't|does not|is|isn't|am|are|was|wasn't)\b",
+        re.IGNORECASE), _fix_plural_subject),
+    ('comparative.double', 'grammar', 'major', 0.95, re.compile(
+        r'\b(?P<adv>more|most)\s+(?P<adj>' + _alternation(GRADED_FORMS) + r')\b', re.IGNORECASE),
+        _fix_double_comparative),
+    ('adjective.ing_for_ed', 'vocabulary', 'major', 0.9, re.compile(
+        r"\b(?:I am|I'm|I was|I feel|I felt|we are|we're|we were|they are|they're|they were|"
+        r"he is|he's|he was|she is|she's|she was)\s+(?:(?:very|so|really|quite|too|a bit)\s+)?"
+        r'(?P<adj>' + _alternation(FEELING_ADJECTIVES) + r')\s+(?:in|about|with|by|of|at)\b', re.IGNORECASE),
+        _fix_ing_adjective),
+]
+
+# "I am" / "she is" are correct; the plural-subject rule must not fire on them
+_VALID_PAIRS = {('i', 'am'), ('i', 'was'), ('i', "wasn't"), ('you', 'are'), ('we', 'are'),
+                ('they', 'are')}
+
+
+def check_message(text: str) -> List[Dict]:
+    """Run every rule over a message and return non-overlapping findings as error dicts"""
+    findings: List[Dict] = []
+    taken: List[Tuple[int, int]] = []
+
+    for rule_id, error_type, severity, confidence, pattern, fix in RULES:
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if any(start < t_end and t_start < end for t_start, t_end in taken):
+                continue
+            if rule_id == 'agreement.plural_subject' and \
+                    (match.group('subj').lower(), match.group('verb').lower()) in _VALID_PAIRS:
+                continue
+
+            fixed = fix(match, text)
+            if fixed is None:
+                continue
+            correction, explanation = fixed
+
+            taken.append((start, end))
+            findings.append({
+                'error_type': error_type,
+                'severity': severity,
+                'original_text': match.group(0),
+                'correction': _match_case(match.group(0), correction),
+                'explanation': explanation,
+                'start_position': start,
+                'end_position': end,
+                'confidence': confidence,
+                'rule': rule_id,
+                'detected_by': 'rule'
+            })
+
+    findings.sort(key=lambda f: f['start_position'])
+    return findings
+
+
+def merge_findings(rule_errors: List[Dict], model_errors: List[Dict]) -> List[Dict]:
+    """Rule findings plus the model errors that don't describe the same text"""
+    merged = list(rule_errors)
+    covered = [e['original_text'].lower() for e in rule_errors]
+    for error in model_errors:
+        original = (error.get('original_text') or '').lower()
+        if any(original in c or c in original for c in covered):
+            continue
+        merged.append(error)
+    return merged
+
+
+def format_hint(rule_errors: List[Dict]) -> str:
+    """Tell the model which corrections are already made so it can skip them"""
+    lines = [f'- "{e["original_text"]}" → "{e["correction"]}"' for e in rule_errors]
+    return ("These errors in the learner's latest message were already corrected locally:\n"
+            + '\n'.join(lines)
+            + "\nDo not repeat them in your learning notes; only add other significant errors.")
@@ -5,12 +5,17 @@ Simplified Database Management for AI-Driven English Learning System
 import sqlite3
 import json
 import os
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 from typing import List, Dict, Optional, Any
 
+from vocabulary import extract_lemmas
+from cefr import estimate_level, level_name, level_value, word_level, LEVEL_VALUES
+from error_clustering import ErrorClusterer
+
 class SimpleDatabase:
     def __init__(self, db_path: str = "english_learning.db"):
         self.db_path = db_path
+        self.clusterer = ErrorClusterer()
         self.init_database()
 
     def init_database(self):
@@ -55,6 +60,12 @@ class SimpleDatabase:
                 cefr_estimate VARCHAR(2)
             )
         ''')
+        # Numeric level (A1=1 ... C2=6) so AVG() and trends are meaningful
+        if self._ensure_columns(cursor, 'messages', {'cefr_score': 'REAL'}):
+            cursor.execute('''
+                UPDATE messages SET cefr_score = CASE UPPER(cefr_estimate) {}
+                END WHERE cefr_score IS NULL AND cefr_estimate IS NOT NULL
+            '''.format(' '.join(f"WHEN '{name}' THEN {value}" for name, value in LEVEL_VALUES.items())))
 
         # Errors table (simplified)
         cursor.execute('''
@@ -69,6 +80,110 @@ class SimpleDatabase:
                 confidence_score REAL DEFAULT 0.0
             )
         ''')
+        self._ensure_columns(cursor, 'errors', {
+            'start_position': 'INTEGER',
+            'end_position': 'INTEGER',
+            # 'rule' for the local pre-checker, 'model' for the AI
+            'detected_by': "VARCHAR(10) DEFAULT 'model'",
+            # Near-duplicate group, see error_clustering.py (NULL until assigned or backfilled)
+            'cluster_id': 'INTEGER REFERENCES error_clusters(cluster_id)'
+        })
+
+        # Error clusters: representative text and MinHash signature of each group
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS error_clusters (
+                cluster_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                original_text TEXT NOT NULL,
+                correction TEXT,
+                signature BLOB NOT NULL,
+                error_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Canonical (original, correction) text -> cluster, for exact repeats
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS error_cluster_keys (
+                canonical_key TEXT PRIMARY KEY,
+                cluster_id INTEGER NOT NULL REFERENCES error_clusters(cluster_id)
+            ) WITHOUT ROWID
+        ''')
+        # LSH band buckets -> clusters, for near-duplicate candidates
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS error_cluster_bands (
+                band_key INTEGER NOT NULL,
+                cluster_id INTEGER NOT NULL REFERENCES error_clusters(cluster_id),
+                PRIMARY KEY (band_key, cluster_id)
+            ) WITHOUT ROWID
+        ''')
+
+        # Errors per user, cluster and day, maintained on insert so the frequent-error
+        # report sums a few rollup rows instead of grouping every error
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS error_cluster_counts (
+                user_id INTEGER NOT NULL REFERENCES users(user_id),
+                cluster_id INTEGER NOT NULL REFERENCES error_clusters(cluster_id),
+                day DATE NOT NULL,
+                error_count INTEGER DEFAULT 0,
+                PRIMARY KEY (user_id, day, cluster_id)
+            ) WITHOUT ROWID
+        ''')
+
+        # Spaced-repetition schedule (SM-2) per user and error cluster, see review_queue.py
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_queue (
+                review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL REFERENCES users(user_id),
+                cluster_id INTEGER NOT NULL REFERENCES error_clusters(cluster_id),
+                ease_factor REAL DEFAULT 2.5,
+                interval_days REAL DEFAULT 0,
+                repetitions INTEGER DEFAULT 0,
+                lapses INTEGER DEFAULT 0,
+                due_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_reviewed TIMESTAMP,
+                last_quality INTEGER
+            )
+        ''')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_review_user_cluster
+            ON review_queue(user_id, cluster_id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_review_user_due
+            ON review_queue(user_id, due_at)
+        ''')
+        # Per-user change counter, bumped by every write that schedules or reschedules a row,
+        # so ReviewQueue.sync fetches only the rows changed since it last looked
+        self._ensure_columns(cursor, 'review_queue', {'change_seq': 'INTEGER DEFAULT 0'})
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_review_user_change
+            ON review_queue(user_id, change_seq)
+        ''')
+
+        # Batch items already stored, so a resumed batch_grader run never stores one twice
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS graded_items (
+                batch TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                message_id INTEGER REFERENCES messages(message_id),
+                PRIMARY KEY (batch, item_id)
+            ) WITHOUT ROWID
+        ''')
+
+        # Join and grouping paths of the error reports
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_errors_message ON errors(message_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_errors_cluster ON errors(cluster_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_conversations_user ON conversations(user_id)')
+
+        # Running error count per conversation, so resuming one needn't count its whole history.
+        # Only learner messages count: older databases also hold copies of them on assistant rows.
+        if self._ensure_columns(cursor, 'conversations', {'total_errors': 'INTEGER DEFAULT 0'}):
+            cursor.execute('''
+                UPDATE conversations SET total_errors = (
+                    SELECT COUNT(*) FROM messages m JOIN errors e ON e.message_id = m.message_id
+                    WHERE m.conversation_id = conversations.conversation_id AND m.role = 'user'
+                )
+            ''')
 
         # Learning progress table
         cursor.execute('''
@@ -83,11 +198,66 @@ class SimpleDatabase:
                 cefr_progress VARCHAR(10) DEFAULT 'stable'
             )
         ''')
+        # Words in the day's user messages, the denominator of error rates (progress_analytics.py)
+        if self._ensure_columns(cursor, 'learning_progress', {'words_written': 'INTEGER DEFAULT 0'}):
+            cursor.execute('''
+                UPDATE learning_progress SET words_written = IFNULL((
+                    SELECT SUM(m.word_count) FROM messages m
+                    JOIN conversations c ON m.conversation_id = c.conversation_id
+                    WHERE c.user_id = learning_progress.user_id AND m.role = 'user'
+                      AND DATE(m.timestamp) = learning_progress.date
+                ), 0)
+            ''')
+        # Messages with a score, the denominator of avg_score (a turn whose analysis failed has none)
+        if self._ensure_columns(cursor, 'learning_progress', {'scored_messages': 'INTEGER DEFAULT 0'}):
+            cursor.execute('UPDATE learning_progress SET scored_messages = messages_sent')
+        # One row per user and day, so writers can upsert it; merge the duplicates older versions could leave
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_progress_user_day'")
+        if not cursor.fetchone():
+            self._merge_progress_duplicates(cursor)
+            cursor.execute('DROP INDEX IF EXISTS idx_progress_user_date')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_progress_user_day
+            ON learning_progress(user_id, date)
+        ''')
+
+        # Per-user word index, upserted as messages arrive (one row per user and lemma)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vocabulary_tracking (
+                tracking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER REFERENCES users(user_id),
+                word VARCHAR(50) NOT NULL,
+                word_level VARCHAR(2),  -- CEFR level of the word (NULL if not in the lexicon)
+                usage_count INTEGER DEFAULT 1,
+                first_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                mastery_level INTEGER DEFAULT 0 -- 0-5 scale
+            )
+        ''')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_vocabulary_user_word
+            ON vocabulary_tracking(user_id, word)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_vocabulary_user_first_used
+            ON vocabulary_tracking(user_id, first_used)
+        ''')
 
         conn.commit()
         conn.close()
         print(f"✅ Simplified database initialized: {self.db_path}")
 
+    def _ensure_columns(self, cursor, table: str, columns: Dict[str, str]) -> List[str]:
+        """Add columns missing from databases created by older versions, return the ones added"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in cursor.fetchall()}
+        added = []
+        for name, declaration in columns.items():
+            if name not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {declaration}')
+                added.append(name)
+        return added
+
     def get_or_create_user(self, username: str, preferred_level: str = 'B1') -> int:
         """Get or create user, return user_id"""
         try:
@@ -134,6 +304,79 @@ class SimpleDatabase:
         conn.close()
         return conversation_id
 
+    def get_conversation_state(self, user_id: int, conversation_id: int = None,
+                               limit: int = 40) -> Optional[Dict]:
+        """A conversation of this user (the latest one by default) ready to be resumed
+
+        Returns the conversation row with its running totals, its last `limit` messages
+        (oldest first) from one keyset query on idx_messages_conversation, the errors found
+        in those messages by type, and today's learning_progress row. Cost depends on
+        `limit`, not on the length of the conversation. None if there is no such conversation.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            cursor = conn.cursor()
+
+            if conversation_id is None:
+                cursor.execute('''
+                    SELECT conversation_id FROM conversations
+                    WHERE user_id = ? ORDER BY conversation_id DESC LIMIT 1
+                ''', (user_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                conversation_id = row[0]
+
+            cursor.execute('''
+                SELECT conversation_id, topic, english_level, created_at, total_messages,
+                       IFNULL(total_errors, 0)
+                FROM conversations WHERE conversation_id = ? AND user_id = ?
+            ''', (conversation_id, user_id))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            state = {
+                'conversation_id': row[0], 'topic': row[1], 'english_level': row[2],
+                'created_at': row[3], 'total_messages': row[4] or 0, 'total_errors': row[5]
+            }
+
+            # Newest first down the (conversation_id, timestamp) index, rowid breaking ties
+            cursor.execute('''
+                SELECT message_id, role, content, timestamp FROM messages
+                WHERE conversation_id = ?
+                ORDER BY timestamp DESC, message_id DESC
+                LIMIT ?
+            ''', (conversation_id, limit))
+            messages = [{'message_id': message_id, 'role': role, 'content': content, 'timestamp': timestamp}
+                        for message_id, role, content, timestamp in reversed(cursor.fetchall())]
+            state['messages'] = messages
+
+            recent_errors = {}
+            user_message_ids = [m['message_id'] for m in messages if m['role'] == 'user']
+            if user_message_ids:
+                cursor.execute(f'''
+                    SELECT error_type, COUNT(*) FROM errors
+                    WHERE message_id IN ({','.join('?' * len(user_message_ids))})
+                    GROUP BY error_type
+                ''', user_message_ids)
+                recent_errors = dict(cursor.fetchall())
+            state['recent_errors'] = recent_errors
+
+            cursor.execute('''
+                SELECT messages_sent, total_errors, avg_score FROM learning_progress
+                WHERE user_id = ? AND date = ?
+            ''', (user_id, date.today()))
+            progress = cursor.fetchone()
+            state['today'] = {'messages_sent': progress[0], 'total_errors': progress[1],
+                              'avg_score': progress[2]} if progress else None
+            return state
+        except Exception as e:
+            print(f"Database error in get_conversation_state: {e}")
+            return None
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
     def add_message_with_ai_analysis(self, conversation_id: int, role: str,
                                    content: str, ai_analysis: Dict = None) -> int:
         """Add message with AI analysis"""
@@ -143,13 +386,18 @@ class SimpleDatabase:
 
             word_count = len(content.split()) if content else 0
             cefr_estimate = ai_analysis.get('vocabulary', {}).get('cefr_level_estimate') if ai_analysis else None
+            cefr_score = level_value(cefr_estimate)
+            if cefr_score is None and role == 'user':
+                # Local lexicon estimate when the AI didn't provide one
+                cefr_score = estimate_level(content or '')
+                cefr_estimate = level_name(cefr_score)
             ai_json = json.dumps(ai_analysis) if ai_analysis else None
 
             cursor.execute('''
                 INSERT INTO messages
-                (conversation_id, role, content, ai_analysis, word_count, cefr_estimate)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (conversation_id, role, content, ai_json, word_count, cefr_estimate))
+                (conversation_id, role, content, ai_analysis, word_count, cefr_estimate, cefr_score)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (conversation_id, role, content, ai_json, word_count, cefr_estimate, cefr_score))
 
             message_id = cursor.lastrowid
 
@@ -160,10 +408,18 @@ class SimpleDatabase:
                 WHERE conversation_id = ?
             ''', (conversation_id,))
 
+            if role == 'user':
+                cursor.execute('SELECT user_id FROM conversations WHERE conversation_id = ?', (conversation_id,))
+                owner = cursor.fetchone()
+                if owner:
+                    self._track_vocabulary(cursor, owner[0], content)
+
             conn.commit()
 
-            # Store errors from AI analysis (in separate connection to avoid locking)
-            if ai_analysis and 'errors' in ai_analysis:
+            # Store errors from AI analysis (in separate connection to avoid locking). Errors belong to
+            # the learner's message; an assistant row only keeps them in its ai_analysis JSON, since the
+            # tutor has already stored them against the user message.
+            if role == 'user' and ai_analysis and 'errors' in ai_analysis:
                 self._store_errors_from_ai(message_id, ai_analysis['errors'])
 
             return message_id
@@ -175,6 +431,71 @@ class SimpleDatabase:
             if 'conn' in locals():
                 conn.close()
 
+    def _merge_progress_duplicates(self, cursor):
+        """Fold duplicate learning_progress rows of a user and day into the oldest one"""
+        cursor.execute('''
+            SELECT user_id, date, MIN(progress_id), SUM(messages_sent), SUM(total_errors),
+                   SUM(IFNULL(avg_score, 0) * scored_messages), SUM(scored_messages),
+                   SUM(unique_words_used), SUM(words_written)
+            FROM learning_progress
+            GROUP BY user_id, date
+            HAVING COUNT(*) > 1
+        ''')
+        for user_id, day, keep, messages, errors, score_sum, scored, unique_words, words in cursor.fetchall():
+            cursor.execute('''
+                UPDATE learning_progress
+                SET messages_sent = ?, total_errors = ?, avg_score = ?, scored_messages = ?,
+                    unique_words_used = ?, words_written = ?,
+                    cefr_progress = (SELECT cefr_progress FROM learning_progress
+                                     WHERE user_id IS ? AND date = ? ORDER BY progress_id DESC LIMIT 1)
+                WHERE progress_id = ?
+            ''', (messages, errors, score_sum / scored if scored else 0.0, scored, unique_words, words,
+                  user_id, day, keep))
+            cursor.execute('DELETE FROM learning_progress WHERE user_id IS ? AND date = ? AND progress_id != ?',
+                           (user_id, day, keep))
+
+    def _track_vocabulary(self, cursor, user_id: int, content: str) -> int:
+        """Upsert the lemmas of one user message into the word index, inside the caller's transaction
+
+        Touches only the words in the message, so the cost doesn't grow with the
+        user's history. Also adds the words not yet used today to today's
+        learning_progress.unique_words_used (and the message's words to
+        words_written). Returns the number of new words.
+        """
+        counts = extract_lemmas(content or '')
+        if not counts:
+            return 0
+        word_count = len(content.split())
+        # learning_progress rows are keyed by the local date, while last_used is a UTC
+        # CURRENT_TIMESTAMP, so today starts at local midnight converted to UTC
+        today = date.today()
+        day_start = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc)
+
+        words = list(counts)
+        placeholders = ','.join('?' * len(words))
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM vocabulary_tracking
+            WHERE user_id = ? AND word IN ({placeholders}) AND last_used >= ?
+        ''', (user_id, *words, day_start.strftime('%Y-%m-%d %H:%M:%S')))
+        new_today = len(words) - cursor.fetchone()[0]
+
+        cursor.executemany('''
+            INSERT INTO vocabulary_tracking (user_id, word, word_level, usage_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, word) DO UPDATE SET
+                usage_count = usage_count + excluded.usage_count,
+                last_used = CURRENT_TIMESTAMP
+        ''', [(user_id, word, word_level(word), count) for word, count in counts.items()])
+
+        cursor.execute('''
+            INSERT INTO learning_progress (user_id, date, messages_sent, unique_words_used, words_written)
+            VALUES (?, ?, 0, ?, ?)
+            ON CONFLICT(user_id, date) DO UPDATE SET
+                unique_words_used = unique_words_used + excluded.unique_words_used,
+                words_written = words_written + excluded.words_written
+        ''', (user_id, today, new_today, word_count))
+        return new_today
+
     def _store_errors_from_ai(self, message_id: int, errors: List[Dict]):
         """Store errors detected by AI"""
         if not errors or message_id <= 0:
@@ -184,80 +505,306 @@ class SimpleDatabase:
             conn = sqlite3.connect(self.db_path, timeout=10.0)
             cursor = conn.cursor()
 
-            for error in errors:
-                cursor.execute('''
-                    INSERT INTO errors
-                    (message_id, error_type, severity, original_text, correction, explanation, confidence_score)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    message_id,
-                    error.get('error_type', 'unknown'),
-                    error.get('severity', 'minor'),
-                    error.get('original_text', ''),
-                    error.get('correction', ''),
-                    error.get('explanation', ''),
-                    error.get('confidence', 0.0)
-                ))
+            rows = [self._error_row(cursor, message_id, error) for error in errors]
+            cursor.executemany('''
+                INSERT INTO errors
+                (message_id, error_type, severity, original_text, correction, explanation, confidence_score,
+                 start_position, end_position, detected_by, cluster_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+            cursor.execute('''
+                SELECT c.user_id, c.conversation_id FROM messages m
+                JOIN conversations c ON m.conversation_id = c.conversation_id
+                WHERE m.message_id = ?
+            ''', (message_id,))
+            owner = cursor.fetchone()
+            self._count_clusters(cursor, owner[0] if owner else None, rows)
+            if owner:
+                cursor.execute('UPDATE conversations SET total_errors = total_errors + ? WHERE conversation_id = ?',
+                               (len(rows), owner[1]))
 
             conn.commit()
+            self.clusterer.committed(conn)
         except Exception as e:
             print(f"Database error in store_errors: {e}")
         finally:
             if 'conn' in locals():
+                self.clusterer.discard(conn)
                 conn.close()
 
-    def update_learning_progress(self, user_id: int, message_data: Dict):
-        """Update daily learning progress"""
+    def _error_row(self, cursor, message_id: int, error: Dict) -> tuple:
+        """Insert parameters for one error, with its cluster assigned"""
+        original = error.get('original_text', '')
+        correction = error.get('correction', '')
+        return (
+            message_id,
+            error.get('error_type', 'unknown'),
+            error.get('severity', 'minor'),
+            original,
+            correction,
+            error.get('explanation', ''),
+            error.get('confidence', 0.0),
+            error.get('start_position'),
+            error.get('end_position'),
+            error.get('detected_by', 'model'),
+            self.clusterer.assign(cursor, original, correction)
+        )
+
+    def _count_clusters(self, cursor, user_id: Optional[int], rows: List[tuple]):
+        """Add inserted error rows to the cluster totals and today's per-user rollup"""
+        counts: Dict[int, int] = {}
+        for row in rows:
+            counts[row[-1]] = counts.get(row[-1], 0) + 1
+        cursor.executemany('UPDATE error_clusters SET error_count = error_count + ? WHERE cluster_id = ?',
+                           [(count, cluster_id) for cluster_id, count in counts.items()])
+        if user_id is None:
+            return
+        # DATE('now') matches DATE(m.timestamp) of messages stored with CURRENT_TIMESTAMP
+        cursor.executemany('''
+            INSERT INTO error_cluster_counts (user_id, cluster_id, day, error_count)
+            VALUES (?, ?, DATE('now'), ?)
+            ON CONFLICT(user_id, day, cluster_id) DO UPDATE SET error_count = error_count + excluded.error_count
+        ''', [(user_id, cluster_id, count) for cluster_id, count in counts.items()])
+
+        # New mistakes become due for review now; repeating a scheduled one is a lapse
+        cursor.executemany('''
+            INSERT INTO review_queue (user_id, cluster_id, change_seq) VALUES (?, ?, (
+                SELECT IFNULL(MAX(change_seq), 0) + 1 FROM review_queue WHERE user_id = ?))
+            ON CONFLICT(user_id, cluster_id) DO UPDATE SET
+                repetitions = 0,
+                interval_days = 0,
+                lapses = lapses + (repetitions > 0),
+                ease_factor = CASE WHEN repetitions > 0 THEN MAX(1.3, ease_factor - 0.2) ELSE ease_factor END,
+                due_at = CURRENT_TIMESTAMP,
+                change_seq = excluded.change_seq
+        ''', [(user_id, cluster_id, user_id) for cluster_id in counts])
+
+    def seed_review_queue(self, user_id: int) -> int:
+        """Schedule clusters from errors stored before the review queue existed, return rows added"""
         try:
             conn = sqlite3.connect(self.db_path, timeout=10.0)
             cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR IGNORE INTO review_queue (user_id, cluster_id, change_seq)
+                SELECT DISTINCT user_id, cluster_id, (
+                    SELECT IFNULL(MAX(change_seq), 0) + 1 FROM review_queue WHERE user_id = ?
+                ) FROM error_cluster_counts WHERE user_id = ?
+            ''', (user_id, user_id))
+            added = cursor.rowcount
+            conn.commit()
+            return added
+        except Exception as e:
+            print(f"Database error in seed_review_queue: {e}")
+            return 0
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    def get_review_schedule(self, user_id: int, changed_after: int = None) -> List[tuple]:
+        """(change_seq, due_at, cluster_id) of a user's review items, only those changed after changed_after if given"""
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        cursor = conn.cursor()
+        if changed_after is not None:
+            cursor.execute('''
+                SELECT change_seq, due_at, cluster_id FROM review_queue
+                WHERE user_id = ? AND change_seq > ?
+            ''', (user_id, changed_after))
+        else:
+            cursor.execute('SELECT change_seq, due_at, cluster_id FROM review_queue WHERE user_id = ?', (user_id,))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
 
-            today = date.today()
+    def get_review_items(self, user_id: int, cluster_ids: List[int]) -> Dict[int, Dict]:
+        """Quiz material and schedule state for review items, keyed by cluster_id"""
+        if not cluster_ids:
+            return {}
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        cursor = conn.cursor()
+        placeholders = ','.join('?' * len(cluster_ids))
+        cursor.execute(f'''
+            SELECT r.cluster_id, cl.original_text, cl.correction, r.ease_factor, r.interval_days,
+                   r.repetitions, r.lapses, r.due_at,
+                   (SELECT e.error_type || char(31) || IFNULL(e.explanation, '')
+                    FROM errors e WHERE e.cluster_id = r.cluster_id ORDER BY e.error_id DESC LIMIT 1)
+            FROM review_queue r
+            JOIN error_clusters cl ON cl.cluster_id = r.cluster_id
+            WHERE r.user_id = ? AND r.cluster_id IN ({placeholders})
+        ''', [user_id] + list(cluster_ids))
+
+        items = {}
+        for cluster_id, original, correction, ease, interval, repetitions, lapses, due_at, latest in cursor.fetchall():
+            error_type, _, explanation = (latest or 'unknown\x1f').partition('\x1f')
+            items[cluster_id] = {
+                'cluster_id': cluster_id,
+                'original_text': original,
+                'correction': correction,
+                'error_type': error_type,
+                'explanation': explanation,
+                'ease_factor': ease,
+                'interval_days': interval,
+                'repetitions': repetitions,
+                'lapses': lapses,
+                'due_at': due_at
+            }
+        conn.close()
+        return items
 
-            # Check if today's record exists
+    def update_review(self, user_id: int, cluster_id: int, item: Dict, quality: int):
+        """Store the schedule computed for a reviewed item"""
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            cursor = conn.cursor()
             cursor.execute('''
-                SELECT progress_id FROM learning_progress
-                WHERE user_id = ? AND date = ?
-            ''', (user_id, today))
+                UPDATE review_queue
+                SET ease_factor = ?, interval_days = ?, repetitions = ?, lapses = ?,
+                    due_at = ?, last_reviewed = CURRENT_TIMESTAMP, last_quality = ?,
+                    change_seq = (SELECT MAX(change_seq) + 1 FROM review_queue WHERE user_id = ?)
+                WHERE user_id = ? AND cluster_id = ?
+            ''', (item['ease_factor'], item['interval_days'], item['repetitions'], item['lapses'],
+                  item['due_at'], quality, user_id, user_id, cluster_id))
+            conn.commit()
+        except Exception as e:
+            print(f"Database error in update_review: {e}")
+        finally:
+            if 'conn' in locals():
+                conn.close()
 
-            result = cursor.fetchone()
+    def update_learning_progress(self, user_id: int, message_data: Dict):
+        """Update daily learning progress
 
-            if result:
-                # Update existing record
-                progress_id = result[0]
+        A message whose 'score' is None (its analysis failed) still counts as sent
+        but not towards the day's average score.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            cursor = conn.cursor()
+
+            # Today's row, created by the first message of the day
+            cursor.execute('''
+                INSERT INTO learning_progress
+                (user_id, date, messages_sent, total_errors, avg_score, scored_messages, cefr_progress)
+                VALUES (?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    total_errors = total_errors + excluded.total_errors,
+                    avg_score = CASE WHEN excluded.avg_score IS NULL THEN avg_score
+                        ELSE (IFNULL(avg_score, 0) * scored_messages + excluded.avg_score) / (scored_messages + 1) END,
+                    scored_messages = scored_messages + excluded.scored_messages,
+                    messages_sent = messages_sent + 1,
+                    cefr_progress = excluded.cefr_progress
+            ''', (
+                user_id,
+                date.today(),
+                len(message_data.get('errors', [])),
+                message_data.get('score', 0),
+                int(message_data.get('score', 0) is not None),
+                message_data.get('cefr_estimate', 'stable')
+            ))
+
+            conn.commit()
+        except Exception as e:
+            print(f"Database error in update_progress: {e}")
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    def store_graded_batch(self, user_id: int, conversation_id: int, results: List[Dict],
+                           batch: str = None) -> List[int]:
+        """Store a batch of graded messages, their errors, replies and progress in one transaction
+
+        Each result needs 'content' and the parsed 'conversation', 'learning_notes',
+        'errors' and 'score'. With `batch`, each result's 'id' is recorded in the same
+        transaction and results already stored under that batch are skipped, so storing
+        the same items again (a resumed run) changes nothing. Returns the user message
+        ids in order.
+        """
+        if not results:
+            return []
+
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        cursor = conn.cursor()
+        message_ids = []
+        stored = []
+        try:
+            for result in results:
+                if batch is not None:
+                    cursor.execute('SELECT message_id FROM graded_items WHERE batch = ? AND item_id = ?',
+                                   (batch, result['id']))
+                    row = cursor.fetchone()
+                    if row:
+                        message_ids.append(row[0])
+                        continue
+                stored.append(result)
+                content = result['content']
+                cefr_score = estimate_level(content)
                 cursor.execute('''
-                    UPDATE learning_progress
-                    SET messages_sent = messages_sent + 1,
-                        total_errors = total_errors + ?,
-                        avg_score = ?,
-                        cefr_progress = ?
-                    WHERE progress_id = ?
+                    INSERT INTO messages
+                    (conversation_id, role, content, ai_analysis, word_count, cefr_estimate, cefr_score)
+                    VALUES (?, 'user', ?, ?, ?, ?, ?)
                 ''', (
-                    len(message_data.get('errors', [])),
-                    message_data.get('score', 0),
-                    message_data.get('cefr_estimate', 'stable'),
-                    progress_id
+                    conversation_id, content,
+                    json.dumps({'errors': result['errors'], 'score': result['score']}),
+                    len(content.split()), level_name(cefr_score), cefr_score
                 ))
-            else:
-                # Create new record
+                message_id = cursor.lastrowid
+                message_ids.append(message_id)
+                if batch is not None:
+                    cursor.execute('INSERT INTO graded_items (batch, item_id, message_id) VALUES (?, ?, ?)',
+                                   (batch, result['id'], message_id))
+                self._track_vocabulary(cursor, user_id, content)
+
+                rows = [self._error_row(cursor, message_id, error) for error in result['errors']]
+                cursor.executemany('''
+                    INSERT INTO errors
+                    (message_id, error_type, severity, original_text, correction, explanation, confidence_score,
+                     start_position, end_position, detected_by, cluster_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                self._count_clusters(cursor, user_id, rows)
+
                 cursor.execute('''
-                    INSERT INTO learning_progress
-                    (user_id, date, messages_sent, total_errors, avg_score, cefr_progress)
-                    VALUES (?, ?, 1, ?, ?, ?)
+                    INSERT INTO messages (conversation_id, role, content, ai_analysis, word_count)
+                    VALUES (?, 'assistant', ?, ?, ?)
                 ''', (
-                    user_id,
-                    today,
-                    len(message_data.get('errors', [])),
-                    message_data.get('score', 0),
-                    message_data.get('cefr_estimate', 'stable')
+                    conversation_id, result['conversation'],
+                    json.dumps({'learning_notes': result['learning_notes'], 'score': result['score']}),
+                    len(result['conversation'].split())
                 ))
 
+            if not stored:
+                return message_ids
+            results = stored
+
+            # Daily progress, updated once for the whole batch
+            total_errors = sum(len(result['errors']) for result in results)
+            cursor.execute('''
+                UPDATE conversations
+                SET total_messages = total_messages + ?, total_errors = total_errors + ?
+                WHERE conversation_id = ?
+            ''', (2 * len(results), total_errors, conversation_id))
+            total_score = sum(result['score'] for result in results)
+            cursor.execute('''
+                INSERT INTO learning_progress
+                (user_id, date, messages_sent, total_errors, avg_score, scored_messages)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    total_errors = total_errors + excluded.total_errors,
+                    avg_score = (IFNULL(avg_score, 0) * scored_messages + excluded.avg_score * excluded.scored_messages)
+                        / (scored_messages + excluded.scored_messages),
+                    scored_messages = scored_messages + excluded.scored_messages,
+                    messages_sent = messages_sent + excluded.messages_sent
+            ''', (user_id, date.today(), len(results), total_errors, total_score / len(results), len(results)))
+
             conn.commit()
-        except Exception as e:
-            print(f"Database error in update_progress: {e}")
+            self.clusterer.committed(conn)
+            return message_ids
+        except Exception:
+            conn.rollback()
+            raise
         finally:
-            if 'conn' in locals():
-                conn.close()
+            self.clusterer.discard(conn)
+            conn.close()
 
     def get_user_statistics(self, user_id: int) -> Dict:
         """Get comprehensive user statistics"""
@@ -305,13 +852,16 @@ class SimpleDatabase:
         cursor.execute('''
             SELECT COUNT(*) as total_messages,
                    SUM(word_count) as total_words,
-                   AVG(cefr_estimate) as avg_cefr
+                   AVG(cefr_score) as avg_cefr
             FROM messages m
             JOIN conversations c ON m.conversation_id = c.conversation_id
             WHERE c.user_id = ? AND role = 'user'
         ''', (user_id,))
         vocab_stats = cursor.fetchone()
 
+        cursor.execute('SELECT COUNT(*) FROM vocabulary_tracking WHERE user_id = ?', (user_id,))
+        unique_words = cursor.fetchone()[0]
+
         conn.close()
 
         return {
@@ -331,7 +881,9 @@ class SimpleDatabase:
             'vocabulary': {
                 'total_messages': vocab_stats[0] if vocab_stats else 0,
                 'total_words': vocab_stats[1] if vocab_stats else 0,
-                'avg_cefr': vocab_stats[2] if vocab_stats else 'B1'
+                'unique_words': unique_words,
+                'avg_cefr': level_name(vocab_stats[2]) if vocab_stats and vocab_stats[2] else None,
+                'avg_cefr_score': round(vocab_stats[2], 2) if vocab_stats and vocab_stats[2] else None
             }
         }
 
@@ -343,7 +895,7 @@ class SimpleDatabase:
         if days:
             cursor.execute('''
                 SELECT m.content, e.error_type, e.severity, e.original_text,
-                       e.correction, e.explanation, m.timestamp, e.confidence_score
+                       e.correction, e.explanation, m.timestamp, e.confidence_score, e.detected_by
                 FROM errors e
                 JOIN messages m ON e.message_id = m.message_id
                 JOIN conversations c ON m.conversation_id = c.conversation_id
@@ -354,7 +906,7 @@ class SimpleDatabase:
         else:
             cursor.execute('''
                 SELECT m.content, e.error_type, e.severity, e.original_text,
-                       e.correction, e.explanation, m.timestamp, e.confidence_score
+                       e.correction, e.explanation, m.timestamp, e.confidence_score, e.detected_by
                 FROM errors e
                 JOIN messages m ON e.message_id = m.message_id
                 JOIN conversations c ON m.conversation_id = c.conversation_id
@@ -364,7 +916,8 @@ class SimpleDatabase:
             ''', (user_id, limit))
 
         errors = []
-        for content, error_type, severity, original_text, correction, explanation, timestamp, confidence in cursor.fetchall():
+        for (content, error_type, severity, original_text, correction, explanation, timestamp, confidence,
+             detected_by) in cursor.fetchall():
             errors.append({
                 'user_message': content,
                 'error_type': error_type,
@@ -373,12 +926,89 @@ class SimpleDatabase:
                 'correction': correction,
                 'explanation': explanation,
                 'timestamp': timestamp,
-                'confidence': confidence
+                'confidence': confidence,
+                'detected_by': detected_by or 'model'
+            })
+
+        conn.close()
+        return errors
+
+    def _error_filters(self, user_id: int, days: int = None, error_type: str = None, severity: str = None):
+        """WHERE conditions and parameters shared by the error viewer queries"""
+        conditions = ['c.user_id = ?']
+        params: List[Any] = [user_id]
+        if days:
+            conditions.append("m.timestamp >= datetime('now', ?)")
+            params.append(f'-{int(days)} days')
+        if error_type:
+            conditions.append('e.error_type = ?')
+            params.append(error_type)
+        if severity:
+            conditions.append('e.severity = ?')
+            params.append(severity)
+        return conditions, params
+
+    def get_error_page(self, user_id: int, page_size: int = 10, before_id: int = None, days: int = None,
+                       error_type: str = None, severity: str = None) -> List[Dict]:
+        """One page of a user's errors, newest first, continuing below error_id before_id (keyset paging)
+
+        Fetches page_size + 1 rows so the caller can tell whether another page follows.
+        """
+        conditions, params = self._error_filters(user_id, days, error_type, severity)
+        if before_id is not None:
+            conditions.append('e.error_id < ?')
+            params.append(before_id)
+
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT e.error_id, m.content, e.error_type, e.severity, e.original_text,
+                   e.correction, e.explanation, m.timestamp, e.confidence_score, e.detected_by
+            FROM errors e
+            JOIN messages m ON e.message_id = m.message_id
+            JOIN conversations c ON m.conversation_id = c.conversation_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY e.error_id DESC
+            LIMIT ?
+        ''', params + [page_size + 1])
+
+        errors = []
+        for (error_id, content, error_type_, severity_, original_text, correction, explanation, timestamp,
+             confidence, detected_by) in cursor.fetchall():
+            errors.append({
+                'error_id': error_id,
+                'user_message': content,
+                'error_type': error_type_,
+                'severity': severity_,
+                'original_text': original_text,
+                'correction': correction,
+                'explanation': explanation,
+                'timestamp': timestamp,
+                'confidence': confidence or 0.0,
+                'detected_by': detected_by or 'model'
             })
 
         conn.close()
         return errors
 
+    def count_user_errors(self, user_id: int, days: int = None, error_type: str = None,
+                          severity: str = None, cap: int = 1000) -> int:
+        """Number of matching errors, counted up to cap (so the cost stays bounded)"""
+        conditions, params = self._error_filters(user_id, days, error_type, severity)
+
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        count = conn.execute(f'''
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM errors e
+                JOIN messages m ON e.message_id = m.message_id
+                JOIN conversations c ON m.conversation_id = c.conversation_id
+                WHERE {' AND '.join(conditions)}
+                LIMIT ?
+            )
+        ''', params + [cap]).fetchone()[0]
+        conn.close()
+        return count
+
     def get_error_patterns(self, user_id: int, days: int = 30) -> Dict:
         """Analyze error patterns for user"""
         conn = sqlite3.connect(self.db_path)
@@ -397,17 +1027,28 @@ class SimpleDatabase:
 
         error_distribution = dict(cursor.fetchall())
 
-        # Most frequent errors
+        # Most frequent errors, grouped by near-duplicate cluster (error_clustering.py) and
+        # read from the daily rollup; errors not yet backfilled are grouped on their own text
         cursor.execute('''
-            SELECT original_text, correction, COUNT(*) as frequency
-            FROM errors e
-            JOIN messages m ON e.message_id = m.message_id
-            JOIN conversations c ON m.conversation_id = c.conversation_id
-            WHERE c.user_id = ? AND m.timestamp >= datetime('now', '-{} days')
-            GROUP BY original_text, correction
+            SELECT original_text, correction, frequency
+            FROM (
+                SELECT cl.original_text, cl.correction, SUM(r.error_count) as frequency
+                FROM error_cluster_counts r
+                JOIN error_clusters cl ON cl.cluster_id = r.cluster_id
+                WHERE r.user_id = ? AND r.day >= DATE('now', '-{days} days')
+                GROUP BY r.cluster_id
+                UNION ALL
+                SELECT e.original_text, e.correction, COUNT(*)
+                FROM errors e
+                JOIN messages m ON e.message_id = m.message_id
+                JOIN conversations c ON m.conversation_id = c.conversation_id
+                WHERE e.cluster_id IS NULL
+                  AND c.user_id = ? AND m.timestamp >= datetime('now', '-{days} days')
+                GROUP BY e.original_text, e.correction
+            )
             ORDER BY frequency DESC
             LIMIT 10
-        '''.format(days), (user_id,))
+        '''.format(days=days), (user_id, user_id))
 
         frequent_errors = cursor.fetchall()
 
@@ -433,6 +1074,134 @@ class SimpleDatabase:
             'analysis_period_days': days
         }
 
+    def get_vocabulary_report(self, user_id: int, days: int = 30, min_uses: int = 2) -> Dict:
+        """Vocabulary size, growth and active vocabulary from the word index
+
+        Active vocabulary: words used at least min_uses times overall and at least
+        once in the last `days` days.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(usage_count), 0)
+            FROM vocabulary_tracking WHERE user_id = ?
+        ''', (user_id,))
+        total_words, total_uses = cursor.fetchone()
+
+        cursor.execute('''
+            SELECT COUNT(*) FROM vocabulary_tracking
+            WHERE user_id = ? AND usage_count >= ? AND last_used >= datetime('now', '-{} days')
+        '''.format(days), (user_id, min_uses))
+        active_words = cursor.fetchone()[0]
+
+        # New words per day; everything before the window is the starting size
+        cursor.execute('''
+            SELECT DATE(first_used) as day, COUNT(*) as new_words
+            FROM vocabulary_tracking
+            WHERE user_id = ? AND first_used >= datetime('now', '-{} days')
+            GROUP BY DATE(first_used)
+            ORDER BY day
+        '''.format(days), (user_id,))
+        new_by_day = cursor.fetchall()
+
+        cumulative = total_words - sum(count for _, count in new_by_day)
+        growth = []
+        for day, new_words in new_by_day:
+            cumulative += new_words
+            growth.append((day, new_words, cumulative))
+
+        cursor.execute('''
+            SELECT word, usage_count FROM vocabulary_tracking
+            WHERE user_id = ?
+            ORDER BY usage_count DESC, word
+            LIMIT 10
+        ''', (user_id,))
+        top_words = cursor.fetchall()
+
+        cursor.execute('''
+            SELECT COALESCE(word_level, '?'), COUNT(*) FROM vocabulary_tracking
+            WHERE user_id = ?
+            GROUP BY word_level
+        ''', (user_id,))
+        words_by_level = dict(cursor.fetchall())
+
+        # Daily average of the numeric message level
+        cursor.execute('''
+            SELECT DATE(m.timestamp) as day, AVG(m.cefr_score)
+            FROM messages m
+            JOIN conversations c ON m.conversation_id = c.conversation_id
+            WHERE c.user_id = ? AND m.role = 'user' AND m.cefr_score IS NOT NULL
+              AND m.timestamp >= datetime('now', '-{} days')
+            GROUP BY DATE(m.timestamp)
+            ORDER BY day
+        '''.format(days), (user_id,))
+        level_trend = [(day, round(score, 2)) for day, score in cursor.fetchall()]
+
+        cursor.execute('''
+            SELECT word FROM vocabulary_tracking
+            WHERE user_id = ?
+            ORDER BY first_used DESC, tracking_id DESC
+            LIMIT 10
+        ''', (user_id,))
+        recent_words = [row[0] for row in cursor.fetchall()]
+
+        conn.close()
+
+        return {
+            'total_words': total_words,
+            'total_uses': total_uses,
+            'active_words': active_words,
+            'growth': growth,
+            'top_words': top_words,
+            'words_by_level': words_by_level,
+            'level_trend': level_trend,
+            'recent_words': recent_words,
+            'analysis_period_days': days
+        }
+
+    def rebuild_vocabulary(self, user_id: int = None) -> int:
+        """Backfill the word index from stored user messages (databases created before it existed)
+
+        Returns the number of index rows written.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        cursor = conn.cursor()
+        try:
+            user_filter = 'AND c.user_id = ?' if user_id is not None else ''
+            cursor.execute(f'''
+                SELECT c.user_id, m.content, m.timestamp
+                FROM messages m
+                JOIN conversations c ON m.conversation_id = c.conversation_id
+                WHERE m.role = 'user' {user_filter}
+                ORDER BY m.timestamp, m.message_id
+            ''', (user_id,) if user_id is not None else ())
+
+            index: Dict[tuple, list] = {}
+            for owner, content, timestamp in cursor.fetchall():
+                for word, count in extract_lemmas(content or '').items():
+                    entry = index.get((owner, word))
+                    if entry:
+                        entry[0] += count
+                        entry[2] = timestamp
+                    else:
+                        index[(owner, word)] = [count, timestamp, timestamp, word_level(word)]
+
+            cursor.execute(f'DELETE FROM vocabulary_tracking {"WHERE user_id = ?" if user_id is not None else ""}',
+                           (user_id,) if user_id is not None else ())
+            cursor.executemany('''
+                INSERT INTO vocabulary_tracking (user_id, word, usage_count, first_used, last_used, word_level)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(owner, word, *entry) for (owner, word), entry in index.items()])
+
+            conn.commit()
+            return len(index)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
     def export_user_data(self, user_id: int) -> Dict:
         """Export all user data for analysis"""
         stats = self.get_user_statistics(user_id)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing of identical in-flight completion requests
+
+In batch grading and classroom sessions many learners send the same
+sentence at the same level within seconds. SingleFlight wraps a
+completions object (ResilientCompletions or BackendRouter). A request
+whose normalized key matches a request still in flight doesn't go
+upstream; it waits for that request and gets the same result.
+
+- create(): the waiters receive the leader's response, or its exception.
+- create_stream(): a pump thread drains the one upstream stream into a
+  shared chunk list. Every waiter iterates that list from the start, so a
+  request joining half-way through still replays every chunk from the
+  first. As with ResilientCompletions, create_stream returns once the
+  first chunk is in.
+
+A flight ends when its upstream call finishes. Later requests start a new
+one, so nothing is cached; ResponseCache does that. Requests coalesce
+across every SingleFlight in the process that shares a FlightGroup (by
+default the module-level one), e.g. all the learners of one batch_grader
+run.
+"""
+import json
+import hashlib
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from metrics import REGISTRY
+from response_cache import normalize_message
+
+# Each `coalesced` request is one upstream call saved
+SINGLEFLIGHT_REQUESTS = REGISTRY.counter('tutor_singleflight_requests_total',
+                                         'Completion requests by call type and whether they went upstream',
+                                         ('call', 'role'))
+CREATE_UPSTREAM = SINGLEFLIGHT_REQUESTS.labels('create', 'upstream')
+CREATE_COALESCED = SINGLEFLIGHT_REQUESTS.labels('create', 'coalesced')
+STREAM_UPSTREAM = SINGLEFLIGHT_REQUESTS.labels('stream', 'upstream')
+STREAM_COALESCED = SINGLEFLIGHT_REQUESTS.labels('stream', 'coalesced')
+REPLAYED_CHUNKS = REGISTRY.counter('tutor_singleflight_replayed_chunks_total',
+                                   'Stream chunks that had arrived before a coalesced request joined')
+INFLIGHT = REGISTRY.gauge('tutor_singleflight_inflight', 'Upstream completion requests currently shared')
+
+
+def request_key(call: str, kwargs: Dict) -> str:
+    """Hash of the request with message text normalized like ResponseCache keys"""
+    normalized = dict(kwargs)
+    if 'messages' in normalized:
+        normalized['messages'] = [dict(m, content=normalize_message(m['content']))
+                                  if isinstance(m.get('content'), str) else m
+                                  for m in normalized['messages']]
+    raw = call + '|' + json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class Flight:
+    """One upstream request and everything its waiters need to share it"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.opened = False          # streams: the first chunk is in
+        self.finished = False
+        self.result = None           # create: the response
+        self.error: Optional[BaseException] = None
+        self.chunks: List = []       # streams: every chunk so far
+
+
+class FlightGroup:
+    """The in-flight requests shared by every SingleFlight using this group"""
+
+    def __init__(self):
+        self.flights: Dict[str, Flight] = {}
+        self.lock = threading.Lock()
+
+    def join(self, key: str):
+        """(flight, is_leader): the flight for `key`, started if none is in the air"""
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self.flights[key] = Flight()
+        INFLIGHT.inc()
+        return flight, True
+
+    def land(self, key: str, flight: Flight):
+        """Remove a finished flight; requests from now on start a new one"""
+        with self.lock:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+        INFLIGHT.dec()
+
+
+DEFAULT_GROUP = FlightGroup()
+
+
+class SingleFlight:
+    """Completions wrapper sharing one upstream call among identical concurrent requests"""
+
+    def __init__(self, completions, group: FlightGroup = DEFAULT_GROUP):
+        self.completions = completions
+        self.group = group
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.counters = {'upstream': 0, 'coalesced': 0, 'late_joins': 0, 'replayed_chunks': 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def __getattr__(self, name: str):
+        # breaker, last_backend, ... of the wrapped completions
+        return getattr(self.completions, name)
+
+    def last_coalesced(self) -> bool:
+        """Whether this thread's most recent request shared another request's upstream call"""
+        return getattr(self.local, 'coalesced', False)
+
+    def create(self, **kwargs):
+        """Non-streaming completion; identical concurrent requests share the response (or the error)"""
+        key = request_key('create', kwargs)
+        flight, leader = self.group.join(key)
+        self.local.coalesced = not leader
+        if not leader:
+            self._count('coalesced')
+            CREATE_COALESCED.inc()
+            with flight.condition:
+                flight.condition.wait_for(lambda: flight.finished)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        self._count('upstream')
+        CREATE_UPSTREAM.inc()
+        try:
+            flight.result = self.completions.create(**kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self.group.land(key, flight)
+            with flight.condition:
+                flight.finished = True
+                flight.condition.notify_all()
+        return flight.result
+
+    def create_stream(self, **kwargs) -> Iterator:
+        """Streaming completion; returns once the first chunk is in, replaying from the start for joiners"""
+        key = request_key('stream', kwargs)
+        flight, leader = self.group.join(key)
+        self.local.coalesced = not leader
+        if leader:
+            self._count('upstream')
+            STREAM_UPSTREAM.inc()
+            try:
+                stream = self.completions.create_stream(**kwargs)
+            except BaseException as e:
+                self.group.land(key, flight)
+                with flight.condition:
+                    flight.error = e
+                    flight.finished = True
+                    flight.condition.notify_all()
+                raise
+            threading.Thread(target=self._pump, args=(key, flight, stream), daemon=True,
+                             name='single-flight-pump').start()
+        else:
+            self._count('coalesced')
+            STREAM_COALESCED.inc()
+
+        with flight.condition:
+            # Chunks that arrived before a late joiner did are replayed to it
+            replayed = len(flight.chunks) if not leader and flight.opened else 0
+            flight.condition.wait_for(lambda: flight.opened or flight.finished)
+            if not flight.chunks and flight.error is not None:
+                # The upstream request failed before its first chunk
+                raise flight.error
+        if replayed:
+            self._count('late_joins')
+            self._count('replayed_chunks', replayed)
+            REPLAYED_CHUNKS.inc(replayed)
+        return self._replay(flight)
+
+    def _pump(self, key: str, flight: Flight, stream: Iterator):
+        """Drain the upstream stream into the flight, independent of how fast any waiter reads"""
+        try:
+            for chunk in stream:
+                with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.opened = True
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            self.group.land(key, flight)
+            with flight.condition:
+                flight.finished = True
+                flight.condition.notify_all()
+
+    def _replay(self, flight: Flight) -> Iterator:
+        """Every chunk of the flight from the first, then the upstream error if it failed mid-stream"""
+        index = 0
+        while True:
+            with flight.condition:
+                flight.condition.wait_for(lambda: index < len(flight.chunks) or flight.finished)
+                if index >= len(flight.chunks):
+                    error = flight.error
+                    break
+                available = flight.chunks[index:]
+            for chunk in available:
+                yield chunk
+            index += len(available)
+        if error is not None:
+            raise error
+
+    def get_stats(self) -> Dict:
+        stats = self.completions.get_stats()
+        with self.lock:
+            stats['single_flight'] = dict(self.counters, upstream_calls_saved=self.counters['coalesced'])
+        return stats
@@ -1,23 +1,21 @@
 #!/usr/bin/env python3
 import os
 import sys
-from openai import OpenAI
+from client_pool import get_client
+from context_window import ContextWindow
 
 class DeepSeekChat:
     def __init__(self):
-        self.client = OpenAI(
-            api_key=os.environ.get('DEEPSEEK_API_KEY'),
-            base_url="https://api.deepseek.com"
-        )
-        self.conversation_history = []
+        self.client = get_client()
+        self.context = ContextWindow(max_turns=20, token_budget=4000)
 
     def add_message(self, role: str, content: str):
         """添加消息到对话历史"""
-        self.conversation_history.append({"role": role, "content": content})
+        self.context.add(role, content)
 
     def clear_history(self):
         """清空对话历史"""
-        self.conversation_history = []
+        self.context.clear()
 
     def stream_chat(self, user_message: str):
         """流式传输对话"""
@@ -28,7 +26,7 @@ class DeepSeekChat:
             # 创建流式响应
             stream = self.client.chat.completions.create(
                 model="deepseek-chat",
-                messages=self.conversation_history,
+                messages=self.context.messages(),
                 stream=True,
                 max_tokens=2000,
                 temperature=0.7
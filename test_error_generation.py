@@ -4,15 +4,19 @@ Generate test conversations with errors to test error tracking
 """
 import os
 import time
+import argparse
 from english_tutor import EnglishTutor
+from response_cache import ResponseCache
 
-def generate_test_conversations():
+def generate_test_conversations(use_cache: bool = False):
     """Generate conversations with typical English errors"""
     if not os.environ.get('DEEPSEEK_API_KEY'):
         print("❌ DEEPSEEK_API_KEY not set!")
         return
 
-    tutor = EnglishTutor("laowang", "B1")
+    # With the cache, repeated runs skip the API for sentences graded before
+    response_cache = ResponseCache() if use_cache else None
+    tutor = EnglishTutor("laowang", "B1", response_cache=response_cache)
     tutor.start_conversation("English practice with errors")
 
     test_messages = [
@@ -33,20 +37,13 @@ def generate_test_conversations():
 
     for i, message in enumerate(test_messages, 1):
         print(f"Test {i}/{len(test_messages)}: {message}")
+        parsed = None
 
         try:
-            # Process the message
-            stream, response_time = tutor.process_user_message_stream(message)
+            # Grade the message (single turn, served from the cache on hits)
+            parsed = tutor.grade_message(message)
 
-            # Collect the response
-            full_response = ""
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-
-            # Parse and display
-            parsed = tutor.parse_streaming_response(full_response)
+            # Display
             print(f"  💬 AI: {parsed['conversation'][:100]}...")
 
             if parsed['errors']:
@@ -56,7 +53,8 @@ def generate_test_conversations():
             else:
                 print(f"  ✨ No major errors detected")
 
-            print(f"  ⚡ Time: {response_time_ms:.0f}ms" if 'response_time_ms' in locals() else "  ⚡ Response received")
+            source = "cache" if parsed['cached'] else "API"
+            print(f"  ⚡ Time: {parsed['response_time_ms']:.0f}ms ({source})")
 
         except Exception as e:
             print(f"  ❌ Error: {e}")
@@ -64,12 +62,22 @@ def generate_test_conversations():
         print("-" * 50)
 
         # Small delay to avoid overwhelming the API
-        time.sleep(1)
+        if not (parsed and parsed['cached']):
+            time.sleep(1)
 
     print(f"\n✅ Generated {len(test_messages)} test conversations!")
+    if response_cache:
+        stats = response_cache.get_stats()
+        print(f"🗄️  Cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), saved {stats['saved_ms']:.0f}ms")
     print("Now you can check the error records:")
     print("uv run english_tutor.py --username \"laowang\" --errors")
     print("uv run english_tutor.py --username \"laowang\" --patterns")
 
 if __name__ == "__main__":
-    generate_test_conversations()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Generate test conversations with errors')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse cached analyses for sentences graded before')
+    args = parser.parse_args()
+
+    generate_test_conversations(args.cache)
\ No newline at end of file
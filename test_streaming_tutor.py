@@ -4,15 +4,13 @@ Test the new streaming English tutor with subtle learning
 """
 import os
 import time
-from openai import OpenAI
+from client_pool import get_client
+from prompt_templates import get_system_prompt
 from rich.console import Console
 
 def test_streaming_conversation():
     """Test the new streaming conversation format"""
-    client = OpenAI(
-        api_key=os.environ.get('DEEPSEEK_API_KEY'),
-        base_url="https://api.deepseek.com"
-    )
+    client = get_client()
     console = Console()
 
     # Test cases with different types of user messages
@@ -31,25 +29,8 @@ def test_streaming_conversation():
         console.print(f"\n📝 Test {i}: {description}", style="bold yellow")
         console.print(f"💬 User: {message}")
 
-        # Create prompt
-        prompt = f"""
-You are having a natural conversation with a B1 English learner. Your goal is to have an interesting, engaging conversation while subtly providing language learning support.
-
-**Response Format:**
-PART 1: Natural conversation response (main focus)
-PART 2: Optional brief learning notes (only if there are significant errors)
-
-Format your response as:
-```
-[NATURAL CONVERSATION RESPONSE]
-
----
-[LEARNING NOTES - Only if there are significant errors]
-Error found: "original" → "correction" - brief explanation
-```
-
-User message: "{message}"
-"""
+        # Same precompiled B1 prompt the tutor sends; the message goes only in the user turn
+        prompt = get_system_prompt("B1")
 
         try:
             # Get streaming response
@@ -4,14 +4,11 @@ Simple test of the English tutor with AI error detection
 """
 import os
 import json
-from openai import OpenAI
+from client_pool import get_client
 
 def test_ai_error_detection():
     """Test AI-based error detection"""
-    client = OpenAI(
-        api_key=os.environ.get('DEEPSEEK_API_KEY'),
-        base_url="https://api.deepseek.com"
-    )
+    client = get_client()
 
     # Test message with grammar error
     user_message = "I go to school yesterday."
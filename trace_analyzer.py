@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Offline analysis of the tutor's JSONL trace spans
+
+Reads a trace file written with `english_tutor.py --trace` (plus its rotated
+siblings), rebuilds each turn's span tree and reports:
+
+- latency per span name (p50/p95/max over all turns)
+- where turn time goes: each direct child of the turn as a share of the
+  total, and the turn's own time outside any child span
+- the slowest turns with their full span tree and attributes
+
+    uv run trace_analyzer.py traces/tutor_traces.jsonl --top 5
+"""
+import os
+import json
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+
+from rich.console import Console
+from rich.table import Table
+from rich.tree import Tree
+
+from latency_stats import summarize
+
+# Attributes shown next to a span in the slow-turn trees
+TREE_ATTRIBUTES = ('conversation_id', 'messages', 'context_tokens', 'ttft_ms', 'chunks', 'prompt_tokens',
+                   'completion_tokens', 'cache_hit_tokens', 'errors', 'findings', 'rows_in', 'rows_out')
+
+
+def trace_files(path: str) -> List[str]:
+    """The trace file and its rotated copies, oldest first"""
+    files = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.append(f"{path}.{index}")
+        index += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def load_spans(paths: List[str]) -> List[Dict]:
+    spans = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A line cut off by a crash mid-write; the rest of the file is still usable
+                    print(f"Skipping malformed span at {path}:{line_number}")
+    return spans
+
+
+def build_traces(spans: List[Dict], root_name: str = 'turn') -> List[Dict]:
+    """Root spans named `root_name`, each with a `children` tree (children sorted by start)"""
+    by_id = {span['span_id']: dict(span, children=[]) for span in spans}
+    roots = []
+    for span in by_id.values():
+        parent = by_id.get(span['parent_id']) if span['parent_id'] else None
+        if parent is not None:
+            parent['children'].append(span)
+        elif span['parent_id'] is None and span['name'] == root_name:
+            roots.append(span)
+    for span in by_id.values():
+        span['children'].sort(key=lambda child: child['start'])
+    return roots
+
+
+def _walk(span: Dict, depth: int = 0):
+    yield span, depth
+    for child in span['children']:
+        yield from _walk(child, depth + 1)
+
+
+def analyze(traces: List[Dict], top: int = 5) -> Dict:
+    durations: Dict[str, List[float]] = defaultdict(list)
+    child_totals: Dict[str, float] = defaultdict(float)
+    turn_total = 0.0
+    own_total = 0.0
+    failed = 0
+
+    for root in traces:
+        turn_total += root['duration_ms']
+        failed += root['status'] != 'ok'
+        # Children may overlap the turn only partly (analysis finishing after the reply)
+        children_ms = 0.0
+        for child in root['children']:
+            child_totals[child['name']] += child['duration_ms']
+            if child['start'] + child['duration_ms'] / 1000 <= root['start'] + root['duration_ms'] / 1000:
+                children_ms += child['duration_ms']
+        own_total += max(root['duration_ms'] - children_ms, 0.0)
+        for span, _ in _walk(root):
+            durations[span['name']].append(span['duration_ms'])
+
+    breakdown = {name: {'total_ms': round(total, 1), 'share': round(total / turn_total, 3) if turn_total else 0.0}
+                 for name, total in sorted(child_totals.items(), key=lambda item: -item[1])}
+    breakdown['(turn itself)'] = {'total_ms': round(own_total, 1),
+                                  'share': round(own_total / turn_total, 3) if turn_total else 0.0}
+
+    slowest = sorted(traces, key=lambda root: -root['duration_ms'])[:top]
+    return {
+        'turns': len(traces),
+        'failed_turns': failed,
+        'spans_ms': {name: summarize(values) for name, values in
+                     sorted(durations.items(), key=lambda item: -sum(item[1]))},
+        'turn_breakdown': breakdown,
+        'slowest_turns': slowest,
+    }
+
+
+def _label(span: Dict) -> str:
+    attributes = span.get('attributes') or {}
+    details = ", ".join(f"{key}={attributes[key]}" for key in TREE_ATTRIBUTES if key in attributes)
+    status = " [red]✗ " + span['error'] + "[/red]" if span['status'] != 'ok' else ""
+    return f"[bold]{span['name']}[/bold] {span['duration_ms']:.1f}ms" + \
+           (f" [dim]({details})[/dim]" if details else "") + status
+
+
+def _tree(span: Dict, tree: Tree = None) -> Tree:
+    node = tree.add(_label(span)) if tree else Tree(_label(span))
+    for child in span['children']:
+        _tree(child, node)
+    return node
+
+
+def print_report(report: Dict):
+    console = Console()
+    console.print(f"\n🔎 {report['turns']} turns ({report['failed_turns']} failed)")
+
+    table = Table(title="⏱️  Latency by Span")
+    table.add_column("Span", style="cyan")
+    for column in ("Count", "p50 ms", "p95 ms", "Max ms"):
+        table.add_column(column, justify="right")
+    for name, stats in report['spans_ms'].items():
+        table.add_row(name, str(stats['count']), f"{stats['p50']:.1f}", f"{stats['p95']:.1f}", f"{stats['max']:.1f}")
+    console.print(table)
+
+    breakdown = Table(title="🧩 Where Turn Time Goes")
+    breakdown.add_column("Span", style="cyan")
+    breakdown.add_column("Total ms", justify="right")
+    breakdown.add_column("Share", justify="right")
+    for name, stats in report['turn_breakdown'].items():
+        breakdown.add_row(name, f"{stats['total_ms']:.0f}", f"{stats['share']:.1%}")
+    console.print(breakdown)
+
+    if report['slowest_turns']:
+        console.print("\n🐢 Slowest turns", style="bold")
+        for root in report['slowest_turns']:
+            console.print(f"[dim]trace {root['trace_id']}[/dim]")
+            console.print(_tree(root))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency breakdown and slowest turns from trace spans')
+    parser.add_argument('path', nargs='?', default='traces/tutor_traces.jsonl',
+                        help='Trace file; rotated copies (FILE.1, FILE.2, ...) are read too')
+    parser.add_argument('--top', type=int, default=5, help='Slowest turns to show (default: 5)')
+    parser.add_argument('--conversation', type=int, help='Only turns of this conversation_id')
+    parser.add_argument('--output', '-o', help='Save the report as JSON')
+
+    args = parser.parse_args()
+
+    files = trace_files(args.path)
+    if not files:
+        print(f"❌ No trace file at {args.path}")
+        return
+
+    traces = build_traces(load_spans(files))
+    if args.conversation is not None:
+        traces = [root for root in traces if root['attributes'].get('conversation_id') == args.conversation]
+    if not traces:
+        print("No turns found.")
+        return
+
+    report = analyze(traces, args.top)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Per-turn trace spans written to a rotating JSONL file
+
+Each conversation turn is one trace: a root `turn` span with nested spans for
+the prompt build, the API request, the stream, the parse and every
+SimpleDatabase call, each carrying attributes such as conversation_id,
+token counts or row counts. Spans nest through a context variable, so code
+only opens `tracer.span(...)` and the parent is found automatically.
+
+Finished spans are handed to SpanWriter, which only appends them to an
+in-memory buffer; a background thread serializes them in batches, writes
+them out and rotates the file by size (traces.jsonl, traces.jsonl.1, ...).
+When the buffer is full new spans are dropped instead of blocking the turn;
+they are counted in tutor_trace_spans_dropped_total and reported when the
+writer closes. One JSON object per line:
+
+    {"trace_id", "span_id", "parent_id", "name", "start", "duration_ms",
+     "status", "error", "attributes"}
+
+Analyse the files with trace_analyzer.py. NullTracer is the no-op used when
+tracing is off.
+"""
+import os
+import json
+import time
+import random
+import threading
+import contextlib
+import contextvars
+from collections import deque
+from typing import Dict, List, Optional
+
+from metrics import REGISTRY
+
+DEFAULT_TRACE_FILE = 'traces/tutor_traces.jsonl'
+SPANS_DROPPED = REGISTRY.counter('tutor_trace_spans_dropped_total',
+                                 'Finished spans dropped because the trace writer fell behind')
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start', 'started', 'attributes', 'status', 'error')
+
+    def __init__(self, name: str, parent: Optional['Span'], attributes: Dict):
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.attributes = attributes
+        self.status = 'ok'
+        self.error = None
+
+    def set(self, **attributes):
+        """Add attributes known only part-way through the span (token counts, rows)"""
+        self.attributes.update(attributes)
+
+    def record(self, duration_ms: float) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': round(duration_ms, 3),
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+class SpanWriter:
+    """Buffered, size-rotated JSONL writer draining on a background thread"""
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE, max_bytes: int = 20 * 1024 * 1024,
+                 backups: int = 5, flush_interval: float = 1.0, max_pending: int = 10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending: deque = deque()
+        self.dropped = 0
+        self.written = 0
+        self.wakeup = threading.Event()
+        self.closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'ab')
+        self.size = self.file.tell()
+        self.thread = threading.Thread(target=self._run, daemon=True, name='span-writer')
+        self.thread.start()
+
+    def submit(self, record: Dict):
+        """Queue a finished span; never blocks (drops when the writer has fallen behind)"""
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            SPANS_DROPPED.inc()
+            return
+        self.pending.append(record)
+
+    def _run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self._flush()
+
+    def _flush(self):
+        lines: List[str] = []
+        while self.pending:
+            lines.append(json.dumps(self.pending.popleft(), ensure_ascii=False, default=str) + '\n')
+        if not lines:
+            return
+        data = ''.join(lines).encode('utf-8')
+        if self.size and self.size + len(data) > self.max_bytes:
+            self._rotate()
+        self.file.write(data)
+        self.file.flush()
+        self.size += len(data)
+        self.written += len(lines)
+
+    def _rotate(self):
+        """traces.jsonl -> traces.jsonl.1 -> ... -> traces.jsonl.<backups> (the oldest is removed)"""
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'ab')
+        self.size = 0
+
+    def close(self):
+        """Write whatever is still buffered and stop the thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.wakeup.set()
+        self.thread.join(timeout=5)
+        self._flush()
+        self.file.close()
+        if self.dropped:
+            print(f"⚠️  Tracing dropped {self.dropped} spans (writer behind, max_pending={self.max_pending}); "
+                  f"{self.written} written to {self.path}")
+
+
+class Tracer:
+    """Creates spans nested under the current span of this thread or context"""
+
+    enabled = True
+
+    def __init__(self, writer: SpanWriter):
+        self.writer = writer
+
+    def current(self) -> Optional[Span]:
+        return _current_span.get()
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent: Span = None, **attributes):
+        """Span around a block; `parent` overrides the current span (work finishing on another thread)"""
+        span = Span(name, parent or _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = 'error'
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.writer.submit(span.record((time.perf_counter() - span.started) * 1000))
+
+    @contextlib.contextmanager
+    def trace(self, name: str, **attributes):
+        """A new trace (root span), regardless of any span already open"""
+        token = _current_span.set(None)
+        try:
+            with self.span(name, **attributes) as span:
+                yield span
+        finally:
+            _current_span.reset(token)
+
+    def close(self):
+        self.writer.close()
+
+
+class _NullSpan:
+    def set(self, **attributes):
+        pass
+
+
+class NullTracer:
+    """Tracing switched off"""
+
+    enabled = False
+    _span = _NullSpan()
+
+    def current(self):
+        return None
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent=None, **attributes):
+        yield self._span
+
+    def trace(self, name: str, **attributes):
+        return self.span(name)
+
+    def close(self):
+        pass
+
+
+def _row_attributes(args, kwargs, result) -> Dict:
+    """Row counts worth recording for a database call: rows passed in, rows returned"""
+    attributes = {}
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, list):
+            attributes['rows_in'] = len(value)
+            break
+    if isinstance(result, (list, tuple)):
+        attributes['rows_out'] = len(result)
+    elif isinstance(result, dict):
+        attributes['keys_out'] = len(result)
+    elif isinstance(result, int) and not isinstance(result, bool):
+        attributes['result'] = result
+    return attributes
+
+
+class TracedDatabase:
+    """Proxy giving every public SimpleDatabase method call its own `db.<method>` span"""
+
+    def __init__(self, db, tracer: Tracer):
+        self._db = db
+        self._tracer = tracer
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._db, name)
+        if not callable(attribute):
+            return attribute
+
+        def traced(*args, **kwargs):
+            with self._tracer.span(f"db.{name}") as span:
+                result = attribute(*args, **kwargs)
+                span.set(**_row_attributes(args, kwargs, result))
+                return result
+        return traced
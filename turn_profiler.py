@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Per-stage profiling of interactive tutor turns
+
+TurnProfiler times the stages of every turn (user message write, prompt
+build, request until the first token, stream drain, parse, each database
+write, rendering) with perf_counter. Optionally each turn also runs under
+cProfile and/or is bracketed by tracemalloc snapshots. At the end of the
+session `write()` saves:
+
+    turns.jsonl          one record per turn: stage timings, top allocations
+    summary.json         p50/p95/max per stage over the session
+    turn_<n>.pstats      cProfile stats of each turn (--profile-cprofile)
+    session.pstats       all turns combined (`python -m pstats session.pstats`)
+    allocations.txt      biggest allocation sites at exit (--profile-memory)
+    allocations.snapshot tracemalloc snapshot (`tracemalloc.Snapshot.load`)
+
+NullProfiler has the same interface and does nothing, so the tutor calls it
+unconditionally when profiling is off.
+"""
+import os
+import json
+import time
+import pstats
+import cProfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from latency_stats import summarize
+
+TOP_ALLOCATIONS = 10
+
+
+def _own_filtered(snapshot):
+    """Drop allocations made by the profilers themselves"""
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, pstats.__file__),
+    ])
+
+
+class NullProfiler:
+    """Profiling switched off"""
+
+    enabled = False
+
+    def start_turn(self, label: str = ''):
+        pass
+
+    def end_turn(self):
+        pass
+
+    def stage(self, name: str):
+        return contextlib.nullcontext()
+
+    def mark(self, name: str):
+        pass
+
+    def write(self) -> Optional[str]:
+        return None
+
+
+class TurnProfiler:
+    """Stage timers per turn, with optional per-turn cProfile and tracemalloc"""
+
+    enabled = True
+
+    def __init__(self, output_dir: str = 'profiles', cprofile: bool = False, memory: bool = False):
+        self.output_dir = os.path.join(output_dir, datetime.now().strftime('session_%Y%m%d_%H%M%S'))
+        self.cprofile = cprofile
+        self.memory = memory
+        self.turns: List[Dict] = []
+        self.turn: Optional[Dict] = None
+        self.turn_start = 0.0
+        self.profiler: Optional[cProfile.Profile] = None
+        self.turn_stats: List[cProfile.Profile] = []
+        self.snapshot = None
+
+        if memory and not tracemalloc.is_tracing():
+            # A few frames per site so allocations can be told apart by caller
+            tracemalloc.start(5)
+
+    def start_turn(self, label: str = ''):
+        if self.turn is not None:
+            self.end_turn()
+        self.turn = {'turn': len(self.turns) + 1, 'label': label[:60], 'stages_ms': {}, 'marks_ms': {}}
+        if self.memory:
+            self.snapshot = _own_filtered(tracemalloc.take_snapshot())
+        if self.cprofile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.turn_start = time.perf_counter()
+
+    def end_turn(self):
+        """Close the current turn (no-op if none is open)"""
+        if self.turn is None:
+            return
+        self.turn['total_ms'] = round((time.perf_counter() - self.turn_start) * 1000, 3)
+
+        if self.profiler:
+            self.profiler.disable()
+
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            growth = _own_filtered(tracemalloc.take_snapshot()).compare_to(self.snapshot, 'lineno')
+            self.turn['traced_kb'] = round(current / 1024, 1)
+            self.turn['peak_kb'] = round(peak / 1024, 1)
+            self.turn['allocations'] = [
+                {'site': str(stat.traceback), 'size_diff_kb': round(stat.size_diff / 1024, 1),
+                 'count_diff': stat.count_diff}
+                for stat in growth[:TOP_ALLOCATIONS] if stat.size_diff
+            ]
+            self.snapshot = None
+            tracemalloc.reset_peak()
+
+        if self.profiler:
+            # After the memory snapshot, so the stats tables don't show up as the turn's allocations
+            self.profiler.create_stats()
+            self.turn_stats.append(self.profiler)
+            self.profiler = None
+
+        self.turns.append(self.turn)
+        self.turn = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Time a block; repeated stages within one turn add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.turn is not None:
+                stages = self.turn['stages_ms']
+                stages[name] = round(stages.get(name, 0.0) + (time.perf_counter() - start) * 1000, 3)
+
+    def mark(self, name: str):
+        """Record a point in time relative to the start of the turn (first occurrence wins)"""
+        if self.turn is not None and name not in self.turn['marks_ms']:
+            self.turn['marks_ms'][name] = round((time.perf_counter() - self.turn_start) * 1000, 3)
+
+    def summary(self) -> Dict:
+        stages: Dict[str, List[float]] = {}
+        for turn in self.turns:
+            for name, value in turn['stages_ms'].items():
+                stages.setdefault(name, []).append(value)
+            for name, value in turn['marks_ms'].items():
+                stages.setdefault(f"@{name}", []).append(value)
+            stages.setdefault('turn', []).append(turn['total_ms'])
+        return {name: summarize(values) for name, values in stages.items()}
+
+    def write(self) -> Optional[str]:
+        """Write the session's reports, return the directory (None without any turns)"""
+        self.end_turn()
+        if not self.turns:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        with open(os.path.join(self.output_dir, 'turns.jsonl'), 'w', encoding='utf-8') as f:
+            for turn in self.turns:
+                f.write(json.dumps(turn, ensure_ascii=False) + '\n')
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump({'turns': len(self.turns), 'stages_ms': self.summary()}, f, indent=2)
+
+        if self.turn_stats:
+            for number, profile in enumerate(self.turn_stats, 1):
+                profile.dump_stats(os.path.join(self.output_dir, f'turn_{number:03d}.pstats'))
+            combined = pstats.Stats(self.turn_stats[0])
+            for profile in self.turn_stats[1:]:
+                combined.add(profile)
+            combined.dump_stats(os.path.join(self.output_dir, 'session.pstats'))
+
+        if self.memory:
+            snapshot = _own_filtered(tracemalloc.take_snapshot())
+            snapshot.dump(os.path.join(self.output_dir, 'allocations.snapshot'))
+            with open(os.path.join(self.output_dir, 'allocations.txt'), 'w', encoding='utf-8') as f:
+                for stat in snapshot.statistics('lineno')[:25]:
+                    f.write(f"{stat}\n")
+
+        return self.output_dir
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Local tokenizer and lemmatizer for the per-user vocabulary index
+
+Learner messages are reduced to lemma counts without any API call, so the
+vocabulary_tracking table can be upserted incrementally as messages arrive.
+The lemmatizer is a small suffix stripper with irregular-form tables; it aims
+to map the forms learners use ("went", "studies", "taller") to one entry.
+"""
+import re
+from collections import Counter
+from typing import Dict
+
+from rule_checker import VERB_FORMS, GRADED_FORMS
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# Clitics expanded to the word they stand for ("'s" is dropped: possessive or is/has)
+CLITICS = {"n't": 'not', "'re": 'be', "'m": 'be', "'ve": 'have', "'ll": 'will', "'d": 'would', "'s": None}
+IRREGULAR_NEGATIVES = {"won't": 'will', "can't": 'can', "shan't": 'shall'}
+
+IRREGULAR_LEMMAS: Dict[str, str] = {
+    'am': 'be', 'is': 'be', 'are': 'be', 'was': 'be', 'were': 'be', 'been': 'be', 'being': 'be',
+    'has': 'have', 'had': 'have', 'having': 'have', 'does': 'do', 'did': 'do', 'done': 'do',
+    'children': 'child', 'men': 'man', 'women': 'woman', 'feet': 'foot', 'teeth': 'tooth',
+    'mice': 'mouse', 'geese': 'goose', 'lives': 'life', 'wives': 'wife', 'knives': 'knife',
+    'leaves': 'leaf', 'went': 'go', 'gone': 'go', 'taught': 'teach', 'thought': 'think',
+    'goes': 'go', 'heroes': 'hero', 'echoes': 'echo', 'quizzes': 'quiz', 'going': 'go', 'doing': 'do', 'using': 'use', 'dying': 'die', 'lying': 'lie',
+    'i': 'i', 'me': 'i', 'my': 'my', 'us': 'we', 'him': 'he', 'them': 'they',
+}
+for _base, (_past, _participle) in VERB_FORMS.items():
+    IRREGULAR_LEMMAS.setdefault(_past, _base)
+    IRREGULAR_LEMMAS.setdefault(_participle, _base)
+for _form, _adjective in GRADED_FORMS.items():
+    IRREGULAR_LEMMAS.setdefault(_form, _adjective)
+
+# Words that only look inflected
+KEEP_AS_IS = frozenset([
+    'this', 'his', 'is', 'was', 'has', 'us', 'as', 'its', 'yes', 'less', 'news', 'always',
+    'perhaps', 'sometimes', 'series', 'species', 'bus', 'plus', 'thus', 'kiss', 'class',
+    'glass', 'boss', 'process', 'business', 'address', 'success', 'physics', 'mathematics',
+    'economics', 'politics', 'during', 'morning', 'evening', 'nothing', 'something',
+    'anything', 'everything', 'thing', 'king', 'ring', 'sing', 'bring', 'spring', 'string',
+    'wing', 'ceiling', 'interesting', 'boring', 'amazing', 'exciting', 'red', 'bed', 'need',
+    'speed', 'seed', 'feed', 'hundred', 'indeed', 'tired', 'bored', 'interested', 'excited',
+    'worried', 'married', 'pleased', 'used', 'focus', 'bonus', 'campus', 'virus', 'gas',
+    'christmas', 'lens', 'analysis', 'basis', 'crisis', 'tennis', 'chess', 'dress', 'less',
+    'unless', 'across', 'towards', 'afterwards', 'hers', 'ours', 'yours', 'theirs',
+])
+
+VOWELS = set('aeiou')
+
+
+def _restore_e(stem: str) -> str:
+    """'mak' -> 'make', 'lov' -> 'love': short consonant-vowel-consonant stems lost an 'e'"""
+    if stem.endswith(('v', 'z', 'c', 'u', 'dg', 'rg', 'chang', 'rang')):
+        return stem + 'e'
+    if (len(stem) <= 4 and len(stem) >= 3 and stem[-1] not in VOWELS | set('wxy')
+            and stem[-2] in VOWELS and stem[-3] not in VOWELS):
+        return stem + 'e'
+    return stem
+
+
+def _undouble(stem: str) -> str:
+    """'runn' -> 'run', 'stopp' -> 'stop' (but keep 'll'/'ss': 'call', 'pass')"""
+    if len(stem) >= 3 and stem[-1] == stem[-2] and stem[-1] not in VOWELS | set('lsz'):
+        return stem[:-1]
+    return stem
+
+
+def _known(word: str) -> bool:
+    # Imported here: cefr lemmatizes its lexicon with this module
+    from cefr import listed_words
+    return word in KEEP_AS_IS or word in listed_words()
+
+
+def lemmatize(word: str) -> str:
+    """Base form of a lowercase token"""
+    if word in IRREGULAR_LEMMAS:
+        return IRREGULAR_LEMMAS[word]
+    if word in KEEP_AS_IS or len(word) <= 3:
+        return word
+
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith('ied') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith('ing') and len(word) > 5:
+        stem = word[:-3]
+        doubled = _undouble(stem)
+        return doubled if doubled != stem else _restore_e(stem)
+    if word.endswith('ed') and len(word) > 4:
+        stem = word[:-2]
+        doubled = _undouble(stem)
+        return doubled if doubled != stem else _restore_e(stem)
+    if word.endswith(('ches', 'shes', 'sses', 'xes', 'zzes')):
+        return word[:-2]
+    if word.endswith(('zes', 'oes')):
+        # 'shoes', 'sizes' only add an s; 'potatoes' adds es
+        if not _known(word[:-1]) and _known(word[:-2]):
+            return word[:-2]
+        return word[:-1]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str):
+    """Lowercase word tokens with clitics expanded ("don't" -> "do", "not")"""
+    for token in TOKEN_PATTERN.findall(text.lower().replace('’', "'")):
+        if token in IRREGULAR_NEGATIVES:
+            yield IRREGULAR_NEGATIVES[token]
+            yield 'not'
+            continue
+        apostrophe = token.find("'")
+        if apostrophe == -1:
+            yield token
+            continue
+        head, clitic = token[:apostrophe], token[apostrophe:]
+        if clitic == "'t" and head.endswith('n'):
+            head, clitic = head[:-1], "n't"
+        if head:
+            yield head
+        if CLITICS.get(clitic):
+            yield CLITICS[clitic]
+
+
+def extract_lemmas(text: str) -> Counter:
+    """Lemma -> occurrences in one message"""
+    return Counter(lemmatize(token) for token in tokenize(text) if len(token) > 1 or token in ('i', 'a'))